@@ -1,6 +1,11 @@
 from flask import Flask
 from .config import Config
+from .utils import close_db_connection
+from .migrations import apply_migrations
+from .services.weight_sync import start_sync_worker
+from .services.weight_client import is_stale
 from .routes.health import health_bp
+from .routes.metrics import metrics_bp
 
 from .routes.provider import providers_bp
 from .routes.truck import trucks_bp
@@ -16,7 +21,18 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Request-scoped DB connection goes back to the pool
+    app.teardown_appcontext(close_db_connection)
+
+    # Responses built from cached Weight data while the service was down
+    @app.after_request
+    def flag_stale_weight_data(response):
+        if is_stale():
+            response.headers['X-Weight-Data-Stale'] = 'true'
+        return response
+
     app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(providers_bp)
     app.register_blueprint(bills_bp)
     app.register_blueprint(trucks_bp)
@@ -26,5 +42,15 @@ def create_app():
     app.register_blueprint(ui_truck_bp)
     app.register_blueprint(ui_bills_bp)
 
+    # Bring existing billdb volumes up to the current schema before
+    # anything (the sync worker included) uses it
+    if app.config['MIGRATE_ON_START']:
+        with app.app_context():
+            apply_migrations()
+
+    # Local replica of the Weight service's weighings
+    if app.config['WEIGHT_SYNC']:
+        start_sync_worker(app)
+
     return app
 
@@ -1,13 +1,60 @@
 import os
+import tempfile
 
 class Config:
    DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
+   MIGRATE_ON_START = os.environ.get('MIGRATE_ON_START', '1') == '1'   # apply app/migrations in create_app()
 
    WEIGHT_BASE_URL = os.environ["WEIGHT_BASE_URL"]
 
+   # Weight service HTTP client (app.services.weight_client)
+   WEIGHT_TIMEOUT = float(os.environ.get('WEIGHT_TIMEOUT', '10'))                  # GET /weight
+   WEIGHT_SESSION_TIMEOUT = float(os.environ.get('WEIGHT_SESSION_TIMEOUT', '5'))   # GET /session/<id>
+   WEIGHT_ITEM_TIMEOUT = float(os.environ.get('WEIGHT_ITEM_TIMEOUT', '3'))         # GET /item/<id>
+   WEIGHT_RETRIES = int(os.environ.get('WEIGHT_RETRIES', '2'))
+   WEIGHT_RETRY_BACKOFF = float(os.environ.get('WEIGHT_RETRY_BACKOFF', '0.2'))
+   WEIGHT_POOL_SIZE = int(os.environ.get('WEIGHT_POOL_SIZE', '10'))
+   WEIGHT_SESSION_CONCURRENCY = int(os.environ.get('WEIGHT_SESSION_CONCURRENCY', '8'))  # parallel GET /session/<id>
+   WEIGHT_SESSION_DEADLINE = float(os.environ.get('WEIGHT_SESSION_DEADLINE', '15'))     # max seconds for all GET /session/<id> of a bill
+   WEIGHT_RETRY_JITTER = float(os.environ.get('WEIGHT_RETRY_JITTER', '0.3'))            # max random seconds added to each retry backoff
+   WEIGHT_BREAKER_FAILURES = int(os.environ.get('WEIGHT_BREAKER_FAILURES', '5'))        # consecutive failures that open the circuit
+   WEIGHT_BREAKER_RESET = float(os.environ.get('WEIGHT_BREAKER_RESET', '30'))           # seconds open before a half-open probe
+   WEIGHT_STALE_TTL = float(os.environ.get('WEIGHT_STALE_TTL', '300'))                  # max age of responses served while down
+   WEIGHT_STALE_CACHE_MB = float(os.environ.get('WEIGHT_STALE_CACHE_MB', '50'))         # total size of those cached responses
+   WEIGHT_ITEM_CONCURRENCY = int(os.environ.get('WEIGHT_ITEM_CONCURRENCY', '8'))        # parallel GET /item/<id> of GET /trucks
+   WEIGHT_ITEMS_DEADLINE = float(os.environ.get('WEIGHT_ITEMS_DEADLINE', '30'))         # max seconds for all GET /item/<id> of GET /trucks
+
    DB_HOST = os.environ['DB_HOST']
    DB_USER = os.environ['DB_USER']
    DB_PASSWORD = os.environ['DB_PASSWORD']
    DB_NAME = os.environ['DB_NAME']
    DB_PORT = os.environ['DB_PORT']
-   
+
+   # Connection pool (app.utils)
+   DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+   DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+
+   # Folder of the files named by POST /providers/import and POST /trucks/import
+   IMPORT_DIR = os.environ.get('IMPORT_DIR', '/app/in')
+
+   # GET /rates keeps one generated XLSX per rates version here
+   RATES_EXPORT_DIR = os.environ.get('RATES_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'billing-rates'))
+
+   # Bills of periods that ended this many hours ago are stored and served again
+   BILL_SNAPSHOT_AFTER_HOURS = float(os.environ.get('BILL_SNAPSHOT_AFTER_HOURS', '24'))
+
+   # Bills of live ranges reuse stored per-day aggregates of closed days
+   BILL_SEGMENT_CACHE = os.environ.get('BILL_SEGMENT_CACHE', '0') == '1'
+
+   # Background bill jobs (POST /bill-jobs, /bills-ui)
+   BILL_JOB_WORKERS = int(os.environ.get('BILL_JOB_WORKERS', '2'))            # bills computed at the same time
+   BILL_JOB_TTL_HOURS = int(os.environ.get('BILL_JOB_TTL_HOURS', '24'))       # finished jobs are kept this long
+   BILL_JOB_TIMEOUT_MINUTES = int(os.environ.get('BILL_JOB_TIMEOUT_MINUTES', '30'))  # unfinished jobs fail this long after they started
+
+   # Where bills read weighings from: 'live' (Weight service API) or
+   # 'replica' (Weighings table kept up to date by app.services.weight_sync)
+   BILL_SOURCE = os.environ.get('BILL_SOURCE', 'live')
+   WEIGHT_SYNC = os.environ.get('WEIGHT_SYNC', '1' if BILL_SOURCE == 'replica' else '0') == '1'
+   WEIGHT_SYNC_INTERVAL = float(os.environ.get('WEIGHT_SYNC_INTERVAL', '30'))             # seconds between runs
+   WEIGHT_SYNC_BATCH = int(os.environ.get('WEIGHT_SYNC_BATCH', '1000'))                   # rows per GET /weight/sync
+   WEIGHT_SYNC_LOOKBACK_HOURS = float(os.environ.get('WEIGHT_SYNC_LOOKBACK_HOURS', '24'))  # re-read window for forced updates
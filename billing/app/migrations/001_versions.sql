@@ -0,0 +1,8 @@
+-- Version stamps of the tables billing keeps in memory (app.models.version)
+USE `billdb`;
+
+CREATE TABLE IF NOT EXISTS `Versions` (
+  `name` varchar(50) NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`name`)
+) ENGINE=MyISAM ;
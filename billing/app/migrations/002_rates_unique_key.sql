@@ -0,0 +1,9 @@
+-- Unique (product_id, scope) key on Rates, keeping the first of any duplicates
+USE `billdb`;
+
+CREATE TABLE `Rates_dedup` LIKE `Rates`;
+ALTER TABLE `Rates_dedup` ADD UNIQUE KEY `uq_rates_product_scope` (`product_id`, `scope`);
+INSERT IGNORE INTO `Rates_dedup` (product_id, rate, scope)
+  SELECT product_id, rate, scope FROM `Rates`;
+RENAME TABLE `Rates` TO `Rates_old`, `Rates_dedup` TO `Rates`;
+DROP TABLE `Rates_old`;
@@ -0,0 +1,14 @@
+-- Stored bills of closed periods (app.models.bill_snapshot)
+USE `billdb`;
+
+CREATE TABLE IF NOT EXISTS `Bill_snapshots` (
+  `provider_id` int(11) NOT NULL,
+  `from_date` char(14) NOT NULL,
+  `to_date` char(14) NOT NULL,
+  `rates_version` int(11) NOT NULL,
+  `trucks_version` int(11) NOT NULL,
+  `bill` mediumtext NOT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`provider_id`, `from_date`, `to_date`),
+  KEY `idx_bill_snapshots_period` (`from_date`, `to_date`)
+) ENGINE=MyISAM ;
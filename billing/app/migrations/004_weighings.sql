@@ -0,0 +1,23 @@
+-- Local replica of the Weight service's transactions (app.services.weight_sync)
+USE `billdb`;
+
+CREATE TABLE IF NOT EXISTS `Weighings` (
+  `id` int(11) NOT NULL,
+  `session_id` int(11) DEFAULT NULL,
+  `datetime` datetime DEFAULT NULL,
+  `direction` varchar(10) DEFAULT NULL,
+  `truck` varchar(50) DEFAULT NULL,
+  `produce` varchar(50) DEFAULT NULL,
+  `bruto` int(11) DEFAULT NULL,
+  `neto` int(11) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_weighings_direction_datetime` (`direction`, `datetime`),
+  KEY `idx_weighings_truck` (`truck`)
+) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Sync_state` (
+  `name` varchar(50) NOT NULL,
+  `last_id` int(11) NOT NULL DEFAULT 0,
+  `last_datetime` datetime DEFAULT NULL,
+  PRIMARY KEY (`name`)
+) ENGINE=MyISAM ;
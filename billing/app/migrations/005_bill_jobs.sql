@@ -0,0 +1,16 @@
+-- Background bill computations (app.services.bill_jobs)
+USE `billdb`;
+
+CREATE TABLE IF NOT EXISTS `Bill_jobs` (
+  `id` char(32) NOT NULL,
+  `provider_id` int(11) DEFAULT NULL,
+  `from_date` char(14) NOT NULL,
+  `to_date` char(14) NOT NULL,
+  `status` varchar(10) NOT NULL DEFAULT 'queued',
+  `result` mediumtext DEFAULT NULL,
+  `error` varchar(255) DEFAULT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `finished_at` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_bill_jobs_created_at` (`created_at`)
+) ENGINE=MyISAM ;
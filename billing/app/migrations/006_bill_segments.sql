@@ -0,0 +1,12 @@
+-- Per-day bill aggregates of closed days (app.models.bill_segment)
+USE `billdb`;
+
+CREATE TABLE IF NOT EXISTS `Bill_segments` (
+  `provider_id` int(11) NOT NULL,
+  `day` char(8) NOT NULL,
+  `trucks_version` int(11) NOT NULL,
+  `session_count` int(11) NOT NULL,
+  `products` mediumtext NOT NULL,
+  PRIMARY KEY (`provider_id`, `day`),
+  KEY `idx_bill_segments_day` (`day`)
+) ENGINE=MyISAM ;
@@ -0,0 +1,10 @@
+-- Indexes for provider and truck lookups:
+-- Trucks by provider, and unique provider names (get_provider_by_name).
+-- Rename duplicate provider names first, the unique key refuses them:
+--   SELECT name, COUNT(*) FROM Provider GROUP BY name HAVING COUNT(*) > 1;
+USE `billdb`;
+
+ALTER TABLE `Trucks` ADD KEY `idx_trucks_provider` (`provider_id`);
+
+-- MyISAM keys are at most 1000 bytes: 191 utf8mb4 characters of the name
+ALTER TABLE `Provider` ADD UNIQUE KEY `uq_provider_name` (`name`(191));
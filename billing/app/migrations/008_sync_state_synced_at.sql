@@ -0,0 +1,6 @@
+-- Start time of the last sync run that caught up with the Weight service:
+-- every weighing written before it is in the replica, so bills of periods
+-- that ended before it can be stored as snapshots.
+USE `billdb`;
+
+ALTER TABLE `Sync_state` ADD COLUMN `synced_at` datetime DEFAULT NULL;
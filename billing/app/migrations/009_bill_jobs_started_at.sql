@@ -0,0 +1,5 @@
+-- When a bill job started running: unfinished jobs time out from here,
+-- not from when they were queued.
+USE `billdb`;
+
+ALTER TABLE `Bill_jobs` ADD COLUMN `started_at` timestamp NULL DEFAULT NULL AFTER `created_at`;
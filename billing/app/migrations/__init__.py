@@ -0,0 +1,89 @@
+import os
+import re
+from flask import current_app
+from mysql.connector import errorcode
+from mysql.connector.errors import Error
+from app.utils import get_db_connection
+
+MIGRATIONS_DIR = os.path.dirname(__file__)
+
+# Errors that mean a migration step is already in place
+# (table exists, duplicate column, duplicate key name)
+ALREADY_APPLIED = {
+    errorcode.ER_TABLE_EXISTS_ERROR,   # 1050
+    errorcode.ER_DUP_FIELDNAME,        # 1060
+    errorcode.ER_DUP_KEYNAME,          # 1061
+}
+
+
+def migration_files():
+    """The NNN_*.sql files of this folder, in order."""
+    return sorted(
+        name for name in os.listdir(MIGRATIONS_DIR)
+        if re.match(r'^\d{3}_.*\.sql$', name)
+    )
+
+
+def split_statements(sql):
+    """
+    SQL statements of a migration file, without comments and without
+    USE statements (the connection is already on DB_NAME).
+    """
+    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    statements = [statement.strip() for statement in '\n'.join(lines).split(';')]
+    return [
+        statement for statement in statements
+        if statement and not re.match(r'^USE\s', statement, re.IGNORECASE)
+    ]
+
+
+def apply_migrations():
+    """
+    Apply the migration files not yet recorded in Schema_migrations, in
+    order, and record each one. Steps that are already in place are skipped,
+    so files can also run against databases created from a newer
+    billingdb.sql. Other errors stop the run and are raised.
+    Returns the names of the applied files.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Only one process migrates at a time
+    cursor.execute("SELECT GET_LOCK('billing_migrations', 60)")
+    cursor.fetchall()
+    applied = []
+    try:
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS Schema_migrations ("
+            "filename varchar(255) NOT NULL, "
+            "applied_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+            "PRIMARY KEY (filename)) ENGINE=MyISAM"
+        )
+        cursor.execute("SELECT filename FROM Schema_migrations")
+        done = {row[0] for row in cursor.fetchall()}
+
+        for filename in migration_files():
+            if filename in done:
+                continue
+            with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                statements = split_statements(f.read())
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                    if cursor.with_rows:
+                        cursor.fetchall()
+                except Error as e:
+                    if e.errno not in ALREADY_APPLIED:
+                        raise RuntimeError(f"Migration {filename} failed: {e}") from e
+            cursor.execute("INSERT INTO Schema_migrations (filename) VALUES (%s)", (filename,))
+            conn.commit()
+            applied.append(filename)
+            current_app.logger.info("Applied migration %s", filename)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('billing_migrations')")
+        cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+    return applied
@@ -0,0 +1,123 @@
+import json
+from app.utils import get_db_connection
+
+# Bill job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def create_bill_job(job_id, provider_id, from_date, to_date):
+    """
+    Insert a queued bill job (provider_id None = all providers).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "INSERT INTO Bill_jobs (id, provider_id, from_date, to_date, status) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (job_id, provider_id, from_date, to_date, QUEUED)
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def get_bill_job(job_id):
+    """
+    Get a bill job by id, with its result decoded (None if not done).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    cursor.execute(
+        "SELECT id, provider_id, from_date, to_date, status, result, error, created_at, started_at, finished_at "
+        "FROM Bill_jobs WHERE id = %s",
+        (job_id,)
+    )
+    job = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    if job and job['result'] is not None:
+        job['result'] = json.loads(job['result'])
+    return job
+
+
+def update_bill_job(job_id, status, result=None, error=None):
+    """
+    Move an unfinished bill job to a new status; finished jobs get their
+    result or error, running ones their start time. A job that is already
+    done or failed (e.g. expired) is left as it is.
+    Returns True if the job was updated.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    if status in (DONE, FAILED):
+        cursor.execute(
+            "UPDATE Bill_jobs SET status = %s, result = %s, error = %s, finished_at = NOW() "
+            "WHERE id = %s AND status IN (%s, %s)",
+            (status, json.dumps(result) if result is not None else None, error, job_id, QUEUED, RUNNING)
+        )
+    else:
+        cursor.execute(
+            "UPDATE Bill_jobs SET status = %s, started_at = NOW() WHERE id = %s AND status IN (%s, %s)",
+            (status, job_id, QUEUED, RUNNING)
+        )
+    updated = cursor.rowcount > 0
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return updated
+
+
+def expire_bill_job(job_id, minutes, error):
+    """
+    Mark a job failed if it is still queued or running more than `minutes`
+    after it started (or was created, if it never started).
+    Returns True if the job was expired.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "UPDATE Bill_jobs SET status = %s, error = %s, finished_at = NOW() "
+        "WHERE id = %s AND status IN (%s, %s) "
+        "AND COALESCE(started_at, created_at) < NOW() - INTERVAL %s MINUTE",
+        (FAILED, error, job_id, QUEUED, RUNNING, minutes)
+    )
+    expired = cursor.rowcount > 0
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return expired
+
+
+def delete_old_bill_jobs(hours):
+    """
+    Delete the jobs created more than `hours` ago.
+    Returns the number of deleted jobs.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "DELETE FROM Bill_jobs WHERE created_at < NOW() - INTERVAL %s HOUR",
+        (hours,)
+    )
+    deleted = cursor.rowcount
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return deleted
@@ -0,0 +1,73 @@
+import json
+from app.utils import get_db_connection
+
+
+def get_bill_segments(provider_id, trucks_version, first_day, last_day):
+    """
+    Fetch the stored per-day aggregates of a provider for days in
+    [first_day, last_day] (yyyymmdd) computed with the current truck assignments.
+    Returns {day: (session_count, {produce: {'count', 'amount'}})}.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    cursor.execute(
+        "SELECT day, session_count, products FROM Bill_segments "
+        "WHERE provider_id = %s AND day BETWEEN %s AND %s AND trucks_version = %s",
+        (provider_id, first_day, last_day, trucks_version)
+    )
+    results = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return {
+        row['day']: (row['session_count'], json.loads(row['products']))
+        for row in results
+    }
+
+
+def save_bill_segments(provider_id, trucks_version, segments):
+    """
+    Store (or replace) per-day aggregates: segments is a list of
+    (day, session_count, products).
+    """
+    if not segments:
+        return
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.executemany(
+        "REPLACE INTO Bill_segments (provider_id, day, trucks_version, session_count, products) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        [
+            (provider_id, day, trucks_version, session_count, json.dumps(products))
+            for day, session_count, products in segments
+        ]
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def delete_bill_segments(from_date, to_date):
+    """
+    Delete the aggregates of the days overlapping [from_date, to_date].
+    Returns the number of deleted segments.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "DELETE FROM Bill_segments WHERE day BETWEEN %s AND %s",
+        (from_date[:8], to_date[:8])
+    )
+    deleted = cursor.rowcount
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return deleted
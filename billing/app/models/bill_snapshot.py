@@ -0,0 +1,64 @@
+import json
+from app.utils import get_db_connection
+
+
+def get_bill_snapshot(provider_id, from_date, to_date, rates_version, trucks_version):
+    """
+    Fetch the stored bill of a closed period, if it was computed with the
+    current rates and truck assignments.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    cursor.execute(
+        "SELECT bill FROM Bill_snapshots "
+        "WHERE provider_id = %s AND from_date = %s AND to_date = %s "
+        "AND rates_version = %s AND trucks_version = %s",
+        (provider_id, from_date, to_date, rates_version, trucks_version)
+    )
+    result = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    return json.loads(result['bill']) if result else None
+
+
+def save_bill_snapshot(provider_id, from_date, to_date, rates_version, trucks_version, bill):
+    """
+    Store (or replace) the bill of a closed period.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "REPLACE INTO Bill_snapshots "
+        "(provider_id, from_date, to_date, rates_version, trucks_version, bill) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        (provider_id, from_date, to_date, rates_version, trucks_version, json.dumps(bill))
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def delete_bill_snapshots(from_date, to_date):
+    """
+    Delete the snapshots whose period overlaps [from_date, to_date].
+    Returns the number of deleted snapshots.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "DELETE FROM Bill_snapshots WHERE from_date <= %s AND to_date >= %s",
+        (to_date, from_date)
+    )
+    deleted = cursor.rowcount
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    return deleted
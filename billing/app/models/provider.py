@@ -1,4 +1,13 @@
+from bisect import bisect_right
 from app.utils import get_db_connection
+from app.models.version import PROVIDERS, bump_version
+from app.utils.cache import VersionedCache
+
+# Rows per executemany batch of a bulk import
+INSERT_CHUNK_SIZE = 1000
+
+# Providers per page of the UI lists
+PAGE_SIZE = 50
 
 def create_provider(name):
 
@@ -19,6 +28,8 @@ def create_provider(name):
     cursor.close()
     conn.close()
     
+    bump_version(PROVIDERS)
+    
     return provider_id
 
 
@@ -37,6 +48,9 @@ def update_provider(provider_id, name):
     cursor.close()
     conn.close()
     
+    if affected_rows > 0:
+        bump_version(PROVIDERS)
+    
     return affected_rows > 0
 
 
@@ -77,8 +91,10 @@ def get_provider_by_name(name):
     
     return provider
 
-# TODO: not implemented yet
 def get_all_providers():
+    """
+    Fetch all providers, ordered by id.
+    """
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
@@ -89,3 +105,81 @@ def get_all_providers():
     conn.close()
     
     return providers
+
+
+def create_providers(names):
+    """
+    Insert many providers, INSERT_CHUNK_SIZE rows per INSERT IGNORE.
+    Returns the new ids in the order of names; None for a name that is
+    already taken (e.g. created concurrently; uq_provider_name).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    ids = []
+    for i in range(0, len(names), INSERT_CHUNK_SIZE):
+        chunk = names[i:i + INSERT_CHUNK_SIZE]
+        cursor.executemany("INSERT IGNORE INTO Provider (name) VALUES (%s)", [(name,) for name in chunk])
+        # One multi-row insert into MyISAM: the inserted rows got consecutive
+        # ids from lastrowid on, the other names belong to existing providers
+        first_id, inserted = cursor.lastrowid, cursor.rowcount
+        conn.commit()
+        cursor.execute(
+            f"SELECT id, name FROM Provider WHERE name IN ({', '.join(['%s'] * len(chunk))})",
+            chunk
+        )
+        # Provider.name compares case-insensitively in MySQL
+        found = {name.lower(): provider_id for provider_id, name in cursor.fetchall()}
+        for name in chunk:
+            provider_id = found.get(name.lower())
+            ours = inserted > 0 and provider_id is not None and first_id <= provider_id < first_id + inserted
+            ids.append(provider_id if ours else None)
+    
+    cursor.close()
+    conn.close()
+    
+    if any(provider_id is not None for provider_id in ids):
+        bump_version(PROVIDERS)
+    
+    return ids
+
+
+class ProviderDirectory:
+    """
+    In-memory copy of the Provider table, ordered by id.
+    The rows are shared by every request: callers must not modify them.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._ids = [provider['id'] for provider in providers]
+        # Provider.name compares case-insensitively in MySQL
+        self._folded = [(provider['name'] or '').lower() for provider in providers]
+
+    def page(self, after=None, search=None, limit=PAGE_SIZE):
+        """
+        Keyset page: the first `limit` providers with id > after whose name
+        contains `search` (case-insensitive).
+        Returns (providers, next_after), next_after is None on the last page.
+        """
+        start = bisect_right(self._ids, after) if after is not None else 0
+        needle = search.strip().lower() if search else ''
+        page = []
+        for i in range(start, len(self.providers)):
+            if needle in self._folded[i]:
+                if len(page) == limit:
+                    return page, page[-1]['id']
+                page.append(self.providers[i])
+        return page, None
+
+
+provider_directory = VersionedCache(PROVIDERS, lambda: ProviderDirectory(get_all_providers()))
+
+
+def get_provider_directory():
+    """
+    The provider directory of this process, reloaded whenever
+    create_provider/update_provider/create_providers (in any process) bump
+    the providers version.
+    """
+    return provider_directory.get()
@@ -1,23 +1,47 @@
+import uuid
 from app.utils import get_db_connection
+from app.utils.cache import VersionedCache
+from app.models.version import RATES, bump_version
+
+# Rows per multi-row INSERT when loading the staging table
+INSERT_CHUNK_SIZE = 1000
+
 
 def save_rates(rates):
     """
     Save rates to database, replacing all existing rates.
+
+    The new rates are bulk loaded into a staging copy of the table which
+    then atomically replaces Rates (RENAME TABLE), so a bill calculated
+    during an upload sees either all the old rates or all the new ones.
+    A (product, scope) listed twice keeps its last rate.
     """
+    suffix = uuid.uuid4().hex[:12]
+    staging, retired = f"Rates_new_{suffix}", f"Rates_old_{suffix}"
+    rows = [(rate['product_id'], rate['rate'], rate['scope']) for rate in rates]
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("DELETE FROM Rates")
-    
-    for rate in rates:
-        cursor.execute(
-            "INSERT INTO Rates (product_id, rate, scope) VALUES (%s, %s, %s)",
-            (rate['product_id'], rate['rate'], rate['scope'])
-        )
+    try:
+        cursor.execute(f"CREATE TABLE `{staging}` LIKE Rates")
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            cursor.executemany(
+                f"INSERT INTO `{staging}` (product_id, rate, scope) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE rate = VALUES(rate)",
+                rows[i:i + INSERT_CHUNK_SIZE]
+            )
+        conn.commit()
+        cursor.execute(f"RENAME TABLE Rates TO `{retired}`, `{staging}` TO Rates")
+        cursor.execute(f"DROP TABLE `{retired}`")
+    except Exception:
+        cursor.execute(f"DROP TABLE IF EXISTS `{staging}`")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
     
-    conn.commit()
-    cursor.close()
-    conn.close()
+    bump_version(RATES)
 
 
 def get_all_rates():
@@ -36,33 +60,32 @@ def get_all_rates():
     return rates
 
 
+def load_rate_table():
+    """
+    Load the whole Rates table as {product_id: (all_rate, {scope: rate})}.
+    The 'All' rate is resolved here, so a lookup never goes back to the DB.
+    Products match case-insensitively, as they did in SQL.
+    """
+    table = {}
+    for row in get_all_rates():
+        product = row['product_id'].lower()
+        all_rate, scoped = table.setdefault(product, (None, {}))
+        scope = str(row['scope'])
+        if scope.upper() == 'ALL':
+            if all_rate is None:
+                table[product] = (row['rate'], scoped)
+        else:
+            scoped.setdefault(scope, row['rate'])
+    return table
+
+
+rate_table = VersionedCache(RATES, load_rate_table)
+
+
 def get_rate(product_id, provider_id):
     """
     Get the rate for a product, checking provider-specific rate first.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    # Try provider-specific rate first
-    cursor.execute(
-        "SELECT rate FROM Rates WHERE product_id = %s AND scope = %s",
-        (product_id, str(provider_id))
-    )
-    result = cursor.fetchone()
-    
-    if result:
-        cursor.close()
-        conn.close()
-        return result['rate']
-    
-    # Fall back to 'ALL' rate
-    cursor.execute(
-        "SELECT rate FROM Rates WHERE product_id = %s AND scope = 'All'",
-        (product_id,)
-    )
-    result = cursor.fetchone()
-    
-    cursor.close()
-    conn.close()
-    
-    return result['rate'] if result else 0
+    all_rate, scoped = rate_table.get().get(str(product_id).lower(), (None, {}))
+    rate = scoped.get(str(provider_id), all_rate)
+    return rate if rate is not None else 0
@@ -1,5 +1,10 @@
 from app.utils import get_db_connection
-from app.services.weight_client import get_item_from_weight
+from app.models.version import TRUCKS, bump_version
+from app.utils.cache import VersionedCache
+from app.services.weight_client import get_item_from_weight, fetch_items
+
+# Rows per executemany batch of a bulk import
+INSERT_CHUNK_SIZE = 1000
 
 
 def create_truck(truck_id, provider_id):
@@ -17,6 +22,48 @@ def create_truck(truck_id, provider_id):
     conn.commit()
     cursor.close()
     conn.close()
+    
+    bump_version(TRUCKS)
+
+
+def create_trucks(trucks):
+    """
+    Register many trucks: trucks is a list of (truck_id, provider_id),
+    INSERT_CHUNK_SIZE rows per INSERT IGNORE.
+    Returns one flag per truck: False if the id is already taken (e.g.
+    registered concurrently) by another provider.
+    """
+    if not trucks:
+        return []
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    created = []
+    for i in range(0, len(trucks), INSERT_CHUNK_SIZE):
+        chunk = trucks[i:i + INSERT_CHUNK_SIZE]
+        cursor.executemany("INSERT IGNORE INTO Trucks (id, provider_id) VALUES (%s, %s)", chunk)
+        inserted = cursor.rowcount
+        conn.commit()
+        if inserted == len(chunk):
+            created.extend([True] * len(chunk))
+            continue
+        # Some ids were taken meanwhile: the rows that now point elsewhere
+        cursor.execute(
+            f"SELECT id, provider_id FROM Trucks WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+            [truck_id for truck_id, _ in chunk]
+        )
+        # Trucks.id compares case-insensitively in MySQL
+        found = {truck_id.lower(): provider_id for truck_id, provider_id in cursor.fetchall()}
+        created.extend(found.get(truck_id.lower()) == provider_id for truck_id, provider_id in chunk)
+    
+    cursor.close()
+    conn.close()
+    
+    if any(created):
+        bump_version(TRUCKS)
+    
+    return created
 
 
 def update_truck(truck_id, provider_id):
@@ -36,6 +83,9 @@ def update_truck(truck_id, provider_id):
     cursor.close()
     conn.close()
     
+    if affected_rows > 0:
+        bump_version(TRUCKS)
+    
     return affected_rows > 0
 
 
@@ -58,45 +108,63 @@ def get_truck(truck_id):
     return truck
 
 
-def get_provider_by_truck(truck_id):
+def get_truck_provider_index():
     """
-    Get all trucks belonging to a provider.
+    Map every registered truck to its provider: {truck_id: provider_id}.
     """
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute(
-        "SELECT provider_id FROM Trucks WHERE id = %s",
-        (truck_id,)
-    )
-    result = cursor.fetchone()
+    cursor.execute("SELECT id, provider_id FROM Trucks")
+    index = {truck_id: provider_id for truck_id, provider_id in cursor.fetchall()}
     
     cursor.close()
     conn.close()
     
-    return result[0]
+    return index
 
 
-def get_trucks_by_provider(provider_id):
+class TruckIndex:
     """
-    Get all trucks belonging to a provider.
+    In-memory copy of the Trucks table:
+    provider_of = {truck_id: provider_id}, trucks_of = {provider_id: {truck_id, ...}}
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "SELECT id FROM Trucks WHERE provider_id = %s",
-        (provider_id,)
-    )
-    trucks = [row[0] for row in cursor.fetchall()]
-    
-    cursor.close()
-    conn.close()
-    
-    return trucks
-def get_truck_sessions(truck_id, from_date, to_date):
+
+    def __init__(self, provider_of):
+        self.provider_of = provider_of
+        self.trucks_of = {}
+        self._folded = {}
+        for truck_id, provider_id in provider_of.items():
+            self.trucks_of.setdefault(provider_id, set()).add(truck_id)
+            # Trucks.id compares case-insensitively in MySQL
+            self._folded[truck_id.lower()] = truck_id
+
+    def find(self, truck_id):
+        """
+        Look a truck up like SELECT ... WHERE id = %s would.
+        Returns {'id': ..., 'provider_id': ...} or None.
+        """
+        stored_id = self._folded.get(truck_id.rstrip().lower())
+        if stored_id is None:
+            return None
+        return {'id': stored_id, 'provider_id': self.provider_of[stored_id]}
+
+
+truck_index = VersionedCache(TRUCKS, lambda: TruckIndex(get_truck_provider_index()))
+
+
+def get_truck_index():
+    """
+    The truck → provider index of this process, reloaded whenever
+    create_truck/update_truck (in any process) bump the trucks version.
+    """
+    return truck_index.get()
+
+
+def parse_truck_sessions(item_data):
     """
-    Get truck's tara weight and weighing sessions from Weight service.
+    Get truck's tara weight and weighing sessions from a Weight service
+    GET /item/<id> response.
 
     The Weight service returns a list of transactions like:
     [
@@ -111,51 +179,60 @@ def get_truck_sessions(truck_id, from_date, to_date):
             'session_ids': [<id1>, <id2>, ...]  # all unique session IDs
         }
     """
-    try:
-        item_data = get_item_from_weight(truck_id, from_date, to_date)
-
-        # Weight service returns a LIST of transactions
-        if not isinstance(item_data, list):
-            print(f"Warning: Expected list from weight service, got {type(item_data)}")
-            return {
-                'tara': 'na',
-                'session_ids': []
-            }
-
-        # Extract all unique session_ids and find the tara from transaction with highest ID
-        session_ids = []
-        max_id = None
-        tara_from_max_id = None
-
-        # Process each transaction in the list
-        for transaction in item_data:
-            if not isinstance(transaction, dict):
-                continue
-
-            # Collect session_id
-            session_id = transaction.get('session_id')
-            if session_id is not None and session_id not in session_ids:
-                session_ids.append(session_id)
-
-            # Get transaction ID and tara value
-            transaction_id = transaction.get('id')
-            if transaction_id is None:
-                continue
-
-            # Get tara value - check both 'tara' and 'truckTara' keys
-            # (Weight service uses 'tara' in API mode, 'truckTara' in UI mode)
-            tara = transaction.get('tara') or transaction.get('truckTara')
-
-            # Track the transaction with highest ID that has a valid tara
-            if tara is not None and tara != 'na':
-                if max_id is None or transaction_id > max_id:
-                    max_id = transaction_id
-                    tara_from_max_id = tara
-
+    # Weight service returns a LIST of transactions
+    if not isinstance(item_data, list):
+        print(f"Warning: Expected list from weight service, got {type(item_data)}")
         return {
-            'tara': tara_from_max_id if tara_from_max_id is not None else 'na',
-            'session_ids': session_ids
+            'tara': 'na',
+            'session_ids': []
         }
+
+    # Extract all unique session_ids and find the tara from transaction with highest ID
+    session_ids = []
+    seen_session_ids = set()
+    max_id = None
+    tara_from_max_id = None
+
+    # Process each transaction in the list
+    for transaction in item_data:
+        if not isinstance(transaction, dict):
+            continue
+
+        # Collect session_id (first occurrence keeps its position)
+        session_id = transaction.get('session_id')
+        if session_id is not None and session_id not in seen_session_ids:
+            seen_session_ids.add(session_id)
+            session_ids.append(session_id)
+
+        # Get transaction ID and tara value
+        transaction_id = transaction.get('id')
+        if transaction_id is None:
+            continue
+
+        # Get tara value - check both 'tara' and 'truckTara' keys
+        # (Weight service uses 'tara' in API mode, 'truckTara' in UI mode)
+        tara = transaction.get('tara') or transaction.get('truckTara')
+
+        # Track the transaction with highest ID that has a valid tara
+        if tara is not None and tara != 'na':
+            if max_id is None or transaction_id > max_id:
+                max_id = transaction_id
+                tara_from_max_id = tara
+
+    return {
+        'tara': tara_from_max_id if tara_from_max_id is not None else 'na',
+        'session_ids': session_ids
+    }
+
+
+def get_truck_sessions(truck_id, from_date, to_date):
+    """
+    Get truck's tara weight and weighing sessions from Weight service
+    (see parse_truck_sessions).
+    """
+    try:
+        item_data = get_item_from_weight(truck_id, from_date, to_date)
+        return parse_truck_sessions(item_data)
     except Exception as e:
         # Log the error for debugging
         print(f"Error calling weight service for truck {truck_id}: {type(e).__name__}: {str(e)}")
@@ -164,3 +241,18 @@ def get_truck_sessions(truck_id, from_date, to_date):
             'session_ids': []
         }
 
+
+def get_trucks_sessions(truck_ids, from_date, to_date):
+    """
+    get_truck_sessions for many trucks, with the Weight service calls made
+    concurrently. Returns {truck_id: {'tara', 'session_ids'}}.
+    """
+    items = fetch_items(truck_ids, from_date, to_date)
+    sessions = {}
+    for truck_id in truck_ids:
+        if items[truck_id] is None:
+            # Weight service call failed, like get_truck_sessions
+            sessions[truck_id] = {'tara': 'na', 'session_ids': []}
+        else:
+            sessions[truck_id] = parse_truck_sessions(items[truck_id])
+    return sessions
@@ -0,0 +1,55 @@
+from flask import g
+from app.utils import get_db_connection
+
+# Names of the versioned tables (rows of the Versions table)
+RATES = 'rates'
+TRUCKS = 'trucks'
+PROVIDERS = 'providers'
+
+
+def get_version(name):
+    """
+    Get the current version stamp of a table (0 if it was never bumped).
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    cursor.execute("SELECT version FROM Versions WHERE name = %s", (name,))
+    result = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    return result['version'] if result else 0
+
+
+def current_version(name):
+    """
+    Version stamp of a table, read at most once per request.
+    """
+    versions = g.setdefault('versions', {})
+    if name not in versions:
+        versions[name] = get_version(name)
+    return versions[name]
+
+
+def bump_version(name):
+    """
+    Bump the version stamp of a table after it was changed, so every
+    worker process reloads its in-memory copy.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "INSERT INTO Versions (name, version) VALUES (%s, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1",
+        (name,)
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+    
+    # This request sees its own change
+    g.get('versions', {}).pop(name, None)
@@ -0,0 +1,126 @@
+from datetime import datetime
+from app.utils import get_db_connection
+
+WEIGHINGS = 'weighings'
+
+
+def parse_datetime(value):
+    return datetime.strptime(value, '%Y%m%d%H%M%S') if value else None
+
+
+def upsert_weighings(rows):
+    """
+    Insert or refresh weighings pulled from GET /weight/sync.
+    """
+    if not rows:
+        return
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.executemany(
+        "INSERT INTO Weighings (id, session_id, datetime, direction, truck, produce, bruto, neto) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE session_id = VALUES(session_id), datetime = VALUES(datetime), "
+        "direction = VALUES(direction), truck = VALUES(truck), produce = VALUES(produce), "
+        "bruto = VALUES(bruto), neto = VALUES(neto)",
+        [
+            (
+                row['id'], row.get('session_id'), parse_datetime(row.get('datetime')),
+                row.get('direction'), row.get('truck'), row.get('produce'),
+                row.get('bruto'), row.get('neto')
+            )
+            for row in rows
+        ]
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def get_sync_state(name=WEIGHINGS):
+    """
+    High-water mark of a sync: {'last_id': <int>, 'last_datetime': <datetime or None>,
+    'synced_at': <start of the last run that caught up, datetime or None>}.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    cursor.execute("SELECT last_id, last_datetime, synced_at FROM Sync_state WHERE name = %s", (name,))
+    state = cursor.fetchone()
+    
+    cursor.close()
+    conn.close()
+    
+    return state or {'last_id': 0, 'last_datetime': None, 'synced_at': None}
+
+
+def save_sync_state(last_id, last_datetime, name=WEIGHINGS):
+    """
+    Store the high-water mark of a sync.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "INSERT INTO Sync_state (name, last_id, last_datetime) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), last_datetime = VALUES(last_datetime)",
+        (name, last_id, last_datetime)
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def save_synced_at(synced_at, name=WEIGHINGS):
+    """
+    Store the start time of a sync run that pulled everything up to the
+    Weight service's last transaction.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    cursor.execute(
+        "UPDATE Sync_state SET synced_at = %s WHERE name = %s",
+        (synced_at, name)
+    )
+    
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def get_replica_bill_totals(from_date, to_date, provider_id=None):
+    """
+    Bill totals from the local weighings replica, in one query:
+    'in' weighings × Trucks × Rates (provider rate, else 'All'), grouped by
+    provider and product. Rows: provider_id, product, sessions, count, amount, rate.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    
+    query = (
+        "SELECT t.provider_id, w.produce AS product, "
+        "COUNT(*) AS sessions, COUNT(w.neto) AS count, COALESCE(SUM(w.neto), 0) AS amount, "
+        "COALESCE(MAX(rp.rate), MAX(ra.rate), 0) AS rate "
+        "FROM Weighings w "
+        "JOIN Trucks t ON t.id = w.truck "
+        "LEFT JOIN Rates rp ON rp.product_id = w.produce AND rp.scope = CAST(t.provider_id AS CHAR) "
+        "LEFT JOIN Rates ra ON ra.product_id = w.produce AND ra.scope = 'All' "
+        "WHERE w.direction = 'in' AND w.datetime BETWEEN %s AND %s "
+    )
+    params = [parse_datetime(from_date), parse_datetime(to_date)]
+    if provider_id is not None:
+        query += "AND t.provider_id = %s "
+        params.append(provider_id)
+    query += "GROUP BY t.provider_id, w.produce ORDER BY t.provider_id, MIN(w.id)"
+    
+    cursor.execute(query, params)
+    totals = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return totals
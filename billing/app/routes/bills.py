@@ -2,10 +2,27 @@
 # BILLING ENDPOINT
 # =============================================================================
 # GET /bill/<id> - Generate billing report for a provider
+# GET /bills      - Generate the billing reports of all providers
+# GET /bills/export - All providers' bills as one CSV / XLSX spreadsheet
+# POST /bill-snapshots/invalidate - Drop stored bills of a changed period
+# POST /bill-jobs              - Compute a bill in the background
+# GET /bill-jobs/<id>          - Status of a background bill
+# GET /bill-jobs/<id>/result   - Result of a finished background bill
 
-from flask import Blueprint, jsonify, request
+import csv
+import os
+import tempfile
+from flask import Blueprint, jsonify, request, url_for, send_file, stream_with_context, current_app
+from openpyxl import Workbook
 from app.models.provider import get_provider
-from app.services.billing_service import calculate_bill
+from app.services.billing_service import (
+    calculate_bill, calculate_all_bills, iter_bills, bill_rows, BILL_EXPORT_COLUMNS
+)
+from app.services.bill_jobs import submit_bill_job, get_job
+from app.services.weight_sync import refresh_weighings
+from app.models.bill_snapshot import delete_bill_snapshots
+from app.models.bill_segment import delete_bill_segments
+from app.models.bill_job import DONE, FAILED
 
 bills_bp = Blueprint('bills', __name__)
 
@@ -58,4 +75,245 @@ def get_bill(provider_id):
         # Weight service is unreachable
         return jsonify({'error': f'Weight service unavailable: {str(e)}'}), 503
     except Exception as e:
-        return jsonify({'error': f'Failed to calculate bill: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Failed to calculate bill: {str(e)}'}), 500
+
+
+@bills_bp.route('/bills', methods=['GET'])
+def get_all_bills():
+    """
+    Generate the billing reports of all providers for one period
+    (month-end run). Weight data is fetched once for all providers.
+    
+    Query params:
+        from, to: yyyymmddhhmmss (same defaults as GET /bill/<id>)
+    
+    Returns:
+        [ <bill as in GET /bill/<id>>, ... ]  ordered by provider id
+    """
+    from_date = request.args.get('from')
+    to_date = request.args.get('to')
+    
+    try:
+        bills = calculate_all_bills(from_date, to_date)
+        return jsonify(bills), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ConnectionError as e:
+        return jsonify({'error': f'Weight service unavailable: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate bills: {str(e)}'}), 500
+
+
+class _LineBuffer:
+    """File-like target for csv.writer that hands back each written line."""
+    def write(self, line):
+        return line
+
+
+def stream_bills_csv(bills):
+    """CSV lines of the bills export, produced one bill at a time."""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(BILL_EXPORT_COLUMNS)
+    for bill in bills:
+        for row in bill_rows(bill):
+            yield writer.writerow(row)
+
+
+def write_bills_xlsx(bills):
+    """
+    Write the bills export to a temp XLSX file with a streaming (write-only)
+    workbook and return its path.
+    """
+    fd, file_path = tempfile.mkstemp(prefix='bills-', suffix='.xlsx')
+    os.close(fd)
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Bills")
+        ws.append(BILL_EXPORT_COLUMNS)
+        for bill in bills:
+            for row in bill_rows(bill):
+                ws.append(row)
+        wb.save(file_path)
+    except Exception:
+        os.remove(file_path)
+        raise
+    return file_path
+
+
+@bills_bp.route('/bills/export', methods=['GET'])
+def export_bills():
+    """
+    All providers' bills of one period as a single spreadsheet: one row per
+    provider and product, with the columns of the bill's "products" entries.
+    Bills are built one provider at a time and written out as they are built.
+    
+    Query params:
+        from, to: yyyymmddhhmmss (same defaults as GET /bill/<id>)
+        format: csv (default) or xlsx
+    
+    Returns:
+        provider_id,provider_name,from,to,product,count,amount,rate,pay
+        10001,Fresh Farms,20240101000000,20240131235959,Navel,3,15000,93,1395000
+        ...
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'xlsx'):
+        return jsonify({'error': 'format must be csv or xlsx'}), 400
+    
+    try:
+        # Weighings are fetched here, so errors are reported before streaming
+        bills = iter_bills(request.args.get('from'), request.args.get('to'))
+        
+        if export_format == 'xlsx':
+            file_path = write_bills_xlsx(bills)
+            xlsx_file = open(file_path, 'rb')
+            os.remove(file_path)  # Gone once the download closes the file
+            return send_file(
+                xlsx_file,
+                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                as_attachment=True,
+                download_name="bills.xlsx"
+            )
+        
+        response = current_app.response_class(
+            stream_with_context(stream_bills_csv(bills)),
+            mimetype='text/csv'
+        )
+        response.headers['Content-Disposition'] = 'attachment; filename=bills.csv'
+        return response
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ConnectionError as e:
+        return jsonify({'error': f'Weight service unavailable: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'error': f'Failed to export bills: {str(e)}'}), 500
+
+
+@bills_bp.route('/bill-snapshots/invalidate', methods=['POST'])
+def invalidate_bill_snapshots():
+    """
+    Drop the stored bills (and per-day aggregates) whose period overlaps [from, to].
+    Called by the Weight service when weighings are force-updated.
+    With WEIGHT_SYNC on, the Weighings replica of [from, to] is re-pulled
+    first, so recomputed bills see the changed rows.
+    
+    Body:
+        {"from": "yyyymmddhhmmss", "to": "yyyymmddhhmmss"}
+    
+    Returns:
+        {"deleted": 3, "deleted_segments": 1, "refreshed": 2}
+    """
+    data = request.get_json(silent=True) or {}
+    from_date = str(data.get('from', ''))
+    to_date = str(data.get('to', ''))
+    
+    for value in (from_date, to_date):
+        if len(value) != 14 or not value.isdigit():
+            return jsonify({'error': 'from and to are required as yyyymmddhhmmss'}), 400
+    
+    try:
+        refreshed = 0
+        if current_app.config['WEIGHT_SYNC']:
+            refreshed = refresh_weighings(from_date, to_date)
+        deleted = delete_bill_snapshots(from_date, to_date)
+        deleted_segments = delete_bill_segments(from_date, to_date)
+        return jsonify({
+            'deleted': deleted,
+            'deleted_segments': deleted_segments,
+            'refreshed': refreshed
+        }), 200
+    except ConnectionError as e:
+        return jsonify({'error': f'Weight service unavailable: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'error': f'Failed to invalidate bills: {str(e)}'}), 500
+
+
+def job_status(job):
+    """Status document of a bill job (without its result)."""
+    status = {
+        'id': job['id'],
+        'provider_id': job['provider_id'],
+        'from': job['from_date'],
+        'to': job['to_date'],
+        'status': job['status'],
+        'status_url': url_for('bills.get_bill_job_status', job_id=job['id']),
+        'result_url': url_for('bills.get_bill_job_result', job_id=job['id'])
+    }
+    if job['status'] == FAILED:
+        status['error'] = job['error']
+    return status
+
+
+@bills_bp.route('/bill-jobs', methods=['POST'])
+def create_bill_job():
+    """
+    Compute a bill in the background, for bills that take longer than the
+    reverse proxy waits. Poll the status URL, then fetch the result URL.
+    
+    Body (all optional):
+        {"provider_id": 10001, "from": "yyyymmddhhmmss", "to": "yyyymmddhhmmss"}
+        Without provider_id the bills of all providers are computed (GET /bills).
+    
+    Returns (202, Location: status URL):
+        {"id": "3f2a...", "status": "queued", "status_url": "...", "result_url": "...", ...}
+    """
+    data = request.get_json(silent=True) or {}
+    provider_id = data.get('provider_id')
+    
+    if provider_id is not None:
+        try:
+            provider_id = int(provider_id)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'provider_id must be an integer'}), 400
+        if not get_provider(provider_id):
+            return jsonify({'error': f'Provider {provider_id} not found'}), 404
+    
+    try:
+        job_id = submit_bill_job(provider_id, data.get('from'), data.get('to'))
+        job = get_job(job_id)
+        response = jsonify(job_status(job))
+        response.headers['Location'] = url_for('bills.get_bill_job_status', job_id=job_id)
+        return response, 202
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to submit bill job: {str(e)}'}), 500
+
+
+@bills_bp.route('/bill-jobs/<job_id>', methods=['GET'])
+def get_bill_job_status(job_id):
+    """
+    Status of a bill job: queued, running, done or failed (with "error").
+    """
+    try:
+        job = get_job(job_id)
+    except Exception as e:
+        return jsonify({'error': f'Failed to get bill job: {str(e)}'}), 500
+    
+    if not job:
+        return jsonify({'error': f'Bill job {job_id} not found'}), 404
+    return jsonify(job_status(job)), 200
+
+
+@bills_bp.route('/bill-jobs/<job_id>/result', methods=['GET'])
+def get_bill_job_result(job_id):
+    """
+    Result of a bill job: the bill (or list of bills) once it is done.
+    202 with the status while it is still queued or running.
+    """
+    try:
+        job = get_job(job_id)
+    except Exception as e:
+        return jsonify({'error': f'Failed to get bill job: {str(e)}'}), 500
+    
+    if not job:
+        return jsonify({'error': f'Bill job {job_id} not found'}), 404
+    if job['status'] == DONE:
+        return jsonify(job['result']), 200
+    if job['status'] == FAILED:
+        code = 503 if job['error'].startswith('Weight service unavailable') else 500
+        return jsonify({'error': job['error']}), code
+    return jsonify(job_status(job)), 202
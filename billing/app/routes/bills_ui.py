@@ -1,14 +1,19 @@
 # app/routes/bills_ui.py
 
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, redirect, url_for
 from datetime import datetime
 
-from app.models.provider import get_all_providers, get_provider
-from app.services.billing_service import calculate_bill
+from app.models.provider import get_provider
+from app.models.bill_job import DONE, FAILED
+from app.services.bill_jobs import submit_bill_job, get_job
+from app.routes.provider_ui import provider_page
 
 # Blueprint for Bills UI endpoints
 ui_bills_bp = Blueprint("ui_bills_bp", __name__)
 
+# How often the page reloads while a bill job is running
+JOB_POLL_SECONDS = 2
+
 
 def build_api_datetime(date_str, time_str):
     """
@@ -34,16 +39,32 @@ def build_api_datetime(date_str, time_str):
         return None
 
 
+def pretty_period(bill):
+    """
+    Human-readable "from" / "to" of a bill for the UI.
+    """
+    try:
+        from_dt = datetime.strptime(bill["from"], "%Y%m%d%H%M%S")
+        to_dt = datetime.strptime(bill["to"], "%Y%m%d%H%M%S")
+        return from_dt.strftime("%Y-%m-%d %H:%M"), to_dt.strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        # Fallback: just show raw strings
+        return bill.get("from"), bill.get("to")
+
+
 @ui_bills_bp.route("/bills-ui", methods=["GET", "POST"])
 def bills_home():
     """
     UI page for generating billing reports (similar to GET /bill/<id>?from=&to=).
 
     Supported action (by form_type):
-      - "bill_generate" → generate a bill for a provider in a date range.
+      - "bill_generate" → queue a bill for a provider in a date range and
+        redirect to ?job=<id>, which refreshes until the bill is ready.
     """
     error_message = None
     success_message = None
+    pending_message = None
+    refresh_seconds = None
     bill = None
     from_pretty = None
     to_pretty = None
@@ -150,63 +171,64 @@ def bills_home():
                     except ValueError:
                         error_message = "Internal error: invalid timestamps built for API."
 
-            # ----- Call billing service -----
+            # ----- Queue the bill; the page polls until it is ready -----
             if not error_message:
                 try:
                     if any_date_time:
                         # User provided a custom range → use from_ts/to_ts
-                        bill = calculate_bill(provider_id, from_ts, to_ts)
+                        job_id = submit_bill_job(provider_id, from_ts, to_ts)
                     else:
                         # No date/time given → let service apply its own defaults
-                        bill = calculate_bill(provider_id, None, None)
-
-                    # Build human-readable dates for UI:
-                    if bill:
-                        # If we already built from_dt/to_dt above, reuse them
-                        if from_dt and to_dt:
-                            from_pretty = from_dt.strftime("%Y-%m-%d %H:%M")
-                            to_pretty = to_dt.strftime("%Y-%m-%d %H:%M")
-                        else:
-                            # Parse from service's "from" / "to" if needed
-                            try:
-                                from_dt = datetime.strptime(bill["from"], "%Y%m%d%H%M%S")
-                                to_dt = datetime.strptime(bill["to"], "%Y%m%d%H%M%S")
-                                from_pretty = from_dt.strftime("%Y-%m-%d %H:%M")
-                                to_pretty = to_dt.strftime("%Y-%m-%d %H:%M")
-                            except Exception:
-                                # Fallback: just show raw strings
-                                from_pretty = bill.get("from")
-                                to_pretty = bill.get("to")
-
-                    success_message = "Bill generated successfully."
+                        job_id = submit_bill_job(provider_id, None, None)
+                    return redirect(url_for("ui_bills_bp.bills_home", job=job_id))
 
                 except ValueError as e:
-                    # Invalid dates or provider not found (as raised by service)
+                    # Invalid dates (as raised by service)
                     error_message = str(e)
-                    bill = None
-                except ConnectionError as e:
-                    # Weight service unreachable
-                    error_message = f"Weight service unavailable: {str(e)}"
-                    bill = None
                 except Exception:
                     error_message = "Failed to calculate bill."
-                    bill = None
+
+    # ----- Poll a queued bill job (?job=<id>) -----
+    job_id = request.args.get("job")
+    if request.method == "GET" and job_id:
+        try:
+            job = get_job(job_id)
+        except Exception:
+            job = None
+            error_message = "Failed to load bill job."
+
+        if job is None:
+            if not error_message:
+                error_message = "Bill job not found."
+        elif job["status"] == DONE:
+            bill = job["result"]
+            from_pretty, to_pretty = pretty_period(bill)
+            success_message = "Bill generated successfully."
+        elif job["status"] == FAILED:
+            error_message = job["error"] or "Failed to calculate bill."
+        else:
+            # Still queued or running → reload the page shortly
+            refresh_seconds = JOB_POLL_SECONDS
+            pending_message = "Bill is being generated, this page refreshes automatically..."
 
     # Always load providers for the dropdown
     try:
-        providers = get_all_providers()
+        page = provider_page()
     except Exception:
-        providers = []
+        page = {"providers": [], "search": "", "after": None, "next_after": None}
         if not error_message:
             error_message = "Failed to load providers."
 
     return render_template(
         "bills.html",
-        providers=providers,
+        page=page,
+        providers=page["providers"],
         bill=bill,
         from_pretty=from_pretty,
         to_pretty=to_pretty,
         error_message=error_message,
         success_message=success_message,
+        pending_message=pending_message,
+        refresh_seconds=refresh_seconds,
     )
 
@@ -0,0 +1,25 @@
+from flask import Blueprint, jsonify
+from app.utils import get_pool_stats
+from app.services.weight_client import get_connection_stats, get_breaker_stats
+from app.services.weight_sync import get_sync_stats
+from app.services.billing_service import bill_flights
+from app.services.bill_jobs import get_job_stats
+
+# Create Blueprint for metrics routes
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.get("/metrics")
+def metrics():
+    """
+    GET /metrics
+    Runtime counters of this process (connection pool, ...).
+    """
+    return jsonify({
+        "db_pool": get_pool_stats(),
+        "weight_http": get_connection_stats(),
+        "weight_breaker": get_breaker_stats(),
+        "weighings_sync": get_sync_stats(),
+        "bill_coalescing": bill_flights.stats(),
+        "bill_jobs": get_job_stats(),
+    }), 200
@@ -1,5 +1,8 @@
-from flask import request, jsonify             
+import os
+from flask import request, jsonify, current_app
+from mysql.connector.errors import IntegrityError
 from app.models.provider import create_provider, get_provider, get_provider_by_name, update_provider     
+from app.services.bulk_import import import_providers
 from flask import Blueprint  
 
 providers_bp = Blueprint("providers", __name__) 
@@ -28,7 +31,11 @@ def add_new_provider():
         return jsonify({"error": "This provider name already exists."}), 409
 
     # Create a new Provider instance and save it to the database
-    provider_id = create_provider(provider_name)
+    try:
+        provider_id = create_provider(provider_name)
+    except IntegrityError:
+        # Same name created concurrently (unique key on Provider.name)
+        return jsonify({"error": "This provider name already exists."}), 409
 
     # Return only the generated provider ID as required — HTTP 201 = Created
     return jsonify({"id": str(provider_id)}), 201
@@ -64,9 +71,43 @@ def put_provider(provider_id):
         return jsonify({'error': 'Provider with this name already exists'}), 409
 
     # Check if updating provider name worked
-    success = update_provider(provider_id, name_stripped)
+    try:
+        success = update_provider(provider_id, name_stripped)
+    except IntegrityError:
+        return jsonify({'error': 'Provider with this name already exists'}), 409
     
     if success:
         return jsonify({'id': provider_id, 'name': name_stripped}), 200
     else:
         return jsonify({'error': 'Failed to update provider'}), 500
+
+
+@providers_bp.route('/providers/import', methods=['POST'])
+def post_providers_import():
+    """
+    Register many providers from a CSV/XLSX file in IMPORT_DIR (/app/in)
+    (column 'Name'). Rows that fail validation are reported and skipped.
+
+    Body:
+        {"file": "providers.xlsx"}
+
+    Returns:
+        {"created": 2, "failed": 1, "rows": [
+            {"row": 2, "status": "created", "id": "10001"},
+            {"row": 3, "status": "error", "error": "This provider name already exists."}, ...]}
+    """
+    payload = request.get_json(silent=True)
+    if not payload or "file" not in payload:
+        return jsonify({"error": "file parameter is required"}), 400
+
+    filename = os.path.basename(str(payload["file"]))
+    filepath = os.path.join(current_app.config["IMPORT_DIR"], filename)
+    if not os.path.exists(filepath):
+        return jsonify({"error": f"File {filename} not found in /in folder"}), 404
+
+    try:
+        return jsonify(import_providers(filepath)), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid file format: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to import providers: {str(e)}"}), 500
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, request
 from app.models.provider import (
     create_provider,
-    get_all_providers,
+    get_provider_directory,
     get_provider_by_name,
     get_provider,
     update_provider
@@ -10,6 +10,30 @@ from app.models.provider import (
 ui_provider_bp = Blueprint("ui_provider_bp", __name__)
 
 
+def provider_page():
+    """
+    The page of providers asked by the query string of a UI page:
+      ?q=<text>     only providers whose name contains it
+      ?after=<id>   providers after this id (keyset pagination)
+
+    Returns dict with providers, search, after and next_after (None on the
+    last page), read from the cached provider directory.
+    """
+    search = request.args.get("q", "").strip()
+    try:
+        after = int(request.args["after"])
+    except (KeyError, ValueError):
+        after = None
+
+    providers, next_after = get_provider_directory().page(after=after, search=search)
+    return {
+        "providers": providers,
+        "search": search,
+        "after": after,
+        "next_after": next_after,
+    }
+
+
 @ui_provider_bp.route("/provider-ui", methods=["GET", "POST"])
 def provider_home():
     error_message = None
@@ -68,11 +92,17 @@ def provider_home():
                             except Exception:
                                 error_message = "Failed to update provider."
 
-    providers = get_all_providers()
+    try:
+        page = provider_page()
+    except Exception:
+        page = {"providers": [], "search": "", "after": None, "next_after": None}
+        if not error_message:
+            error_message = "Failed to load providers."
 
     return render_template(
         "ui.html",
-        providers=providers,
+        page=page,
+        providers=page["providers"],
         error_message=error_message,
         success_message=success_message,
     )
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request, send_file, current_app
 import os
+import threading
 from app.services.rate_parser import parse_rates_file
-from app.models.rate import save_rates, get_all_rates
+from app.models.rate import save_rates, get_all_rates, rate_table
+from app.models.version import RATES, get_version
 from openpyxl import Workbook
 
 rates_bp = Blueprint("rates", __name__)
@@ -60,74 +62,115 @@ def post_rates():
         return jsonify({"error": f"Failed to process file: {str(e)}"}), 500
 
 
+def write_rates_export(file_path, rates):
+    """
+    Write the rates as an Excel file with a streaming (write-only) workbook.
+    Written to a temp file first, so a concurrent download never sees half a file.
+    Returns the file opened for reading, so it can be sent even if a newer
+    version's export removes it in the meantime.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Rates")
+
+    # Header row – match the upload format (nice headers)
+    ws.append(["Product", "Rate", "Scope"])
+
+    # Data rows from DB
+    for row in rates:
+        ws.append([row["product_id"], row["rate"], row["scope"]])
+
+    wb.save(tmp_path)
+    export = open(tmp_path, "rb")
+    os.replace(tmp_path, file_path)
+
+    # Exports of older rate versions are not needed anymore
+    export_dir = os.path.dirname(file_path)
+    for name in os.listdir(export_dir):
+        if name.startswith("rates-v") and name.endswith(".xlsx") and name != os.path.basename(file_path):
+            try:
+                os.remove(os.path.join(export_dir, name))
+            except OSError:
+                pass
+
+    return export
+
+
 @rates_bp.get("/rates")  # GET /rates
 def get_rates():
     """
     GET /rates
-    1. Fetch all rates from the database
-    2. If DB is empty → return 404
-    3. Otherwise: generate an Excel (.xlsx) file under /app/in
-    4. Return the Excel file for download
+    1. Look up the current rates version
+    2. Client already has this version (If-None-Match) → 304
+    3. Export for this version not generated yet → fetch rates from the DB
+       (empty → 404) and write the Excel file into RATES_EXPORT_DIR; rates
+       uploaded meanwhile → 503, the client retries
+    4. Return the Excel file for download, with the version as ETag
+       (opened before returning, a newer upload may remove it meanwhile)
     """
 
-    # 1) Try to fetch data from DB
+    # 1) Current version of the Rates table
     try:
-        rates = get_all_rates()
+        version = rate_table.current_version()
     except Exception:
-        current_app.logger.exception("Failed to fetch rates from database")
+        current_app.logger.exception("Failed to fetch rates version from database")
         return jsonify({"error": "Failed to load rates from database"}), 500
 
-    # 2) Handle case: no rates in DB
-    if not rates:
-        return (
-            jsonify(
-                {
-                    "error": "No rates found in the database.",
-                    "message": "Please upload rates first using POST /rates.",
-                }
-            ),
-            404,
-        )
-
-    # 3) Build a safe file path for the Excel file
-    file_path = os.path.join("/app", "in", "rates.xlsx")
-
-    # Make sure the directory exists (extra safety)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-    # 4) Generate the Excel file
-    try:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Rates"
+    etag = f"rates-v{version}"
+    file_path = os.path.join(current_app.config["RATES_EXPORT_DIR"], f"{etag}.xlsx")
 
-        # Header row – match the upload format (nice headers)
-        headers = ["Product", "Rate", "Scope"]
-        ws.append(headers)
+    # 2) Repeat download of the same version
+    if request.if_none_match.contains(etag) and os.path.exists(file_path):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
 
-        # Data rows from DB
-        for row in rates:
-            ws.append([row["product_id"], row["rate"], row["scope"]])
-
-        # Save the workbook to disk
-        wb.save(file_path)
+    try:
+        export = open(file_path, "rb")
+    except FileNotFoundError:
+        export = None
 
-        # Ensure the file is editable by all (rw-rw-rw-)
+    if export is None:
+        # 3) Fetch data from DB
         try:
-            os.chmod(file_path, 0o666)
-        except OSError:
-            # If chmod fails, we still allow download
-            current_app.logger.warning("Failed to chmod rates.xlsx to 666")
+            rates = get_all_rates()
+            changed = get_version(RATES) != version
+        except Exception:
+            current_app.logger.exception("Failed to fetch rates from database")
+            return jsonify({"error": "Failed to load rates from database"}), 500
 
-    except Exception:
-        current_app.logger.exception("Failed to generate Excel file for rates")
-        return jsonify({"error": "Failed to generate Excel file"}), 500
+        # Handle case: no rates in DB
+        if not rates:
+            return (
+                jsonify(
+                    {
+                        "error": "No rates found in the database.",
+                        "message": "Please upload rates first using POST /rates.",
+                    }
+                ),
+                404,
+            )
+
+        # Rates uploaded while reading them: this version's file must not get them
+        if changed:
+            response = jsonify({"error": "Rates changed while exporting, please retry"})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+
+        # Generate the Excel file
+        try:
+            export = write_rates_export(file_path, rates)
+        except Exception:
+            current_app.logger.exception("Failed to generate Excel file for rates")
+            return jsonify({"error": "Failed to generate Excel file"}), 500
 
-    # 5) Return the Excel file as a download to the client
+    # 4) Return the Excel file as a download to the client
     return send_file(
-        file_path,
+        export,
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         as_attachment=True,
         download_name="rates.xlsx",
+        etag=etag,
     )
-
@@ -1,10 +1,34 @@
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
-from app.models.truck import create_truck, get_provider_by_truck, update_truck, get_truck, get_truck_sessions
+from app.models.truck import (
+    create_truck, update_truck, get_truck, get_truck_sessions, get_trucks_sessions, get_truck_index
+)
 from app.models.provider import get_provider
+from app.services.bulk_import import import_trucks
 
 trucks_bp = Blueprint("trucks", __name__)
 
+# Most trucks one GET /trucks may ask for
+MAX_BATCH_TRUCKS = 1000
+
+
+def resolve_period(t1, t2):
+    """
+    Default from/to of truck info (1st of month → now).
+    Returns (from, to), or None if a given value isn't yyyymmddhhmmss.
+    """
+    now = datetime.now()
+    if not t2:
+        t2 = now.strftime("%Y%m%d%H%M%S")
+    if not t1:
+        first_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        t1 = first_of_month.strftime("%Y%m%d%H%M%S")
+
+    if not (len(t1) == 14 and t1.isdigit() and len(t2) == 14 and t2.isdigit()):
+        return None
+    return t1, t2
+
 
 @trucks_bp.route("/truck", methods=["POST"])
 def register_truck():
@@ -90,12 +114,12 @@ def update_truck_provider(truck_id):
         return jsonify({"error": "Provider must be an integer id"}), 400
 
     # Check that truck exists
-    existing_truck = get_truck(truck_id)
+    existing_truck = get_truck_index().find(truck_id)
     if not existing_truck:
         return jsonify({"error": "Truck not found"}), 404
     
     # Check if provided_id is the same as current provider_id
-    current_provider_id = get_provider_by_truck(truck_id)
+    current_provider_id = existing_truck["provider_id"]
     if provider_id == current_provider_id:
         return jsonify({"error": "The provider is already set to this value."}), 409
 
@@ -125,22 +149,14 @@ def get_truck_info(truck_id):
     }
     """
 
-    truck = get_truck(truck_id)
+    truck = get_truck_index().find(truck_id)
     if not truck:
         return jsonify({"error": "Truck not found"}), 404
 
-    t1 = request.args.get("from")
-    t2 = request.args.get("to")
-
-    now = datetime.now()
-    if not t2:
-        t2 = now.strftime("%Y%m%d%H%M%S")
-    if not t1:
-        first_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        t1 = first_of_month.strftime("%Y%m%d%H%M%S")
-
-    if not (len(t1) == 14 and t1.isdigit() and len(t2) == 14 and t2.isdigit()):
+    period = resolve_period(request.args.get("from"), request.args.get("to"))
+    if not period:
         return jsonify({"error": "from/to must be in format yyyymmddhhmmss"}), 400
+    t1, t2 = period
 
     sessions_info = get_truck_sessions(truck_id, t1, t2)
 
@@ -151,3 +167,89 @@ def get_truck_info(truck_id):
     }
 
     return jsonify(result), 200
+
+
+@trucks_bp.route("/trucks", methods=["GET"])
+def get_trucks_info():
+    """
+    GET /trucks?ids=<id1>,<id2>,...&from=t1&to=t2
+    GET /truck/<id> for many trucks at once: trucks are checked against the
+    in-memory truck index, their Weight service lookups run concurrently.
+    Returns:
+    {
+      "trucks": {
+        "<id1>": {"id": <str>, "tara": <int> or "na", "sessions": [ <id1>, ... ]},
+        ...
+      },
+      "not_found": [ <id>, ... ]
+    }
+    """
+    # Unique ids, in request order
+    truck_ids = list(dict.fromkeys(
+        truck_id.strip() for truck_id in request.args.get("ids", "").split(",") if truck_id.strip()
+    ))
+    if not truck_ids:
+        return jsonify({"error": "ids is required (comma separated truck ids)"}), 400
+    if len(truck_ids) > MAX_BATCH_TRUCKS:
+        return jsonify({"error": f"At most {MAX_BATCH_TRUCKS} trucks per request"}), 400
+
+    period = resolve_period(request.args.get("from"), request.args.get("to"))
+    if not period:
+        return jsonify({"error": "from/to must be in format yyyymmddhhmmss"}), 400
+    t1, t2 = period
+
+    truck_index = get_truck_index()
+    found = [truck_id for truck_id in truck_ids if truck_index.find(truck_id)]
+    found_ids = set(found)
+    not_found = [truck_id for truck_id in truck_ids if truck_id not in found_ids]
+
+    sessions_info = get_trucks_sessions(found, t1, t2)
+
+    return jsonify({
+        "trucks": {
+            truck_id: {
+                "id": truck_id,
+                "tara": sessions_info[truck_id]["tara"],
+                "sessions": sessions_info[truck_id]["session_ids"]
+            }
+            for truck_id in found
+        },
+        "not_found": not_found
+    }), 200
+
+
+@trucks_bp.route("/trucks/import", methods=["POST"])
+def post_trucks_import():
+    """
+    POST /trucks/import
+    Register many trucks from a CSV/XLSX file in IMPORT_DIR (/app/in)
+    (columns 'Id' and 'Provider' - a provider id or name).
+    Rows that fail validation are reported and skipped.
+    Body JSON example:
+    {
+      "file": "trucks.csv"
+    }
+    Returns:
+    {
+      "created": 1, "failed": 1,
+      "rows": [
+        {"row": 2, "status": "created", "id": "12-345-67", "provider": 10001},
+        {"row": 3, "status": "error", "error": "Truck already exists"}
+      ]
+    }
+    """
+    payload = request.get_json(silent=True)
+    if not payload or "file" not in payload:
+        return jsonify({"error": "file parameter is required"}), 400
+
+    filename = os.path.basename(str(payload["file"]))
+    filepath = os.path.join(current_app.config["IMPORT_DIR"], filename)
+    if not os.path.exists(filepath):
+        return jsonify({"error": f"File {filename} not found in /in folder"}), 404
+
+    try:
+        return jsonify(import_trucks(filepath)), 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid file format: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": "Failed to import trucks", "details": str(e)}), 500
@@ -7,10 +7,8 @@ from app.models.truck import (
     get_truck,
     get_truck_sessions,
 )
-from app.models.provider import (
-    get_all_providers,
-    get_provider,
-)
+from app.models.provider import get_provider
+from app.routes.provider_ui import provider_page
 
 # Blueprint for Truck UI endpoints
 ui_truck_bp = Blueprint("ui_truck_bp", __name__)
@@ -258,15 +256,16 @@ def truck_home():
 
     # Always load providers for the dropdowns
     try:
-        providers = get_all_providers()
+        page = provider_page()
     except Exception:
-        providers = []
+        page = {"providers": [], "search": "", "after": None, "next_after": None}
         if not error_message:
             error_message = "Failed to load providers."
 
     return render_template(
         "truck.html",
-        providers=providers,
+        page=page,
+        providers=page["providers"],
         error_message=error_message,
         success_message=success_message,
         truck_info=truck_info,
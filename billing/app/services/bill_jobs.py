@@ -0,0 +1,121 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.models.bill_job import (
+    QUEUED, RUNNING, DONE, FAILED,
+    create_bill_job, get_bill_job, update_bill_job, expire_bill_job, delete_old_bill_jobs
+)
+from app.services.billing_service import resolve_dates, calculate_bill, calculate_all_bills
+
+# One bounded worker pool per process, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+_pending = {}  # job id -> future of the jobs this process has not finished
+_job_stats = {
+    'submitted': 0,
+    'running': 0,
+    'done': 0,
+    'failed': 0,
+}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['BILL_JOB_WORKERS'],
+                thread_name_prefix='bill-job'
+            )
+    return _executor
+
+
+def _count(key, delta=1):
+    with _executor_lock:
+        _job_stats[key] += delta
+
+
+def _run_job(app, job_id, provider_id, from_date, to_date):
+    """Compute one job's bill(s) and store the result in Bill_jobs."""
+    with app.app_context():
+        _count('running')
+        try:
+            if not update_bill_job(job_id, RUNNING):
+                return  # Already expired while it was queued
+            if provider_id is None:
+                result = calculate_all_bills(from_date, to_date)
+            else:
+                result = calculate_bill(provider_id, from_date, to_date)
+            update_bill_job(job_id, DONE, result=result)
+            _count('done')
+        except ConnectionError as e:
+            _fail_job(app, job_id, f'Weight service unavailable: {e}')
+        except Exception as e:
+            app.logger.exception("Bill job %s failed", job_id)
+            _fail_job(app, job_id, f'Failed to calculate bill: {e}')
+        finally:
+            _count('running', -1)
+
+
+def _fail_job(app, job_id, error):
+    _count('failed')
+    try:
+        update_bill_job(job_id, FAILED, error=error[:255])
+    except Exception:
+        # Left queued/running; get_job expires it after BILL_JOB_TIMEOUT_MINUTES
+        app.logger.exception("Could not store the failure of bill job %s", job_id)
+
+
+def submit_bill_job(provider_id=None, from_date=None, to_date=None):
+    """
+    Queue the bill of one provider (or of all providers when provider_id is
+    None) on the worker pool. Dates are resolved and validated now, so the
+    job computes exactly the period it was asked for.
+    Returns the job id.
+    """
+    from_date, to_date = resolve_dates(from_date, to_date)
+    
+    delete_old_bill_jobs(current_app.config['BILL_JOB_TTL_HOURS'])
+    
+    job_id = uuid.uuid4().hex
+    create_bill_job(job_id, provider_id, from_date, to_date)
+    _count('submitted')
+    
+    app = current_app._get_current_object()
+    future = _get_executor().submit(_run_job, app, job_id, provider_id, from_date, to_date)
+    with _executor_lock:
+        _pending[job_id] = future
+    future.add_done_callback(lambda _: _forget(job_id))
+    return job_id
+
+
+def _forget(job_id):
+    with _executor_lock:
+        _pending.pop(job_id, None)
+
+
+def get_job(job_id):
+    """
+    Get a bill job (None if unknown). A job still queued or running
+    BILL_JOB_TIMEOUT_MINUTES after it started (or was submitted, if it never
+    started) is marked failed first: its worker stopped (process restart)
+    without storing an outcome. Jobs this process is still working on are
+    never expired.
+    """
+    job = get_bill_job(job_id)
+    with _executor_lock:
+        pending_here = job_id in _pending
+    if job and job['status'] in (QUEUED, RUNNING) and not pending_here:
+        minutes = current_app.config['BILL_JOB_TIMEOUT_MINUTES']
+        if expire_bill_job(job_id, minutes, f'Bill job did not finish within {minutes} minutes, please submit it again'):
+            job = get_bill_job(job_id)
+    return job
+
+
+def get_job_stats():
+    """Bill job counters of this process (for GET /metrics)."""
+    with _executor_lock:
+        stats = dict(_job_stats)
+    stats['workers'] = current_app.config['BILL_JOB_WORKERS']
+    return stats
@@ -1,12 +1,21 @@
-from datetime import datetime
-from app.models.provider import get_provider
-from app.models.truck import get_trucks_by_provider
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models.provider import get_provider, get_all_providers
+from app.models.truck import get_truck_index
 from app.models.rate import get_rate
-from app.services.weight_client import get_weight_data
+from app.models.version import RATES, TRUCKS, current_version
+from app.models.bill_snapshot import get_bill_snapshot, save_bill_snapshot
+from app.models.bill_segment import get_bill_segments, save_bill_segments
+from app.models.weighing import get_replica_bill_totals, get_sync_state
+from app.services.weight_client import get_weight_data, is_stale, flag_stale
+from app.utils.singleflight import SingleFlight
 
-def calculate_bill(provider_id, from_date=None, to_date=None):
+# Identical bills requested at the same time are computed once
+bill_flights = SingleFlight()
+
+def resolve_dates(from_date=None, to_date=None):
     """
-    Calculate the total bill for a provider.
+    Apply the default billing period and validate the dates.
     """
     # Handle default dates
     now = datetime.now()
@@ -26,30 +35,26 @@ def calculate_bill(provider_id, from_date=None, to_date=None):
     if len(to_date) != 14 or not to_date.isdigit():
         raise ValueError(f"Invalid to date format: {to_date}. Expected yyyymmddhhmmss")
     
-    # Get provider info
-    provider = get_provider(provider_id)
-    
-    # Get all trucks belonging to this provider
-    trucks = get_trucks_by_provider(provider_id)
-    
-    # Fetch all weighing data from Weight service
-    # filter='in' gets only incoming (delivery) weights
-    # weight_data = get_weight_data(from_date, to_date, filter_type='in')
+    return from_date, to_date
 
-    weight_data = get_weight_data(from_date, to_date, filter_type='in')
-    
-    
-    # Filter for this provider's trucks only
-    provider_sessions = [
-        session for session in weight_data
-        if session.get('truck') in trucks
-    ]
-    
-    # Calculate totals per product
+
+def is_closed_period(to_date):
+    """
+    A period is closed once it ended BILL_SNAPSHOT_AFTER_HOURS ago;
+    its bill no longer changes unless weighings are force-updated.
+    """
+    hours = current_app.config['BILL_SNAPSHOT_AFTER_HOURS']
+    return datetime.strptime(to_date, '%Y%m%d%H%M%S') <= datetime.now() - timedelta(hours=hours)
+
+
+def aggregate_sessions(sessions):
+    """
+    Totals per product of sessions, without rates:
+    {produce: {'count', 'amount'}}.
+    """
     products = {}
     
-
-    for session in provider_sessions:
+    for session in sessions:
         produce = session.get('produce', 'Unknown')
         neto = session.get('neto')
         
@@ -66,17 +71,115 @@ def calculate_bill(provider_id, from_date=None, to_date=None):
         
         # Initialize product entry if first occurrence
         if produce not in products:
-            # Look up rate: provider specific first, then global
-            rate = get_rate(produce, provider_id)
             products[produce] = {
                 'count': 0,      # Number of sessions
-                'amount': 0,     # Total weight in kg
-                'rate': rate     # Price per kg in agorot
+                'amount': 0      # Total weight in kg
             }
         
         products[produce]['count'] += 1
         products[produce]['amount'] += neto
     
+    return products
+
+
+def apply_rates(products, provider_id):
+    """
+    Add the rate of each product: provider specific first, then global.
+    """
+    return {
+        produce: dict(data, rate=get_rate(produce, provider_id))  # Price per kg in agorot
+        for produce, data in products.items()
+    }
+
+
+def build_bill(provider, trucks, provider_sessions, from_date, to_date):
+    """
+    Build a provider's bill from the sessions of its trucks.
+    """
+    products = apply_rates(aggregate_sessions(provider_sessions), provider['id'])
+    return format_bill(provider, len(trucks), len(provider_sessions), products, from_date, to_date)
+
+
+def split_days(from_date, to_date):
+    """
+    Split [from_date, to_date] at midnight into (part_from, part_to, day)
+    parts; day (yyyymmdd) is set for whole days only, not for partial edges.
+    """
+    start = datetime.strptime(from_date, '%Y%m%d%H%M%S')
+    end = datetime.strptime(to_date, '%Y%m%d%H%M%S')
+    
+    parts = []
+    while start <= end:
+        day_end = start.replace(hour=23, minute=59, second=59)
+        part_end = min(day_end, end)
+        whole_day = start.time() == datetime.min.time() and part_end == day_end
+        parts.append((
+            start.strftime('%Y%m%d%H%M%S'),
+            part_end.strftime('%Y%m%d%H%M%S'),
+            start.strftime('%Y%m%d') if whole_day else None
+        ))
+        start = day_end + timedelta(seconds=1)
+    return parts
+
+
+def segmented_bill_totals(provider_id, trucks, from_date, to_date):
+    """
+    Session count and product totals (without rates) of a provider's range.
+    Closed whole days come from Bill_segments (or are computed once and
+    stored); the partial edges and days that are still open are fetched fresh,
+    consecutive ones in a single call.
+    """
+    parts = split_days(from_date, to_date)
+    closed_days = {day for _, part_to, day in parts if day and is_closed_period(part_to)}
+    trucks_version = current_version(TRUCKS)
+    cached = get_bill_segments(provider_id, trucks_version, min(closed_days), max(closed_days)) if closed_days else {}
+    
+    session_count = 0
+    products = {}
+    new_segments = []
+    
+    def fetch(part_from, part_to):
+        sessions = [
+            session for session in get_weight_data(part_from, part_to, filter_type='in')
+            if session.get('truck') in trucks
+        ]
+        return len(sessions), aggregate_sessions(sessions)
+    
+    def add(count, part_products):
+        nonlocal session_count
+        session_count += count
+        for produce, data in part_products.items():
+            totals = products.setdefault(produce, {'count': 0, 'amount': 0})
+            totals['count'] += data['count']
+            totals['amount'] += data['amount']
+    
+    run = None  # Consecutive parts computed fresh together
+    for part_from, part_to, day in parts:
+        if day not in closed_days:
+            run = (run[0], part_to) if run else (part_from, part_to)
+            continue
+        if run:
+            add(*fetch(*run))
+            run = None
+        if day in cached:
+            add(*cached[day])
+        else:
+            segment = fetch(part_from, part_to)
+            new_segments.append((day, *segment))
+            add(*segment)
+    if run:
+        add(*fetch(*run))
+    
+    # Days read from cached Weight data while the service was down aren't stored
+    if not is_stale():
+        save_bill_segments(provider_id, trucks_version, new_segments)
+    return session_count, products
+
+
+def format_bill(provider, truck_count, session_count, products, from_date, to_date):
+    """
+    The bill response: products is {produce: {'count', 'amount', 'rate'}}.
+    """
     # Build product list with payment calculations
     product_list = []
     total = 0
@@ -94,12 +197,186 @@ def calculate_bill(provider_id, from_date=None, to_date=None):
         })
     
     return {
-        'id': str(provider_id),               # String as per spec
+        'id': str(provider['id']),            # String as per spec
         'name': provider['name'],
         'from': from_date,
         'to': to_date,
-        'truckCount': len(trucks),
-        'sessionCount': len(provider_sessions),
+        'truckCount': truck_count,
+        'sessionCount': session_count,
         'products': product_list,
         'total': total                        # Int (agorot)
     }
+
+
+def replica_bill_totals(from_date, to_date, provider_id=None):
+    """
+    Session counts and product totals per provider from the local
+    weighings replica: {provider_id: (session_count, products)}.
+    """
+    totals = {}
+    for row in get_replica_bill_totals(from_date, to_date, provider_id):
+        session_count, products = totals.get(row['provider_id'], (0, {}))
+        # Products without any known neto aren't billed, like in build_bill
+        if row['count']:
+            products[row['product']] = {
+                'count': row['count'],
+                'amount': int(row['amount']),
+                'rate': row['rate']
+            }
+        totals[row['provider_id']] = (session_count + row['sessions'], products)
+    return totals
+
+
+def calculate_bill(provider_id, from_date=None, to_date=None):
+    """
+    Calculate the total bill for a provider.
+    Concurrent calls for the same provider and period share one computation.
+    """
+    from_date, to_date = resolve_dates(from_date, to_date)
+    
+    bill = bill_flights.do(
+        ('bill', int(provider_id), from_date, to_date),
+        lambda: _calculate_bill(provider_id, from_date, to_date)
+    )
+    if bill.get('stale'):
+        flag_stale()  # Also for callers that waited on another request
+    return bill
+
+
+def _calculate_bill(provider_id, from_date, to_date):
+    # Get provider info
+    provider = get_provider(provider_id)
+    
+    # Closed periods are served from the stored bill
+    snapshot_key = None
+    if is_closed_period(to_date):
+        snapshot_key = (provider_id, from_date, to_date, current_version(RATES), current_version(TRUCKS))
+        bill = get_bill_snapshot(*snapshot_key)
+        if bill:
+            bill['name'] = provider['name']  # Renames don't invalidate snapshots
+            return bill
+    
+    # Get all trucks belonging to this provider
+    trucks = get_truck_index().trucks_of.get(provider_id, set())
+    
+    if current_app.config['BILL_SOURCE'] == 'replica':
+        # One SQL query over the local weighings replica
+        session_count, products = replica_bill_totals(from_date, to_date, provider_id).get(provider_id, (0, {}))
+        bill = format_bill(provider, len(trucks), session_count, products, from_date, to_date)
+        if snapshot_key:
+            # Stored only once a sync run that started after the period caught up,
+            # a replica that is behind may still miss weighings of it
+            synced_at = get_sync_state()['synced_at']
+            if synced_at and synced_at > datetime.strptime(to_date, '%Y%m%d%H%M%S'):
+                save_bill_snapshot(*snapshot_key, bill)
+            else:
+                bill['stale'] = True
+        return bill
+    
+    if current_app.config['BILL_SEGMENT_CACHE']:
+        # Closed days from stored aggregates, only the rest from the Weight service
+        session_count, products = segmented_bill_totals(provider_id, trucks, from_date, to_date)
+        bill = format_bill(
+            provider, len(trucks), session_count, apply_rates(products, provider_id), from_date, to_date
+        )
+    else:
+        # Fetch all weighing data from Weight service
+        # filter='in' gets only incoming (delivery) weights
+        weight_data = get_weight_data(from_date, to_date, filter_type='in')
+        
+        # Filter for this provider's trucks only
+        provider_sessions = [
+            session for session in weight_data
+            if session.get('truck') in trucks
+        ]
+        
+        bill = build_bill(provider, trucks, provider_sessions, from_date, to_date)
+    if is_stale():
+        # Built from cached Weight data while the service was down - never stored
+        bill['stale'] = True
+    elif snapshot_key:
+        save_bill_snapshot(*snapshot_key, bill)
+    return bill
+
+
+def calculate_all_bills(from_date=None, to_date=None):
+    """
+    Calculate the bills of all providers for one period.
+    The weighings are fetched once and split by the truck → provider index.
+    Concurrent calls for the same period share one computation.
+    """
+    from_date, to_date = resolve_dates(from_date, to_date)
+    
+    bills = bill_flights.do(
+        ('bills', from_date, to_date),
+        lambda: list(iter_bills(from_date, to_date))
+    )
+    if any(bill.get('stale') for bill in bills):
+        flag_stale()
+    return bills
+
+
+def iter_bills(from_date=None, to_date=None):
+    """
+    The bills of all providers, as a generator yielding one bill at a time.
+    The weighings are fetched (and errors raised) before the first bill, then
+    each bill is built only when it is consumed.
+    """
+    from_date, to_date = resolve_dates(from_date, to_date)
+    
+    providers = get_all_providers()
+    truck_index = get_truck_index()
+    
+    if current_app.config['BILL_SOURCE'] == 'replica':
+        totals = replica_bill_totals(from_date, to_date)
+        
+        def replica_bills():
+            for provider in providers:
+                yield format_bill(
+                    provider,
+                    len(truck_index.trucks_of.get(provider['id'], set())),
+                    *totals.get(provider['id'], (0, {})),
+                    from_date,
+                    to_date
+                )
+        return replica_bills()
+    
+    weight_data = get_weight_data(from_date, to_date, filter_type='in')
+    stale = is_stale()
+    
+    # Single pass over the weighings
+    sessions_by_provider = {}
+    for session in weight_data:
+        provider_id = truck_index.provider_of.get(session.get('truck'))
+        if provider_id is not None:
+            sessions_by_provider.setdefault(provider_id, []).append(session)
+    
+    def live_bills():
+        for provider in providers:
+            bill = build_bill(
+                provider,
+                truck_index.trucks_of.get(provider['id'], set()),
+                sessions_by_provider.pop(provider['id'], []),
+                from_date,
+                to_date
+            )
+            if stale:
+                bill['stale'] = True
+            yield bill
+    return live_bills()
+
+
+# Columns of the bill export: the provider, then a bill's 'products' entry
+BILL_EXPORT_COLUMNS = ['provider_id', 'provider_name', 'from', 'to', 'product', 'count', 'amount', 'rate', 'pay']
+
+
+def bill_rows(bill):
+    """
+    Export rows of one bill, one per product. A bill without products still
+    gets a row (product empty, zero amounts) so every provider is listed.
+    """
+    head = [bill['id'], bill['name'], bill['from'], bill['to']]
+    if not bill['products']:
+        yield head + ['', '0', 0, '', 0]
+    for item in bill['products']:
+        yield head + [item['product'], item['count'], item['amount'], item['rate'], item['pay']]
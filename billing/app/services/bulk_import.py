@@ -0,0 +1,147 @@
+import csv
+import os
+from openpyxl import load_workbook
+from app.models.provider import get_provider_directory, create_providers
+from app.models.truck import get_truck_index, create_trucks
+
+# Longest truck id accepted (as POST /truck)
+MAX_TRUCK_ID_LENGTH = 10
+
+
+def read_import_rows(filepath, columns):
+    """
+    Stream the rows of a CSV or XLSX file (first sheet) as
+    (row_number, {column: value}) for the required columns; header names
+    match case-insensitively. Row 1 is the header, empty rows are skipped.
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == '.csv':
+        with open(filepath, newline='', encoding='utf-8-sig') as f:
+            yield from _rows(csv.reader(f), columns)
+    elif extension in ('.xlsx', '.xlsm'):
+        wb = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            yield from _rows(wb.worksheets[0].iter_rows(values_only=True), columns)
+        finally:
+            wb.close()
+    else:
+        raise ValueError("File must be .csv or .xlsx")
+
+
+def _rows(rows, columns):
+    header = next(rows, None) or []
+    positions = {str(name).strip().lower(): i for i, name in enumerate(header) if name is not None}
+    missing = [column for column in columns if column.lower() not in positions]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    for row_number, row in enumerate(rows, start=2):
+        if all(value is None or str(value).strip() == '' for value in row):
+            continue
+        yield row_number, {
+            column: row[positions[column.lower()]] if positions[column.lower()] < len(row) else None
+            for column in columns
+        }
+
+
+def _text(value):
+    # Cell value as stripped text ('' for empty cells, 43 for 43.0)
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _name_key(name):
+    # Provider.name and Trucks.id compare case-insensitively in MySQL
+    return (name or '').rstrip().lower()
+
+
+def import_providers(filepath):
+    """
+    Register the providers of a file with a 'Name' column.
+    Rows are checked against one prefetch of the existing names; the valid
+    ones are inserted and committed in batches.
+    Returns {'created': n, 'failed': n, 'rows': [{'row', 'status', 'id' | 'error'}]}.
+    """
+    taken = {_name_key(provider['name']) for provider in get_provider_directory().providers}
+
+    report = []
+    new_names = []
+    for row_number, values in read_import_rows(filepath, ['Name']):
+        name = _text(values['Name'])
+        if not name:
+            report.append({'row': row_number, 'status': 'error', 'error': 'Provider name cannot be empty.'})
+        elif _name_key(name) in taken:
+            report.append({'row': row_number, 'status': 'error', 'error': 'This provider name already exists.'})
+        else:
+            taken.add(_name_key(name))
+            new_names.append(name)
+            report.append({'row': row_number, 'status': 'created', 'name': name})
+
+    ids = iter(create_providers(new_names) if new_names else [])
+    for entry in report:
+        if entry['status'] == 'created':
+            del entry['name']
+            provider_id = next(ids)
+            if provider_id is None:
+                # Taken by a provider created meanwhile
+                entry['status'] = 'error'
+                entry['error'] = 'This provider name already exists.'
+            else:
+                entry['id'] = str(provider_id)
+
+    return _summary(report)
+
+
+def import_trucks(filepath):
+    """
+    Register the trucks of a file with 'Id' and 'Provider' columns; Provider
+    is a provider id or name. Rows are checked against the in-memory truck
+    index and one prefetch of the providers; the valid ones are inserted and
+    committed in batches.
+    Returns {'created': n, 'failed': n, 'rows': [{'row', 'status', 'id' | 'error'}]}.
+    """
+    providers = get_provider_directory().providers
+    provider_ids = {provider['id'] for provider in providers}
+    provider_by_name = {_name_key(provider['name']): provider['id'] for provider in providers}
+    truck_index = get_truck_index()
+
+    report = []
+    new_trucks = []
+    taken = set()
+    for row_number, values in read_import_rows(filepath, ['Id', 'Provider']):
+        truck_id = _text(values['Id'])
+        provider = _text(values['Provider'])
+
+        if not truck_id:
+            error = 'Truck id cannot be empty'
+        elif len(truck_id) > MAX_TRUCK_ID_LENGTH:
+            error = f'Truck id must be at most {MAX_TRUCK_ID_LENGTH} characters'
+        elif _name_key(truck_id) in taken or truck_index.find(truck_id):
+            error = 'Truck already exists'
+        else:
+            provider_id = int(provider) if provider.isdigit() else provider_by_name.get(_name_key(provider))
+            error = None if provider_id in provider_ids else 'Provider not found'
+
+        if error:
+            report.append({'row': row_number, 'status': 'error', 'error': error})
+        else:
+            taken.add(_name_key(truck_id))
+            new_trucks.append((truck_id, provider_id))
+            report.append({'row': row_number, 'status': 'created', 'id': truck_id, 'provider': provider_id})
+
+    created = iter(create_trucks(new_trucks))
+    for entry in report:
+        if entry['status'] == 'created' and not next(created):
+            # Registered meanwhile
+            entry['status'] = 'error'
+            entry['error'] = 'Truck already exists'
+            del entry['id'], entry['provider']
+    return _summary(report)
+
+
+def _summary(report):
+    created = sum(1 for entry in report if entry['status'] == 'created')
+    return {'created': created, 'failed': len(report) - created, 'rows': report}
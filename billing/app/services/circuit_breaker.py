@@ -0,0 +1,70 @@
+import random
+import threading
+import time
+import requests
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The Weight service is considered down; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to one service.
+
+    closed    - calls go through; failure_threshold consecutive failures open it
+    open      - calls fail fast with CircuitOpenError for reset_timeout seconds
+                (plus up to 50% jitter, so workers don't probe in lockstep)
+    half_open - one probe call goes through; success closes, failure re-opens
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'short_circuited': 0, 'failures': 0, 'probes': 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the call may go through."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() >= self._open_until:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                self._stats['probes'] += 1
+                return
+            self._stats['short_circuited'] += 1
+        raise CircuitOpenError("Weight service circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._stats['failures'] += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._stats['opened'] += 1
+                self.state = self.OPEN
+                self._probing = False
+                self._open_until = time.monotonic() + self.reset_timeout * random.uniform(1.0, 1.5)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self.state
+            stats['consecutive_failures'] = self._failures
+        return stats
@@ -1,39 +1,90 @@
+import os
 import pandas as pd
+from openpyxl import load_workbook
 
-def parse_rates_file(filepath):
+REQUIRED_COLUMNS = ['Product', 'Rate', 'Scope']
+
+# Files larger than this are streamed row by row with openpyxl's read-only mode
+STREAMING_THRESHOLD_BYTES = 1024 * 1024
+
+
+def read_rates_sheet(filepath, streaming=None):
+    """
+    Read the first sheet into a DataFrame.
+    streaming=None picks the read-only openpyxl reader for large files.
+    """
+    if streaming is None:
+        streaming = os.path.getsize(filepath) > STREAMING_THRESHOLD_BYTES
+    if not streaming:
+        return pd.read_excel(filepath, engine='openpyxl')
+    
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        data = [row for row in rows]
+    finally:
+        wb.close()
+    
+    # Trailing empty rows are dropped, like pd.read_excel does
+    while data and all(value is None for value in data[-1]):
+        data.pop()
+    return pd.DataFrame.from_records(data, columns=list(header))
+
+
+def _first_row(mask):
+    # Sheet row number of the first True value (row 1 is the header)
+    return mask.values.argmax() + 2
+
+
+def normalize_scope(scope):
+    """
+    Scope as stored in the DB: empty → 'All', numbers → '43' (not 43.0),
+    anything else as text.
+    """
+    result = pd.Series('All', index=scope.index, dtype=object)
+    present = scope.notna()
+    if pd.api.types.is_numeric_dtype(scope):
+        result[present] = scope[present].astype('int64').astype(str)
+        return result
+    
+    is_text = scope.map(type).eq(str)
+    result[present & is_text] = scope[present & is_text]
+    numbers = present & ~is_text
+    result[numbers] = pd.to_numeric(scope[numbers]).astype('int64').astype(str)
+    return result
+
+
+def parse_rates_file(filepath, streaming=None):
     # Read Excel file
-    df = pd.read_excel(filepath)
+    df = read_rates_sheet(filepath, streaming)
     
     # Validate required columns exist
-    required_columns = ['Product', 'Rate', 'Scope']
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     if missing_columns:
         raise ValueError(f"Missing required columns: {missing_columns}")
     
-    rates = []
-    
-    for index, row in df.iterrows():
-        # Validate each row has data
-        product = row['Product']
-        rate = row['Rate']
-        scope = row['Scope']
-        
-        if pd.isna(product) or pd.isna(rate):
-            raise ValueError(f"Row {index + 2} has missing Product or Rate")
-        
-        # Convert scope to string
-        # 'All' stays as 'All', numbers become strings ('43' not 43)
-        if pd.isna(scope):
-            scope_str = 'All'
-        elif isinstance(scope, (int, float)):
-            scope_str = str(int(scope))
-        else:
-            scope_str = str(scope)
-        
-        rates.append({
-            'product_id': str(product).strip(),
-            'rate': int(rate),
-            'scope': scope_str
-        })
-    
-    return rates
+    if df.empty:
+        return []
+    df = df.reset_index(drop=True)
+    
+    # Validate each row has data
+    missing = df['Product'].isna() | df['Rate'].isna()
+    if missing.any():
+        raise ValueError(f"Row {_first_row(missing)} has missing Product or Rate")
+    
+    rates = pd.to_numeric(df['Rate'], errors='coerce')
+    invalid = rates.isna()
+    if invalid.any():
+        raise ValueError(f"Row {_first_row(invalid)} has invalid Rate")
+    
+    products = df['Product'].astype(str).str.strip()
+    rates = rates.astype('int64')
+    scopes = normalize_scope(df['Scope'])
+    
+    return [
+        {'product_id': product, 'rate': rate, 'scope': scope}
+        for product, rate, scope in zip(products.tolist(), rates.tolist(), scopes.tolist())
+    ]
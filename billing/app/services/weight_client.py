@@ -1,6 +1,220 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
-from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import current_app, g, has_app_context
+from app.services.circuit_breaker import CircuitBreaker
 
+# One keep-alive session and circuit breaker per process, created on first use
+_session = None
+_session_lock = threading.Lock()
+_breaker = None
+
+# Last good responses, served (flagged stale) while the Weight service is down
+_stale_cache = OrderedDict()  # (url, params) -> (stored_at, status_code, JSON body bytes)
+_stale_cache_bytes = 0
+_stale_cache_max_bytes = 50 * 1024 * 1024
+_stale_ttl = 300.0
+_stale_served = 0
+
+
+def get_http_session():
+    """
+    Shared requests.Session for all calls to the Weight service.
+    Connections are kept alive and reused; failed GETs are retried.
+    """
+    global _session, _breaker, _stale_ttl, _stale_cache_max_bytes
+    with _session_lock:
+        if _session is None:
+            _breaker = CircuitBreaker(
+                current_app.config['WEIGHT_BREAKER_FAILURES'],
+                current_app.config['WEIGHT_BREAKER_RESET']
+            )
+            _stale_ttl = current_app.config['WEIGHT_STALE_TTL']
+            _stale_cache_max_bytes = int(current_app.config['WEIGHT_STALE_CACHE_MB'] * 1024 * 1024)
+            retries = current_app.config['WEIGHT_RETRIES']
+            retry = Retry(
+                total=retries,
+                connect=retries,
+                read=retries,
+                status=retries,
+                backoff_factor=current_app.config['WEIGHT_RETRY_BACKOFF'],
+                backoff_jitter=current_app.config['WEIGHT_RETRY_JITTER'],
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(['GET']),
+                raise_on_status=False  # Let raise_for_status() report the last error
+            )
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=current_app.config['WEIGHT_POOL_SIZE'],
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+def _cache_key(url, params):
+    """
+    Stale-cache key of a GET. A 'to' within the last WEIGHT_STALE_TTL seconds
+    (default bills end now) is keyed as 'now', so the previous answer of a
+    range that keeps moving is found again.
+    """
+    params = dict(params or {})
+    to_date = params.get('to')
+    if to_date:
+        try:
+            ends_now = datetime.strptime(str(to_date), '%Y%m%d%H%M%S') >= datetime.now() - timedelta(seconds=_stale_ttl)
+        except ValueError:
+            ends_now = False
+        if ends_now:
+            params['to'] = 'now'
+    return url, tuple(sorted((name, str(value)) for name, value in params.items()))
+
+
+def _stale_response(key):
+    """The last good response for key if it is recent enough, marked as stale."""
+    global _stale_served
+    with _session_lock:
+        entry = _stale_cache.get(key)
+        if entry is None or time.monotonic() - entry[0] > _stale_ttl:
+            return None
+        _stale_served += 1
+    _, status_code, content = entry
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = key[0]
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'application/json'
+    response._content = content
+    response.from_stale_cache = True
+    return response
+
+
+def _store_response(key, response):
+    """
+    Keep the body of a good JSON answer, as received: the caller parses it
+    once, and the cache is capped by its total size (WEIGHT_STALE_CACHE_MB).
+    """
+    global _stale_cache_bytes
+    if not response.headers.get('Content-Type', '').startswith('application/json'):
+        return  # Only JSON answers are kept
+    content = response.content
+    if len(content) > _stale_cache_max_bytes:
+        return
+    with _session_lock:
+        old = _stale_cache.pop(key, None)
+        if old is not None:
+            _stale_cache_bytes -= len(old[2])
+        _stale_cache[key] = (time.monotonic(), response.status_code, content)
+        _stale_cache_bytes += len(content)
+        while _stale_cache_bytes > _stale_cache_max_bytes:
+            _, (_, _, dropped) = _stale_cache.popitem(last=False)
+            _stale_cache_bytes -= len(dropped)
+
+
+def http_get(url, params=None, stale_ok=False, **kwargs):
+    """
+    GET through the shared keep-alive session, guarded by the circuit breaker.
+    With stale_ok=True (the lookups bills need: /weight, /session, /item) good
+    responses are cached, and while the breaker is open (or the call fails)
+    the last good response of the last WEIGHT_STALE_TTL seconds is returned
+    instead, with response.from_stale_cache = True. Other calls just raise.
+    """
+    session = get_http_session()
+    key = _cache_key(url, params)
+
+    def fallback():
+        return _stale_response(key) if stale_ok else None
+
+    try:
+        _breaker.before_call()
+    except requests.exceptions.ConnectionError:
+        stale = fallback()
+        if stale is not None:
+            return stale
+        raise
+
+    try:
+        response = session.get(url, params=params, **kwargs)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        _breaker.record_failure()
+        stale = fallback()
+        if stale is not None:
+            return stale
+        raise
+    except BaseException:
+        # Any other error still ends the call (and a half-open probe)
+        _breaker.record_failure()
+        raise
+
+    if response.status_code >= 500:
+        _breaker.record_failure()
+        stale = fallback()
+        return stale if stale is not None else response
+
+    # 4xx answers (e.g. unknown session) still mean the service is up
+    _breaker.record_success()
+    if response.ok:
+        response.from_stale_cache = False
+        if stale_ok:
+            _store_response(key, response)
+    return response
+
+
+def mark_stale(response):
+    """Flag the current request as (partly) served from stale Weight data."""
+    if getattr(response, 'from_stale_cache', False) is True:
+        flag_stale()
+
+
+def flag_stale():
+    """Flag the current request as (partly) served from stale Weight data."""
+    if has_app_context():
+        g.weight_stale = True
+
+
+def is_stale():
+    """True if this request used stale Weight data (see mark_stale)."""
+    return has_app_context() and g.get('weight_stale', False)
+
+
+def get_breaker_stats():
+    """
+    Circuit breaker state and stale-cache counters (for GET /metrics).
+    """
+    stats = _breaker.stats() if _breaker is not None else {'state': CircuitBreaker.CLOSED}
+    with _session_lock:
+        stats['stale_served'] = _stale_served
+        stats['stale_cached'] = len(_stale_cache)
+        stats['stale_cached_bytes'] = _stale_cache_bytes
+    return stats
+
+
+def get_connection_stats():
+    """
+    New vs reused connections of the shared session (for GET /metrics).
+    """
+    new_connections = 0
+    requests_sent = 0
+    if _session is not None:
+        for adapter in {id(a): a for a in _session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                new_connections += pool.num_connections
+                requests_sent += pool.num_requests
+    return {
+        'requests': requests_sent,
+        'new_connections': new_connections,
+        'reused_connections': max(requests_sent - new_connections, 0)
+    }
 
 
 def get_item_from_weight(truck_id, from_date, to_date):
@@ -15,12 +229,103 @@ def get_item_from_weight(truck_id, from_date, to_date):
         "to": to_date
     }
 
-    resp = requests.get(url, params=params, timeout=3)
+    resp = http_get(url, params=params, stale_ok=True, timeout=current_app.config['WEIGHT_ITEM_TIMEOUT'])
     resp.raise_for_status()  
+    mark_stale(resp)
 
     return resp.json()
 
 
+def _fetch_item(url, params, timeout):
+    """
+    GET /item/<id> as (data, response); (None, None) if the lookup failed.
+    """
+    try:
+        response = http_get(url, params=params, stale_ok=True, timeout=timeout)
+        response.raise_for_status()
+        return response.json(), response
+    except Exception:
+        return None, None
+
+
+def fetch_items(truck_ids, from_date, to_date):
+    """
+    GET /item/<id>?from=&to= for every truck, at most WEIGHT_ITEM_CONCURRENCY
+    at a time and WEIGHT_ITEMS_DEADLINE seconds in total.
+    Returns {truck_id: data}, data is None for failed or unfinished lookups.
+    """
+    if not truck_ids:
+        return {}
+
+    base_url = current_app.config['WEIGHT_BASE_URL']
+    timeout = current_app.config['WEIGHT_ITEM_TIMEOUT']
+    workers = min(current_app.config['WEIGHT_ITEM_CONCURRENCY'], len(truck_ids))
+    params = {"from": from_date, "to": to_date}
+    get_http_session()  # Create the shared session here, inside the app context
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weight-item')
+    try:
+        futures = {
+            truck_id: executor.submit(_fetch_item, f"{base_url}/item/{truck_id}", params, timeout)
+            for truck_id in truck_ids
+        }
+        wait(futures.values(), timeout=current_app.config['WEIGHT_ITEMS_DEADLINE'])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    items = {}
+    for truck_id, future in futures.items():
+        data, response = future.result() if future.done() and not future.cancelled() else (None, None)
+        mark_stale(response)
+        items[truck_id] = data
+    return items
+
+
+def _fetch_session_detail(url, session_id, timeout):
+    """
+    GET /session/<id> as (detail, response), detail is None when the
+    Weight service has no such session.
+    """
+    try:
+        response = http_get(f"{url}/session/{session_id}", stale_ok=True, timeout=timeout)
+        response.raise_for_status()
+        return response.json(), response
+    except requests.exceptions.HTTPError:
+        return None, None
+
+
+def fetch_session_details(url, session_ids):
+    """
+    Fetch GET /session/<id> for every id, at most WEIGHT_SESSION_CONCURRENCY
+    at a time. Results keep the order of session_ids (None for skipped ones).
+    """
+    if not session_ids:
+        return []
+
+    timeout = current_app.config['WEIGHT_SESSION_TIMEOUT']
+    deadline = current_app.config['WEIGHT_SESSION_DEADLINE']
+    workers = min(current_app.config['WEIGHT_SESSION_CONCURRENCY'], len(session_ids))
+    get_http_session()  # Create the shared session here, inside the app context
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weight-session')
+    try:
+        futures = [
+            executor.submit(_fetch_session_detail, url, session_id, timeout)
+            for session_id in session_ids
+        ]
+        # All lookups together may not hold the bill longer than the deadline
+        _, not_done = wait(futures, timeout=deadline)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if not_done:
+        raise requests.exceptions.Timeout("GET /session exceeded its deadline")
+    results = [future.result() for future in futures]
+
+    for _, response in results:
+        mark_stale(response)
+    return [detail for detail, _ in results]
+
+
 def get_weight_data(from_date, to_date, filter_type='in'):
     """
     Fetch weighing data from Weight service with truck info.
@@ -29,16 +334,18 @@ def get_weight_data(from_date, to_date, filter_type='in'):
     
     try:
         # Step 1: Get all weighing sessions
-        response = requests.get(
+        response = http_get(
             f"{url}/weight",
             params={
                 'from': from_date,
                 'to': to_date,
                 'filter': filter_type
             },
-            timeout=10
+            stale_ok=True,
+            timeout=current_app.config['WEIGHT_TIMEOUT']
         )
         response.raise_for_status()
+        mark_stale(response)
         data = response.json()
         
         
@@ -54,40 +361,29 @@ def get_weight_data(from_date, to_date, filter_type='in'):
         
         
         # Step 2: For each session, get truck info from GET /session/<id>
+        sessions = [
+            session for session in sessions
+            if isinstance(session, dict) and session.get('id')
+        ]
+        details = fetch_session_details(url, [session.get('id') for session in sessions])
+
         enriched_sessions = []
-        for idx, session in enumerate(sessions):
-            
-            if not isinstance(session, dict):
-                continue
-            
-            session_id = session.get('id')
-            if not session_id:
-                continue
-            
-            
-            try:
-                session_detail = requests.get(
-                    f"{url}/session/{session_id}",
-                    timeout=5
-                )
-                session_detail.raise_for_status()
-                detail = session_detail.json()
-                
-                # Merge the data - truck comes from session detail
-                enriched_session = {
-                    'id': session.get('id'),
-                    'direction': session.get('direction'),
-                    'truck': detail.get('truck', 'na'),  # ← From GET /session
-                    'bruto': session.get('bruto'),
-                    'neto': session.get('neto'),
-                    'produce': session.get('produce'),
-                    'containers': session.get('containers', [])
-                }
-                enriched_sessions.append(enriched_session)
-                
-            except requests.exceptions.HTTPError as e:
-                # Skip this session if we can't get truck info
+        for session, detail in zip(sessions, details):
+            # Skip this session if we can't get truck info
+            if detail is None:
                 continue
+
+            # Merge the data - truck comes from session detail
+            enriched_session = {
+                'id': session.get('id'),
+                'direction': session.get('direction'),
+                'truck': detail.get('truck', 'na'),  # ← From GET /session
+                'bruto': session.get('bruto'),
+                'neto': session.get('neto'),
+                'produce': session.get('produce'),
+                'containers': session.get('containers', [])
+            }
+            enriched_sessions.append(enriched_session)
         
         return enriched_sessions
         
@@ -98,3 +394,31 @@ def get_weight_data(from_date, to_date, filter_type='in'):
     except requests.exceptions.HTTPError as e:
         raise Exception(f"Weight service error: {e.response.status_code}")
 
+
+
+def get_weight_sync_page(after, from_date=None, limit=1000, to_date=None):
+    """
+    One page of GET /weight/sync: transactions with id > after
+    (and from_date <= datetime <= to_date), ordered by id.
+    Returns {'results': [...], 'last_id': <int>}.
+    """
+    url = current_app.config['WEIGHT_BASE_URL']
+    params = {'after': after, 'limit': limit}
+    if from_date:
+        params['from'] = from_date
+    if to_date:
+        params['to'] = to_date
+    
+    try:
+        # A replica must never store stale pages as fresh rows (no stale_ok)
+        response = http_get(
+            f"{url}/weight/sync",
+            params=params,
+            timeout=current_app.config['WEIGHT_TIMEOUT']
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.ConnectionError:
+        raise ConnectionError("Cannot connect to Weight service")
+    except requests.exceptions.Timeout:
+        raise ConnectionError("Weight service timed out")
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app.models.weighing import (
+    get_sync_state, save_sync_state, save_synced_at, upsert_weighings, parse_datetime
+)
+from app.services.weight_client import get_weight_sync_page
+
+# One worker per process
+_worker = None
+_worker_lock = threading.Lock()
+_sync_stats = {
+    'runs': 0,
+    'errors': 0,
+    'pulled': 0,
+    'refreshed': 0,
+    'last_id': None,
+    'last_run': None,
+    'last_error': None,
+}
+
+
+def _pull(after, from_date=None, to_date=None):
+    """Pull pages of GET /weight/sync into Weighings; returns (rows, last_id, last_datetime)."""
+    batch = current_app.config['WEIGHT_SYNC_BATCH']
+    pulled = 0
+    last_datetime = None
+    while True:
+        page = get_weight_sync_page(after, from_date, batch, to_date)
+        rows = page.get('results', [])
+        upsert_weighings(rows)
+        pulled += len(rows)
+        for row in rows:
+            row_datetime = parse_datetime(row.get('datetime'))
+            if row_datetime and (last_datetime is None or row_datetime > last_datetime):
+                last_datetime = row_datetime
+        after = page.get('last_id', after)
+        if len(rows) < batch:
+            return pulled, after, last_datetime
+        if from_date is None:
+            # Advance the high-water mark page by page
+            save_sync_state(after, last_datetime)
+
+
+def sync_weighings():
+    """
+    One sync run:
+    1. pull the transactions above the stored high-water mark (last id)
+    2. re-pull the last WEIGHT_SYNC_LOOKBACK_HOURS, so rows rewritten with
+       force=True are refreshed too
+    Returns {'pulled': <new rows>, 'refreshed': <re-read rows>, 'last_id': <id>}.
+    """
+    started_at = datetime.now()
+    state = get_sync_state()
+    pulled, last_id, last_datetime = _pull(state['last_id'])
+    save_sync_state(last_id, last_datetime or state['last_datetime'])
+    # Caught up: everything written before this run started is in the replica
+    save_synced_at(started_at)
+
+    refreshed = 0
+    hours = current_app.config['WEIGHT_SYNC_LOOKBACK_HOURS']
+    if hours > 0:
+        lookback_from = (datetime.now() - timedelta(hours=hours)).strftime('%Y%m%d%H%M%S')
+        refreshed, _, _ = _pull(0, lookback_from)
+
+    with _worker_lock:
+        _sync_stats['runs'] += 1
+        _sync_stats['pulled'] += pulled
+        _sync_stats['refreshed'] += refreshed
+        _sync_stats['last_id'] = last_id
+        _sync_stats['last_run'] = datetime.now().isoformat(timespec='seconds')
+    return {'pulled': pulled, 'refreshed': refreshed, 'last_id': last_id}
+
+
+def refresh_weighings(from_date, to_date):
+    """
+    Re-pull the transactions of [from_date, to_date] (yyyymmddhhmmss), for
+    rows rewritten with force=True before the WEIGHT_SYNC_LOOKBACK_HOURS window.
+    Returns the number of re-read rows.
+    """
+    refreshed, _, _ = _pull(0, from_date, to_date)
+    with _worker_lock:
+        _sync_stats['refreshed'] += refreshed
+    return refreshed
+
+
+def _run(app):
+    while True:
+        with app.app_context():
+            try:
+                sync_weighings()
+            except Exception as e:
+                app.logger.exception("Weighings sync failed")
+                with _worker_lock:
+                    _sync_stats['errors'] += 1
+                    _sync_stats['last_error'] = str(e)
+        time.sleep(app.config['WEIGHT_SYNC_INTERVAL'])
+
+
+def start_sync_worker(app):
+    """Start the background sync thread of this process (once)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, args=(app,), name='weighings-sync', daemon=True)
+            _worker.start()
+
+
+def get_sync_stats():
+    """Sync counters for GET /metrics."""
+    with _worker_lock:
+        stats = dict(_sync_stats)
+    stats['enabled'] = current_app.config['WEIGHT_SYNC']
+    return stats
@@ -1,11 +1,118 @@
-import mysql.connector
-from flask import current_app
+import threading
+import time
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+from flask import current_app, g
+
+# One pool per process, created on first use
+_pool = None
+_pool_lock = threading.Lock()
+_pool_stats = {
+    'acquired': 0,
+    'in_use': 0,
+    'waits': 0,
+    'wait_seconds': 0.0,
+    'max_wait_seconds': 0.0,
+    'timeouts': 0,
+}
+
+
+class RequestConnection:
+    """
+    The pooled connection shared by every model call of one request.
+
+    Models keep calling conn.close() after each query; the real connection
+    goes back to the pool when the app context ends (see close_db_connection).
+    Cursors are buffered so a fetchone() never leaves unread rows behind
+    for the next query on the same connection.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault('buffered', True)
+        return self._conn.cursor(*args, **kwargs)
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def get_pool():
+    """Return the process-wide connection pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(
+                pool_name='billing',
+                pool_size=current_app.config['DB_POOL_SIZE'],
+                host=current_app.config['DB_HOST'],
+                user=current_app.config['DB_USER'],
+                password=current_app.config['DB_PASSWORD'],
+                database=current_app.config['DB_NAME']
+            )
+    return _pool
+
+
+def acquire_connection():
+    """Take a connection from the pool, waiting up to DB_POOL_TIMEOUT seconds."""
+    pool = get_pool()
+    timeout = current_app.config['DB_POOL_TIMEOUT']
+    start = time.monotonic()
+    waited = False
+
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except PoolError:
+            # Pool exhausted - wait for another request to give one back
+            if time.monotonic() - start >= timeout:
+                with _pool_lock:
+                    _pool_stats['timeouts'] += 1
+                raise
+            waited = True
+            time.sleep(0.01)
+
+    wait_seconds = time.monotonic() - start
+    with _pool_lock:
+        _pool_stats['acquired'] += 1
+        _pool_stats['in_use'] += 1
+        if waited:
+            _pool_stats['waits'] += 1
+        _pool_stats['wait_seconds'] += wait_seconds
+        _pool_stats['max_wait_seconds'] = max(_pool_stats['max_wait_seconds'], wait_seconds)
+    return conn
+
 
 def get_db_connection():
-    """Create and return a new database connection."""
-    return mysql.connector.connect(
-        host=current_app.config['DB_HOST'],
-        user=current_app.config['DB_USER'],
-        password=current_app.config['DB_PASSWORD'],
-        database=current_app.config['DB_NAME']
-    )
\ No newline at end of file
+    """Return the connection of the current request, taken from the pool on first use."""
+    if 'db_conn' not in g:
+        g.db_conn = RequestConnection(acquire_connection())
+    return g.db_conn
+
+
+def close_db_connection(exception=None):
+    """Give the request's connection back to the pool (app teardown)."""
+    conn = g.pop('db_conn', None)
+    if conn is None:
+        return
+    try:
+        # Closing a pooled connection returns it to the pool
+        conn._conn.close()
+    finally:
+        with _pool_lock:
+            _pool_stats['in_use'] -= 1
+
+
+def get_pool_stats():
+    """Pool size and wait metrics for GET /metrics."""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats['pool_size'] = current_app.config['DB_POOL_SIZE']
+    stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+    stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 3)
+    return stats
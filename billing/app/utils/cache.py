@@ -0,0 +1,33 @@
+import threading
+from app.models.version import current_version
+
+
+class VersionedCache:
+    """
+    In-process copy of a rarely changing table.
+
+    The value is built by loader() and kept until the table's version stamp
+    (see app.models.version) changes. The stamp is read at most once per
+    request, so every worker process picks up a change on its next request.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self._value = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def current_version(self):
+        """Version stamp of the table, read once per request."""
+        return current_version(self.name)
+
+    def get(self):
+        """Return the cached value, reloading it if the table changed."""
+        version = self.current_version()
+        with self._lock:
+            if self._version != version:
+                self._value = self.loader()
+                self._version = version
+            return self._value
+
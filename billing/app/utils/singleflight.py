@@ -0,0 +1,71 @@
+import copy
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent computations.
+
+    The first caller of do(key, fn) runs fn(); callers arriving with the same
+    key while it runs wait for it and get a copy of its result (or its error)
+    instead of running fn() again. Nothing is kept once the call finishes.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key, fn):
+        """Return fn()'s result, shared with concurrent callers of the same key."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Every waiter gets its own copy it may modify
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            result = fn()
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]  # Later callers start a new computation
+                waiters = call.waiters
+            if waiters and call.error is None:
+                # Kept apart from the leader's copy, which its caller may modify
+                call.result = copy.deepcopy(result)
+            call.done.set()
+
+    def stats(self):
+        """Executed vs coalesced calls and calls running now (for GET /metrics)."""
+        with self._lock:
+            return {
+                'executed': self._executed,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
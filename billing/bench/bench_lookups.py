@@ -0,0 +1,196 @@
+"""
+Benchmark of the lookups served by the indexes of
+app/migrations/007_lookup_indexes.sql, before and after them:
+- POST /provider and PUT /provider/<id> look the name up
+  (get_provider_by_name), which uq_provider_name turns from a table scan
+  into a key lookup
+- the trucks of a provider, and GET /bill/<id> from the weighings replica
+  (BILL_SOURCE=replica), which joins the provider's trucks: both filter
+  Trucks by provider_id (idx_trucks_provider)
+
+Creates a scratch database (<DB_NAME>_bench) from db/billingdb.sql on the
+MySQL server of the DB_* environment variables, seeds it, and times each
+lookup without the indexes, then with them:
+
+    DB_HOST=127.0.0.1 DB_PORT=3306 DB_USER=root DB_PASSWORD=password DB_NAME=billdb \
+        python bench/bench_lookups.py --providers 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+BILLING_DIR = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, BILLING_DIR)
+
+# The app under test talks to the scratch database (app.config reads the
+# environment on import)
+BENCH_DB = f"{os.environ['DB_NAME']}_bench"
+os.environ["DB_NAME"] = BENCH_DB
+os.environ.setdefault("WEIGHT_BASE_URL", "http://localhost:5001")
+
+from app import create_app  # noqa: E402
+from app.migrations import split_statements  # noqa: E402
+
+INDEXES = {
+    "idx_trucks_provider": "Trucks",
+    "uq_provider_name": "Provider",
+}
+
+
+def connect(database=None):
+    return mysql.connector.connect(
+        host=os.environ["DB_HOST"],
+        port=int(os.environ.get("DB_PORT", 3306)),
+        user=os.environ["DB_USER"],
+        password=os.environ["DB_PASSWORD"],
+        database=database,
+    )
+
+
+def create_bench_db(name, providers, trucks_per_provider):
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cursor.execute(f"CREATE DATABASE `{name}`")
+    cursor.execute(f"USE `{name}`")
+
+    with open(os.path.join(BILLING_DIR, "db", "billingdb.sql")) as f:
+        for statement in split_statements(f.read()):
+            if not statement.upper().startswith("CREATE DATABASE"):
+                cursor.execute(statement)
+
+    cursor.executemany(
+        "INSERT INTO Provider (id, name) VALUES (%s, %s)",
+        [(10001 + i, f"Provider {i:06d}") for i in range(providers)],
+    )
+    trucks = [
+        (f"B{i * trucks_per_provider + j:08d}", 10001 + i)
+        for i in range(providers)
+        for j in range(trucks_per_provider)
+    ]
+    cursor.executemany("INSERT INTO Trucks (id, provider_id) VALUES (%s, %s)", trucks)
+    # Two incoming weighings per truck in January 2024
+    cursor.executemany(
+        "INSERT INTO Weighings (id, session_id, datetime, direction, truck, produce, bruto, neto) "
+        "VALUES (%s, %s, %s, 'in', %s, 'Navel', 10000, %s)",
+        [
+            (n + 1, n + 1, f"2024-01-{n % 28 + 1:02d} 08:00:00", trucks[n // 2][0], 5000 + n % 1000)
+            for n in range(len(trucks) * 2)
+        ],
+    )
+    cursor.execute("INSERT INTO Rates (product_id, rate, scope) VALUES ('Navel', 93, 'All')")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def set_indexes(name, enabled):
+    conn = connect(name)
+    cursor = conn.cursor()
+    if enabled:
+        with open(os.path.join(BILLING_DIR, "app", "migrations", "007_lookup_indexes.sql")) as f:
+            for statement in split_statements(f.read()):
+                cursor.execute(statement)
+    else:
+        for index, table in INDEXES.items():
+            cursor.execute(f"ALTER TABLE `{table}` DROP INDEX `{index}`")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def timed(func, requests):
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        func(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def run_endpoints(app, phase, providers, requests):
+    client = app.test_client()
+    rng = random.Random(7)
+    conn = connect(BENCH_DB)
+    cursor = conn.cursor()
+
+    def post_provider(i):
+        response = client.post(
+            "/provider",
+            data=json.dumps({"name": f"New {phase} {i}"}),
+            content_type="application/json",
+        )
+        assert response.status_code == 201, response.data
+
+    def trucks_of_provider(i):
+        cursor.execute("SELECT id FROM Trucks WHERE provider_id = %s", (10001 + rng.randrange(providers),))
+        cursor.fetchall()
+
+    def get_bill(i):
+        # Never synced: bills are computed each time, not stored as snapshots
+        provider_id = 10001 + rng.randrange(providers)
+        response = client.get(f"/bill/{provider_id}?from=20240101000000&to=20240131235959")
+        assert response.status_code == 200, response.data
+
+    def put_provider(i):
+        provider_id = 10001 + rng.randrange(providers)
+        response = client.put(
+            f"/provider/{provider_id}",
+            data=json.dumps({"name": f"Renamed {phase} {i}"}),
+            content_type="application/json",
+        )
+        assert response.status_code == 200, response.data
+
+    try:
+        return {
+            "POST /provider": timed(post_provider, requests),
+            "PUT /provider/<id>": timed(put_provider, requests),
+            "trucks of a provider": timed(trucks_of_provider, requests),
+            "GET /bill/<id> replica": timed(get_bill, requests),
+        }
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--providers", type=int, default=20000)
+    parser.add_argument("--trucks-per-provider", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    create_bench_db(BENCH_DB, args.providers, args.trucks_per_provider)
+    print(f"{BENCH_DB}: {args.providers} providers, {args.trucks_per_provider} trucks each")
+
+    app = create_app()
+    app.config["BILL_SOURCE"] = "replica"
+    try:
+        set_indexes(BENCH_DB, False)
+        before = run_endpoints(app, "before", args.providers, args.requests)
+        set_indexes(BENCH_DB, True)
+        after = run_endpoints(app, "after", args.providers, args.requests)
+    finally:
+        if not args.keep:
+            conn = connect()
+            conn.cursor().execute(f"DROP DATABASE IF EXISTS `{BENCH_DB}`")
+            conn.close()
+
+    print(f"{'endpoint':<24} {'before p50/p95 (ms)':>22} {'after p50/p95 (ms)':>22}")
+    for endpoint in before:
+        b50, b95 = before[endpoint]
+        a50, a95 = after[endpoint]
+        print(f"{endpoint:<24} {b50:>10.2f} / {b95:<9.2f} {a50:>10.2f} / {a95:<9.2f}")
+
+
+if __name__ == "__main__":
+    main()
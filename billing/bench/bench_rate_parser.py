@@ -0,0 +1,88 @@
+"""
+Benchmark for parsing a large rates spreadsheet (POST /rates).
+
+Generates a rates file with --rows rows and times the legacy row-by-row
+parser against the vectorized parser, with and without the read-only
+streaming reader:
+
+    python bench/bench_rate_parser.py --rows 100000
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+from openpyxl import Workbook
+
+# Load the parser module on its own - importing the app package needs the
+# full service configuration (DB, Weight service)
+_spec = importlib.util.spec_from_file_location(
+    "rate_parser",
+    os.path.join(os.path.dirname(__file__), "..", "app", "services", "rate_parser.py"),
+)
+rate_parser = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(rate_parser)
+
+
+def legacy_parse_rates_file(filepath):
+    # The iterrows() parser that rate_parser replaced, kept for comparison
+    df = pd.read_excel(filepath)
+    rates = []
+    for index, row in df.iterrows():
+        product, rate, scope = row['Product'], row['Rate'], row['Scope']
+        if pd.isna(product) or pd.isna(rate):
+            raise ValueError(f"Row {index + 2} has missing Product or Rate")
+        if pd.isna(scope):
+            scope_str = 'All'
+        elif isinstance(scope, (int, float)):
+            scope_str = str(int(scope))
+        else:
+            scope_str = str(scope)
+        rates.append({'product_id': str(product).strip(), 'rate': int(rate), 'scope': scope_str})
+    return rates
+
+
+def write_rates_file(path, rows):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Rates")
+    ws.append(["Product", "Rate", "Scope"])
+    rng = random.Random(42)
+    for i in range(rows):
+        scope = "All" if i % 3 else 10001 + rng.randrange(500)
+        ws.append([f"Product-{i % 5000}", rng.randrange(50, 200), scope])
+    wb.save(path)
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f} s  ({len(result)} rates)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "rates.xlsx")
+        write_rates_file(path, args.rows)
+        print(f"rates file: {args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        results = []
+        if not args.skip_legacy:
+            results.append(timed("legacy (iterrows)", legacy_parse_rates_file, path))
+        results.append(timed("vectorized (read_excel)", rate_parser.parse_rates_file, path, False))
+        results.append(timed("vectorized (streaming)", rate_parser.parse_rates_file, path, True))
+        assert all(r == results[0] for r in results), "parsers disagree"
+
+
+if __name__ == "__main__":
+    main()
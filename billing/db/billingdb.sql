@@ -14,13 +14,15 @@ USE `billdb`;
 CREATE TABLE IF NOT EXISTS `Provider` (
   `id` int(11) NOT NULL AUTO_INCREMENT,
   `name` varchar(255) DEFAULT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_provider_name` (`name`(191))
 ) ENGINE=MyISAM  AUTO_INCREMENT=10001 ;
 
 CREATE TABLE IF NOT EXISTS `Rates` (
   `product_id` varchar(50) NOT NULL,
   `rate` int(11) DEFAULT 0,
   `scope` varchar(50) DEFAULT NULL,
+  UNIQUE KEY `uq_rates_product_scope` (`product_id`, `scope`),
   FOREIGN KEY (scope) REFERENCES `Provider`(`id`)
 ) ENGINE=MyISAM ;
 
@@ -28,8 +30,92 @@ CREATE TABLE IF NOT EXISTS `Trucks` (
   `id` varchar(10) NOT NULL,
   `provider_id` int(11) DEFAULT NULL,
   PRIMARY KEY (`id`),
+  KEY `idx_trucks_provider` (`provider_id`),
   FOREIGN KEY (`provider_id`) REFERENCES `Provider`(`id`)
 ) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Versions` (
+  `name` varchar(50) NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`name`)
+) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Bill_snapshots` (
+  `provider_id` int(11) NOT NULL,
+  `from_date` char(14) NOT NULL,
+  `to_date` char(14) NOT NULL,
+  `rates_version` int(11) NOT NULL,
+  `trucks_version` int(11) NOT NULL,
+  `bill` mediumtext NOT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`provider_id`, `from_date`, `to_date`),
+  KEY `idx_bill_snapshots_period` (`from_date`, `to_date`)
+) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Bill_segments` (
+  `provider_id` int(11) NOT NULL,
+  `day` char(8) NOT NULL,
+  `trucks_version` int(11) NOT NULL,
+  `session_count` int(11) NOT NULL,
+  `products` mediumtext NOT NULL,
+  PRIMARY KEY (`provider_id`, `day`),
+  KEY `idx_bill_segments_day` (`day`)
+) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Weighings` (
+  `id` int(11) NOT NULL,
+  `session_id` int(11) DEFAULT NULL,
+  `datetime` datetime DEFAULT NULL,
+  `direction` varchar(10) DEFAULT NULL,
+  `truck` varchar(50) DEFAULT NULL,
+  `produce` varchar(50) DEFAULT NULL,
+  `bruto` int(11) DEFAULT NULL,
+  `neto` int(11) DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_weighings_direction_datetime` (`direction`, `datetime`),
+  KEY `idx_weighings_truck` (`truck`)
+) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Sync_state` (
+  `name` varchar(50) NOT NULL,
+  `last_id` int(11) NOT NULL DEFAULT 0,
+  `last_datetime` datetime DEFAULT NULL,
+  `synced_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`name`)
+) ENGINE=MyISAM ;
+
+CREATE TABLE IF NOT EXISTS `Bill_jobs` (
+  `id` char(32) NOT NULL,
+  `provider_id` int(11) DEFAULT NULL,
+  `from_date` char(14) NOT NULL,
+  `to_date` char(14) NOT NULL,
+  `status` varchar(10) NOT NULL DEFAULT 'queued',
+  `result` mediumtext DEFAULT NULL,
+  `error` varchar(255) DEFAULT NULL,
+  `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `started_at` timestamp NULL DEFAULT NULL,
+  `finished_at` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`id`),
+  KEY `idx_bill_jobs_created_at` (`created_at`)
+) ENGINE=MyISAM ;
+-- Migrations already contained in this schema (app.migrations)
+CREATE TABLE IF NOT EXISTS `Schema_migrations` (
+  `filename` varchar(255) NOT NULL,
+  `applied_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`filename`)
+) ENGINE=MyISAM ;
+
+INSERT IGNORE INTO `Schema_migrations` (`filename`) VALUES
+('001_versions.sql'),
+('002_rates_unique_key.sql'),
+('003_bill_snapshots.sql'),
+('004_weighings.sql'),
+('005_bill_jobs.sql'),
+('006_bill_segments.sql'),
+('007_lookup_indexes.sql'),
+('008_sync_state_synced_at.sql'),
+('009_bill_jobs_started_at.sql');
+
 --
 -- Dumping data
 --
@@ -1,7 +1,10 @@
 from app import create_app
 
+# Applies pending migrations (app/migrations) before serving
 app = create_app()
 
 if __name__ == "__main__":
-    # For production need to use gunicorn
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # For production need to use gunicorn.
+    # No reloader: its watcher process would run create_app() (migrations,
+    # sync worker) a second time
+    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
@@ -4,9 +4,15 @@
 # Tests for GET /bill/<id> endpoint with mocked Weight service
 
 import pytest
+import csv
+import io
 import json
+import time
+import requests
+from openpyxl import load_workbook
 from app import create_app
 from app.utils import get_db_connection
+from app.models.version import RATES, TRUCKS, PROVIDERS, bump_version
 
 
 @pytest.fixture
@@ -35,12 +41,18 @@ def cleanup_db():
     
     cursor.execute("DELETE FROM Trucks")
     cursor.execute("DELETE FROM Rates")
+    cursor.execute("DELETE FROM Bill_snapshots")
+    cursor.execute("DELETE FROM Bill_jobs")
+    cursor.execute("DELETE FROM Bill_segments")
     cursor.execute("DELETE FROM Provider")
     cursor.execute("ALTER TABLE Provider AUTO_INCREMENT = 10001")
     
     conn.commit()
     cursor.close()
     conn.close()
+    bump_version(RATES)
+    bump_version(TRUCKS)
+    bump_version(PROVIDERS)
 
 
 def create_test_provider(client, name="Test Provider"):
@@ -78,10 +90,29 @@ def upload_test_rates(client):
         conn.commit()
         cursor.close()
         conn.close()
+        bump_version(RATES)
     
     return True
 
 
+def mock_weight_api(mocker, responses):
+    """
+    Mock the Weight service: responses[0] answers GET /weight, the rest are
+    GET /session/<id> details matched by id (the calls run concurrently).
+    """
+    weighings, details = responses[0], {str(d['id']): d for d in responses[1:]}
+
+    def fake_get(url, **kwargs):
+        response = mocker.MagicMock()
+        if '/session/' in url:
+            response.json.return_value = details[url.rsplit('/', 1)[1]]
+        else:
+            response.json.return_value = weighings
+        return response
+
+    return mocker.patch('app.services.weight_client.http_get', side_effect=fake_get)
+
+
 # =============================================================================
 # SUCCESS CASES
 # =============================================================================
@@ -95,10 +126,8 @@ def test_bill_success_with_two_products(client, mocker):
     upload_test_rates(client)
     
     # Mock Weight API response
-    mock_response = mocker.MagicMock()
-    mock_response.raise_for_status = mocker.MagicMock()
-    mock_response.json.side_effect = [
-        # First call: GET /weight
+    mock_weight_api(mocker, [
+        # GET /weight
         {
             'results': [
                 {
@@ -127,16 +156,13 @@ def test_bill_success_with_two_products(client, mocker):
                 }
             ]
         },
-        # Second call: GET /session/1001
+        # GET /session/1001
         {'id': 1001, 'truck': 'T-14409', 'bruto': 10000, 'neto': 8500},
-        # Third call: GET /session/1002
+        # GET /session/1002
         {'id': 1002, 'truck': 'T-14409', 'bruto': 9500, 'neto': 7800},
-        # Fourth call: GET /session/1003
+        # GET /session/1003
         {'id': 1003, 'truck': 'T-16474', 'bruto': 11000, 'neto': 9200}
-    ]
-    
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
-    mock_get.return_value = mock_response
+    ])
     
     # Test
     response = client.get(f'/bill/{provider_id}')
@@ -179,7 +205,7 @@ def test_bill_with_custom_date_range(client, mocker):
     mock_response.raise_for_status = mocker.MagicMock()
     mock_response.json.return_value = {'results': []}
     
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
+    mock_get = mocker.patch('app.services.weight_client.http_get')
     mock_get.return_value = mock_response
     
     response = client.get(f'/bill/{provider_id}?from=20240101000000&to=20240131235959')
@@ -207,9 +233,7 @@ def test_bill_filters_by_provider_trucks_only(client, mocker):
     upload_test_rates(client)
     
     # Mock returns sessions for BOTH trucks
-    mock_response = mocker.MagicMock()
-    mock_response.raise_for_status = mocker.MagicMock()
-    mock_response.json.side_effect = [
+    mock_weight_api(mocker, [
         {
             'results': [
                 {'id': 1001, 'direction': 'in', 'bruto': 10000, 'neto': 8500, 'produce': 'Navel', 'containers': 'C-001'},
@@ -220,10 +244,7 @@ def test_bill_filters_by_provider_trucks_only(client, mocker):
         {'id': 1001, 'truck': 'T-14409', 'neto': 8500},
         {'id': 1002, 'truck': 'T-14409', 'neto': 7800},
         {'id': 1003, 'truck': 'T-16474', 'neto': 9200}
-    ]
-    
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
-    mock_get.return_value = mock_response
+    ])
     
     # Get bill for provider 1
     response = client.get(f'/bill/{provider1}')
@@ -246,9 +267,7 @@ def test_bill_with_na_weights(client, mocker):
     create_test_truck(client, "T-14409", provider_id)
     upload_test_rates(client)
     
-    mock_response = mocker.MagicMock()
-    mock_response.raise_for_status = mocker.MagicMock()
-    mock_response.json.side_effect = [
+    mock_weight_api(mocker, [
         {
             'results': [
                 {'id': 2001, 'direction': 'in', 'bruto': 10000, 'neto': 'na', 'produce': 'Navel', 'containers': 'C-001'},
@@ -257,10 +276,7 @@ def test_bill_with_na_weights(client, mocker):
         },
         {'id': 2001, 'truck': 'T-14409', 'neto': 'na'},
         {'id': 2002, 'truck': 'T-14409', 'neto': 7800}
-    ]
-    
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
-    mock_get.return_value = mock_response
+    ])
     
     response = client.get(f'/bill/{provider_id}')
     
@@ -272,6 +288,39 @@ def test_bill_with_na_weights(client, mocker):
     assert data['products'][0]['product'] == 'Mandarin'
 
 
+def test_bill_skips_sessions_without_detail(client, mocker):
+    """Test that sessions whose GET /session/<id> fails are skipped."""
+    provider_id = create_test_provider(client)
+    create_test_truck(client, "T-14409", provider_id)
+    upload_test_rates(client)
+
+    weighings = {
+        'results': [
+            {'id': 3001, 'direction': 'in', 'bruto': 10000, 'neto': 8500, 'produce': 'Navel', 'containers': 'C-001'},
+            {'id': 3002, 'direction': 'in', 'bruto': 9500, 'neto': 7800, 'produce': 'Mandarin', 'containers': 'C-002'}
+        ]
+    }
+
+    def fake_get(url, **kwargs):
+        response = mocker.MagicMock()
+        if url.endswith('/session/3001'):
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError()
+        elif '/session/' in url:
+            response.json.return_value = {'id': 3002, 'truck': 'T-14409'}
+        else:
+            response.json.return_value = weighings
+        return response
+
+    mocker.patch('app.services.weight_client.http_get', side_effect=fake_get)
+
+    response = client.get(f'/bill/{provider_id}')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['sessionCount'] == 1
+    assert data['products'][0]['product'] == 'Mandarin'
+
+
 def test_bill_with_no_sessions(client, mocker):
     """Test bill when provider has no weighing sessions."""
     provider_id = create_test_provider(client)
@@ -282,7 +331,7 @@ def test_bill_with_no_sessions(client, mocker):
     mock_response.raise_for_status = mocker.MagicMock()
     mock_response.json.return_value = {'results': []}
     
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
+    mock_get = mocker.patch('app.services.weight_client.http_get')
     mock_get.return_value = mock_response
     
     response = client.get(f'/bill/{provider_id}')
@@ -304,7 +353,7 @@ def test_bill_with_no_trucks(client, mocker):
     mock_response.raise_for_status = mocker.MagicMock()
     mock_response.json.return_value = {'results': []}
     
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
+    mock_get = mocker.patch('app.services.weight_client.http_get')
     mock_get.return_value = mock_response
     
     response = client.get(f'/bill/{provider_id}')
@@ -349,7 +398,7 @@ def test_bill_weight_service_unavailable(client, mocker):
     create_test_truck(client, "T-14409", provider_id)
     
     # Mock connection error
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
+    mock_get = mocker.patch('app.services.weight_client.http_get')
     mock_get.side_effect = Exception("Connection refused")
     
     response = client.get(f'/bill/{provider_id}')
@@ -374,20 +423,16 @@ def test_bill_with_provider_specific_rates(client, mocker):
         conn.commit()
         cursor.close()
         conn.close()
+        bump_version(RATES)
     
-    mock_response = mocker.MagicMock()
-    mock_response.raise_for_status = mocker.MagicMock()
-    mock_response.json.side_effect = [
+    mock_weight_api(mocker, [
         {
             'results': [
                 {'id': 1002, 'direction': 'in', 'bruto': 9500, 'neto': 7800, 'produce': 'Mandarin', 'containers': 'C-002'}
             ]
         },
         {'id': 1002, 'truck': 'T-14409', 'neto': 7800}
-    ]
-    
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
-    mock_get.return_value = mock_response
+    ])
     
     response = client.get(f'/bill/{provider_id}')
     
@@ -411,7 +456,7 @@ def test_bill_default_dates(client, mocker):
     mock_response.raise_for_status = mocker.MagicMock()
     mock_response.json.return_value = {'results': []}
     
-    mock_get = mocker.patch('app.services.weight_client.requests.get')
+    mock_get = mocker.patch('app.services.weight_client.http_get')
     mock_get.return_value = mock_response
     
     response = client.get(f'/bill/{provider_id}')
@@ -429,4 +474,354 @@ def test_bill_default_dates(client, mocker):
     
     # Check default to date is current time (roughly)
     now = datetime.now()
-    assert to_date[:8] == now.strftime('%Y%m%d')  # Same day
\ No newline at end of file
+    assert to_date[:8] == now.strftime('%Y%m%d')  # Same day
+
+# =============================================================================
+# ALL PROVIDERS (GET /bills)
+# =============================================================================
+
+def test_all_bills_fetches_weight_data_once(client, mocker):
+    """GET /bills returns every provider's bill from a single GET /weight."""
+    provider1 = create_test_provider(client, "Provider 1")
+    provider2 = create_test_provider(client, "Provider 2")
+    provider3 = create_test_provider(client, "Provider 3")
+    create_test_truck(client, "T-14409", provider1)
+    create_test_truck(client, "T-16474", provider2)
+    upload_test_rates(client)
+
+    mock_get = mock_weight_api(mocker, [
+        {
+            'results': [
+                {'id': 1001, 'direction': 'in', 'bruto': 10000, 'neto': 8500, 'produce': 'Navel', 'containers': 'C-001'},
+                {'id': 1002, 'direction': 'in', 'bruto': 9500, 'neto': 7800, 'produce': 'Mandarin', 'containers': 'C-002'},
+                {'id': 1003, 'direction': 'in', 'bruto': 11000, 'neto': 9200, 'produce': 'Navel', 'containers': 'C-003'},
+                {'id': 1004, 'direction': 'in', 'bruto': 8000, 'neto': 6000, 'produce': 'Navel', 'containers': 'C-004'}
+            ]
+        },
+        {'id': 1001, 'truck': 'T-14409'},
+        {'id': 1002, 'truck': 'T-14409'},
+        {'id': 1003, 'truck': 'T-16474'},
+        {'id': 1004, 'truck': 'T-99999'}
+    ])
+
+    response = client.get('/bills?from=20240101000000&to=20240131235959')
+
+    assert response.status_code == 200
+    bills = {bill['id']: bill for bill in json.loads(response.data)}
+    assert set(bills) == {str(provider1), str(provider2), str(provider3)}
+
+    assert bills[str(provider1)]['sessionCount'] == 2
+    assert bills[str(provider1)]['total'] == 8500 * 93 + 7800 * 104
+    assert bills[str(provider2)]['sessionCount'] == 1
+    assert bills[str(provider2)]['total'] == 9200 * 93
+    assert bills[str(provider3)]['truckCount'] == 0
+    assert bills[str(provider3)]['total'] == 0
+
+    weight_calls = [c for c in mock_get.call_args_list if c[0][0].endswith('/weight')]
+    assert len(weight_calls) == 1
+    assert weight_calls[0][1]['params']['from'] == '20240101000000'
+
+
+def test_all_bills_invalid_date_format(client):
+    """GET /bills validates dates like GET /bill/<id>."""
+    response = client.get('/bills?from=2024-01-01')
+    assert response.status_code == 400
+
+
+def test_bills_export_csv_and_xlsx(client, mocker):
+    """GET /bills/export lists every provider's products, one row each."""
+    provider1 = create_test_provider(client, "Provider 1")
+    provider2 = create_test_provider(client, "Provider 2")
+    create_test_truck(client, "T-14409", provider1)
+    upload_test_rates(client)
+    mock_weight_api(mocker, [
+        {'results': [
+            {'id': 1001, 'direction': 'in', 'bruto': 10000, 'neto': 8500, 'produce': 'Navel', 'containers': 'C-001'},
+            {'id': 1002, 'direction': 'in', 'bruto': 9500, 'neto': 7800, 'produce': 'Mandarin', 'containers': 'C-002'}
+        ]},
+        {'id': 1001, 'truck': 'T-14409'},
+        {'id': 1002, 'truck': 'T-14409'}
+    ])
+
+    response = client.get('/bills/export?from=20240101000000&to=20240131235959')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.data.decode())))
+    assert rows[0] == ['provider_id', 'provider_name', 'from', 'to', 'product', 'count', 'amount', 'rate', 'pay']
+    assert rows[1:] == [
+        [str(provider1), 'Provider 1', '20240101000000', '20240131235959', 'Navel', '1', '8500', '93', str(8500 * 93)],
+        [str(provider1), 'Provider 1', '20240101000000', '20240131235959', 'Mandarin', '1', '7800', '104', str(7800 * 104)],
+        [str(provider2), 'Provider 2', '20240101000000', '20240131235959', '', '0', '0', '', '0']
+    ]
+
+    response = client.get('/bills/export?format=xlsx&from=20240101000000&to=20240131235959')
+    assert response.status_code == 200
+    sheet = load_workbook(io.BytesIO(response.data)).active
+    values = list(sheet.values)
+    assert len(values) == 4
+    assert values[1][4:] == ('Navel', '1', 8500, 93, 8500 * 93)
+
+
+def test_bills_export_validation(client):
+    """GET /bills/export rejects unknown formats and bad dates."""
+    assert client.get('/bills/export?format=pdf').status_code == 400
+    assert client.get('/bills/export?from=2024-01-01').status_code == 400
+
+
+# =============================================================================
+# CLOSED-PERIOD SNAPSHOTS
+# =============================================================================
+
+CLOSED_PERIOD = '?from=20240101000000&to=20240131235959'
+
+
+def closed_period_weight_api(mocker, neto):
+    return mock_weight_api(mocker, [
+        {'results': [
+            {'id': 1001, 'direction': 'in', 'bruto': 10000, 'neto': neto, 'produce': 'Navel', 'containers': 'C-001'}
+        ]},
+        {'id': 1001, 'truck': 'T-14409'}
+    ])
+
+
+def test_closed_period_bill_is_served_from_snapshot(client, mocker):
+    """A bill of a closed period is computed once, then served without the Weight service."""
+    provider_id = create_test_provider(client)
+    create_test_truck(client, "T-14409", provider_id)
+    upload_test_rates(client)
+
+    mock_get = closed_period_weight_api(mocker, 8500)
+    first = client.get(f'/bill/{provider_id}{CLOSED_PERIOD}')
+    assert first.status_code == 200
+    calls = mock_get.call_count
+
+    second = client.get(f'/bill/{provider_id}{CLOSED_PERIOD}')
+    assert second.status_code == 200
+    assert json.loads(second.data) == json.loads(first.data)
+    assert mock_get.call_count == calls
+
+
+def test_snapshot_invalidated_by_force_update_and_truck_change(client, mocker):
+    """Force-updated weighings and truck changes make the bill recompute."""
+    provider_id = create_test_provider(client)
+    create_test_truck(client, "T-14409", provider_id)
+    upload_test_rates(client)
+
+    closed_period_weight_api(mocker, 8500)
+    client.get(f'/bill/{provider_id}{CLOSED_PERIOD}')
+
+    # Weighing in the period was force-updated
+    response = client.post(
+        '/bill-snapshots/invalidate',
+        data=json.dumps({'from': '20240115080000', 'to': '20240115080000'}),
+        content_type='application/json'
+    )
+    assert json.loads(response.data)['deleted'] == 1
+    closed_period_weight_api(mocker, 9000)
+    data = json.loads(client.get(f'/bill/{provider_id}{CLOSED_PERIOD}').data)
+    assert data['total'] == 9000 * 93
+
+    # New truck assignment
+    create_test_truck(client, "T-16474", provider_id)
+    data = json.loads(client.get(f'/bill/{provider_id}{CLOSED_PERIOD}').data)
+    assert data['truckCount'] == 2
+
+
+# =============================================================================
+# PER-DAY SEGMENT CACHE
+# =============================================================================
+
+def mock_weight_api_by_day(mocker, neto_by_day):
+    """
+    Mock the Weight service with one Navel session of truck T-14409 per day
+    in neto_by_day ({yyyymmdd: neto}) that lies inside the requested range.
+    """
+    def fake_get(url, params=None, **kwargs):
+        response = mocker.MagicMock()
+        if '/session/' in url:
+            response.json.return_value = {'id': url.rsplit('/', 1)[1], 'truck': 'T-14409'}
+        else:
+            response.json.return_value = {'results': [
+                {'id': int(day), 'direction': 'in', 'neto': neto, 'produce': 'Navel'}
+                for day, neto in neto_by_day.items()
+                if params['from'][:8] <= day <= params['to'][:8]
+            ]}
+        return response
+
+    return mocker.patch('app.services.weight_client.http_get', side_effect=fake_get)
+
+
+def weight_ranges(mock_get):
+    return [
+        (c[1]['params']['from'], c[1]['params']['to'])
+        for c in mock_get.call_args_list if c[0][0].endswith('/weight')
+    ]
+
+
+def test_segment_cache_only_fetches_uncached_edges(client, mocker):
+    """Closed whole days are computed once; other ranges only fetch their edges."""
+    client.application.config['BILL_SEGMENT_CACHE'] = True
+    provider_id = create_test_provider(client)
+    create_test_truck(client, "T-14409", provider_id)
+    upload_test_rates(client)
+    mock_get = mock_weight_api_by_day(mocker, {'20240101': 1000, '20240102': 2000, '20240103': 3000})
+
+    data = json.loads(client.get(f'/bill/{provider_id}?from=20240101000000&to=20240103120000').data)
+    assert data['sessionCount'] == 3
+    assert data['total'] == 6000 * 93
+    # Two whole days and the partial last day
+    assert weight_ranges(mock_get) == [
+        ('20240101000000', '20240101235959'),
+        ('20240102000000', '20240102235959'),
+        ('20240103000000', '20240103120000')
+    ]
+
+    mock_get.reset_mock()
+    data = json.loads(client.get(f'/bill/{provider_id}?from=20240101000000&to=20240103180000').data)
+    assert data['sessionCount'] == 3
+    assert data['total'] == 6000 * 93
+    assert weight_ranges(mock_get) == [('20240103000000', '20240103180000')]
+
+
+def test_segment_cache_matches_uncached_bill(client, mocker):
+    """Bills from stored segments equal bills computed in one go."""
+    provider_id = create_test_provider(client)
+    create_test_truck(client, "T-14409", provider_id)
+    upload_test_rates(client)
+    mock_weight_api_by_day(mocker, {'20240101': 1000, '20240102': 2000, '20240104': 'na'})
+
+    period = '?from=20240101063000&to=20240104120000'
+    client.application.config['BILL_SEGMENT_CACHE'] = False
+    expected = json.loads(client.get(f'/bill/{provider_id}{period}').data)
+    client.post(
+        '/bill-snapshots/invalidate',
+        data=json.dumps({'from': '20240101000000', 'to': '20240104235959'}),
+        content_type='application/json'
+    )
+
+    client.application.config['BILL_SEGMENT_CACHE'] = True
+    assert json.loads(client.get(f'/bill/{provider_id}{period}').data) == expected
+
+
+# =============================================================================
+# BACKGROUND BILL JOBS
+# =============================================================================
+
+def wait_for_job(client, status_url, timeout=10):
+    """Poll a bill job until it is done or failed."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = json.loads(client.get(status_url).data)
+        if status['status'] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"Bill job did not finish: {status}")
+
+
+def test_bill_job_returns_same_bill_as_sync_endpoint(client, mocker):
+    """POST /bill-jobs queues the bill; its result equals GET /bill/<id>."""
+    provider_id = create_test_provider(client, "Fresh Farms")
+    create_test_truck(client, "T-14409", provider_id)
+    upload_test_rates(client)
+    closed_period_weight_api(mocker, 8500)
+
+    response = client.post(
+        '/bill-jobs',
+        data=json.dumps({'provider_id': provider_id, 'from': '20240101000000', 'to': '20240131235959'}),
+        content_type='application/json'
+    )
+    assert response.status_code == 202
+    job = json.loads(response.data)
+    assert job['status'] in ('queued', 'running', 'done')
+    assert response.headers['Location'].endswith(job['status_url'])
+
+    assert wait_for_job(client, job['status_url'])['status'] == 'done'
+    result = client.get(job['result_url'])
+    assert result.status_code == 200
+
+    expected = client.get(f'/bill/{provider_id}{CLOSED_PERIOD}')
+    assert json.loads(result.data) == json.loads(expected.data)
+
+
+def test_bill_job_for_all_providers(client, mocker):
+    """POST /bill-jobs without provider_id computes GET /bills."""
+    create_test_provider(client, "Provider 1")
+    create_test_provider(client, "Provider 2")
+    closed_period_weight_api(mocker, 8500)
+
+    job = json.loads(client.post('/bill-jobs', data='{}', content_type='application/json').data)
+    assert wait_for_job(client, job['status_url'])['status'] == 'done'
+    assert len(json.loads(client.get(job['result_url']).data)) == 2
+
+
+def test_bill_job_weight_service_unavailable(client, mocker):
+    """A failed job reports its error; the result answers 503."""
+    provider_id = create_test_provider(client)
+    mocker.patch(
+        'app.services.weight_client.http_get',
+        side_effect=requests.exceptions.ConnectionError()
+    )
+
+    job = json.loads(client.post(
+        '/bill-jobs',
+        data=json.dumps({'provider_id': provider_id}),
+        content_type='application/json'
+    ).data)
+    status = wait_for_job(client, job['status_url'])
+    assert status['status'] == 'failed'
+    assert 'Weight service unavailable' in status['error']
+    assert client.get(job['result_url']).status_code == 503
+
+
+def test_bill_job_left_running_expires(client):
+    """A job whose worker stopped is reported failed after BILL_JOB_TIMEOUT_MINUTES."""
+    provider_id = create_test_provider(client)
+    with client.application.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO Bill_jobs (id, provider_id, from_date, to_date, status, created_at) "
+            "VALUES (%s, %s, %s, %s, %s, NOW() - INTERVAL 2 HOUR)",
+            ('stuck', provider_id, '20240101000000', '20240131235959', 'running')
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    status = json.loads(client.get('/bill-jobs/stuck').data)
+    assert status['status'] == 'failed'
+    assert 'did not finish' in status['error']
+    assert client.get('/bill-jobs/stuck/result').status_code == 500
+
+
+def test_bill_job_times_out_from_its_start(client):
+    """A job that waited long in the queue but started recently is not expired."""
+    provider_id = create_test_provider(client)
+    with client.application.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO Bill_jobs (id, provider_id, from_date, to_date, status, created_at, started_at) "
+            "VALUES (%s, %s, %s, %s, %s, NOW() - INTERVAL 2 HOUR, NOW())",
+            ('late', provider_id, '20240101000000', '20240131235959', 'running')
+        )
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    assert json.loads(client.get('/bill-jobs/late').data)['status'] == 'running'
+
+
+def test_bill_job_validation(client):
+    """Unknown providers, bad dates and unknown jobs are rejected."""
+    provider_id = create_test_provider(client)
+
+    response = client.post('/bill-jobs', data=json.dumps({'provider_id': 99999}), content_type='application/json')
+    assert response.status_code == 404
+    response = client.post(
+        '/bill-jobs',
+        data=json.dumps({'provider_id': provider_id, 'from': '2024-01-01'}),
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+    assert client.get('/bill-jobs/does-not-exist').status_code == 404
@@ -0,0 +1,118 @@
+# =============================================================================
+# CIRCUIT BREAKER TESTS
+# =============================================================================
+# Breaker states used by weight_client around calls to the Weight service
+
+import time
+import pytest
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def test_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()['short_circuited'] == 1
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.03)
+
+    breaker.before_call()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.01)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.03)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.fixture
+def weight_client(monkeypatch):
+    """weight_client with a fresh session, breaker and stale cache."""
+    from collections import OrderedDict
+    from app import create_app
+    from app.services import weight_client
+
+    monkeypatch.setattr(weight_client, '_session', None)
+    monkeypatch.setattr(weight_client, '_breaker', None)
+    monkeypatch.setattr(weight_client, '_stale_cache', OrderedDict())
+    monkeypatch.setattr(weight_client, '_stale_cache_bytes', 0)
+    app = create_app()
+    app.config['WEIGHT_BREAKER_FAILURES'] = 1
+    app.config['WEIGHT_BREAKER_RESET'] = 0.01
+    with app.app_context():
+        yield weight_client
+
+
+def json_response(body):
+    import requests
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = body
+    return response
+
+
+def test_probe_failing_with_other_errors_reopens(weight_client, mocker):
+    import requests
+    session = weight_client.get_http_session()
+    mocker.patch.object(session, 'get', side_effect=requests.exceptions.ChunkedEncodingError())
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        weight_client.http_get('http://weight/health')
+    time.sleep(0.03)
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        weight_client.http_get('http://weight/health')  # The half-open probe
+
+    time.sleep(0.03)
+    mocker.patch.object(session, 'get', return_value=json_response(b'{}'))
+    assert weight_client.http_get('http://weight/health').status_code == 200
+
+
+def test_stale_answer_of_range_ending_now(weight_client, mocker):
+    import requests
+    from datetime import datetime, timedelta
+    session = weight_client.get_http_session()
+    earlier = (datetime.now() - timedelta(seconds=5)).strftime('%Y%m%d%H%M%S')
+    now = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    mocker.patch.object(session, 'get', return_value=json_response(b'{"results": [1]}'))
+    weight_client.http_get('http://weight/weight', params={'from': '20240101000000', 'to': earlier}, stale_ok=True)
+    mocker.patch.object(session, 'get', side_effect=requests.exceptions.ConnectionError())
+
+    response = weight_client.http_get('http://weight/weight', params={'from': '20240101000000', 'to': now}, stale_ok=True)
+    assert response.from_stale_cache is True
+    assert response.json() == {'results': [1]}
+    with pytest.raises(requests.exceptions.ConnectionError):
+        weight_client.http_get('http://weight/weight', params={'from': '20240101000000', 'to': now})
+
+
+def test_stale_cache_is_capped_by_size(weight_client, mocker):
+    session = weight_client.get_http_session()
+    mocker.patch.object(weight_client, '_stale_cache_max_bytes', 20)
+    mocker.patch.object(session, 'get', return_value=json_response(b'{"results": [1]}'))  # 16 bytes
+
+    weight_client.http_get('http://weight/session/1', stale_ok=True)
+    weight_client.http_get('http://weight/session/2', stale_ok=True)
+    weight_client.http_get('http://weight/health')  # Not a lookup bills need
+    assert list(key[0] for key in weight_client._stale_cache) == ['http://weight/session/2']
+    assert weight_client.get_breaker_stats()['stale_cached_bytes'] == 16
@@ -0,0 +1,45 @@
+import pytest
+from app import create_app
+from app.utils import get_db_connection
+
+
+@pytest.fixture
+def client():
+    """Create test client for the Flask app."""
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_metrics_reports_db_pool(client):
+    """GET /metrics should expose the connection pool counters."""
+    client.get('/health')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    pool = response.get_json()['db_pool']
+    assert pool['pool_size'] == client.application.config['DB_POOL_SIZE']
+    for key in ('acquired', 'in_use', 'waits', 'wait_seconds', 'max_wait_seconds', 'timeouts'):
+        assert key in pool
+
+
+def test_connection_is_shared_within_app_context(client):
+    """All model calls of one request should use the same pooled connection."""
+    with client.application.app_context():
+        conn = get_db_connection()
+        conn.close()
+        assert get_db_connection() is conn
+
+
+def test_metrics_reports_weight_http(client):
+    """GET /metrics should expose the Weight service connection counters."""
+    response = client.get('/metrics')
+    http = response.get_json()['weight_http']
+    assert http['reused_connections'] == http['requests'] - http['new_connections']
+
+
+def test_metrics_reports_bill_coalescing(client):
+    """GET /metrics should expose the coalesced bill computations."""
+    response = client.get('/metrics')
+    flights = response.get_json()['bill_coalescing']
+    assert set(flights) == {'executed', 'coalesced', 'in_flight'}
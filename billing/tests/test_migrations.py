@@ -0,0 +1,73 @@
+# =============================================================================
+# MIGRATION RUNNER TESTS
+# =============================================================================
+# app.migrations brings existing billdb volumes up to db/billingdb.sql
+
+import os
+import pytest
+from mysql.connector.errors import IntegrityError
+from app import create_app
+from app.utils import get_db_connection
+from app.migrations import apply_migrations, migration_files, split_statements
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def test_split_statements_skips_comments_and_use():
+    sql = """
+    -- Comment; with a semicolon
+    USE `billdb`;
+    ALTER TABLE `Trucks` ADD KEY `idx_trucks_provider` (`provider_id`);
+    /*
+    INSERT INTO Provider (`name`) VALUES ('pro1');
+    */
+    ALTER TABLE `Provider` ADD UNIQUE KEY `uq_provider_name` (`name`(191));
+    """
+    assert split_statements(sql) == [
+        "ALTER TABLE `Trucks` ADD KEY `idx_trucks_provider` (`provider_id`)",
+        "ALTER TABLE `Provider` ADD UNIQUE KEY `uq_provider_name` (`name`(191))",
+    ]
+
+
+def test_schema_file_records_every_migration():
+    """A new migration must also be listed in db/billingdb.sql."""
+    schema_path = os.path.join(os.path.dirname(__file__), '..', 'db', 'billingdb.sql')
+    if not os.path.exists(schema_path):
+        pytest.skip("db/billingdb.sql is not part of this image")
+    with open(schema_path) as f:
+        schema = f.read()
+    for filename in migration_files():
+        assert f"('{filename}')" in schema
+
+
+def test_migrations_are_recorded_and_rerun_safely(app):
+    """Applied files are skipped; re-applying one tolerates existing keys."""
+    with app.app_context():
+        apply_migrations()
+        assert apply_migrations() == []
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM Schema_migrations WHERE filename = '007_lookup_indexes.sql'")
+        conn.commit()
+        cursor.close()
+
+        assert apply_migrations() == ['007_lookup_indexes.sql']
+
+
+def test_provider_names_are_unique(app):
+    with app.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM Provider WHERE name = 'Unique Farms'")
+        cursor.execute("INSERT INTO Provider (name) VALUES ('Unique Farms')")
+        with pytest.raises(IntegrityError):
+            cursor.execute("INSERT INTO Provider (name) VALUES ('Unique Farms')")
+        cursor.execute("DELETE FROM Provider WHERE name = 'Unique Farms'")
+        conn.commit()
+        cursor.close()
@@ -2,6 +2,8 @@ import pytest
 import json
 from app import create_app
 from app.utils import get_db_connection
+from app.models.provider import get_provider, ProviderDirectory
+from app.models.version import RATES, TRUCKS, PROVIDERS, bump_version
 
 @pytest.fixture
 def client():
@@ -33,6 +35,9 @@ def cleanup_database():
     conn.commit()
     cursor.close()
     conn.close()
+    bump_version(RATES)
+    bump_version(TRUCKS)
+    bump_version(PROVIDERS)
 
 
 def test_create_provider_success(client):
@@ -140,4 +145,81 @@ def test_update_provider_duplicate_name(client):
         data=json.dumps({'name': 'Provider Two'}),
         content_type='application/json'
     )
-    assert response.status_code == 409
\ No newline at end of file
+    assert response.status_code == 409
+
+def test_import_providers_reports_each_row(client, tmp_path):
+    """POST /providers/import should create the valid rows and report the rest."""
+    client.post('/provider', data=json.dumps({'name': 'Existing'}), content_type='application/json')
+    (tmp_path / 'providers.csv').write_text("Name\nFresh Farms\nexisting\n\nGreen Valley\nfresh farms \n\n")
+    client.application.config['IMPORT_DIR'] = str(tmp_path)
+
+    response = client.post(
+        '/providers/import',
+        data=json.dumps({'file': 'providers.csv'}),
+        content_type='application/json'
+    )
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert (data['created'], data['failed']) == (2, 2)
+    assert [(row['row'], row['status']) for row in data['rows']] == [
+        (2, 'created'), (3, 'error'), (5, 'created'), (6, 'error')
+    ]
+    created_id = data['rows'][0]['id']
+    with client.application.app_context():
+        assert get_provider(int(created_id))['name'] == 'Fresh Farms'
+
+
+def test_import_providers_bad_file(client, tmp_path):
+    """POST /providers/import should reject missing files and columns."""
+    (tmp_path / 'providers.csv').write_text("Provider\nFresh Farms\n")
+    client.application.config['IMPORT_DIR'] = str(tmp_path)
+
+    response = client.post('/providers/import', data=json.dumps({'file': 'nope.csv'}), content_type='application/json')
+    assert response.status_code == 404
+    response = client.post('/providers/import', data=json.dumps({'file': 'providers.csv'}), content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_provider_directory_pages():
+    """ProviderDirectory.page should page by id and filter by name."""
+    directory = ProviderDirectory([
+        {'id': 10001, 'name': 'Fresh Farms'},
+        {'id': 10002, 'name': 'Green Valley'},
+        {'id': 10005, 'name': 'fresh fields'},
+        {'id': 10007, 'name': 'Hill Orchards'},
+    ])
+
+    providers, next_after = directory.page(limit=2)
+    assert [p['id'] for p in providers] == [10001, 10002]
+    assert next_after == 10002
+    providers, next_after = directory.page(after=10002, limit=2)
+    assert [p['id'] for p in providers] == [10005, 10007]
+    assert next_after is None
+
+    providers, next_after = directory.page(search=' FRESH ', limit=1)
+    assert ([p['id'] for p in providers], next_after) == ([10001], 10001)
+    providers, next_after = directory.page(after=10001, search='fresh', limit=1)
+    assert ([p['id'] for p in providers], next_after) == ([10005], None)
+
+
+def test_provider_directory_null_name():
+    """Providers without a name are listed, and never match a search."""
+    directory = ProviderDirectory([{'id': 10001, 'name': None}, {'id': 10002, 'name': 'Fresh Farms'}])
+    assert [p['id'] for p in directory.page()[0]] == [10001, 10002]
+    assert [p['id'] for p in directory.page(search='farms')[0]] == [10002]
+
+
+def test_provider_ui_follows_updates(client):
+    """/provider-ui lists providers created and renamed through the API."""
+    response = client.post('/provider', data=json.dumps({'name': 'Fresh Farms'}), content_type='application/json')
+    provider_id = json.loads(response.data)['id']
+    assert b'Fresh Farms' in client.get('/provider-ui').data
+
+    client.put(f'/provider/{provider_id}', data=json.dumps({'name': 'Green Valley'}), content_type='application/json')
+    client.post('/provider', data=json.dumps({'name': 'Hill Orchards'}), content_type='application/json')
+
+    page = client.get('/provider-ui?q=valley').data
+    assert b'Green Valley' in page
+    assert b'Fresh Farms' not in page
+    assert b'Hill Orchards' not in page
@@ -2,6 +2,7 @@ import json
 import pytest
 from app import create_app
 from app.utils import get_db_connection
+from app.models.version import RATES, bump_version
 from app.routes import rates as rates_module
 
 
@@ -27,6 +28,7 @@ def cleanup_database():
     conn.commit()
     cursor.close()
     conn.close()
+    bump_version(RATES)
 
 
 # ================================
@@ -135,3 +137,83 @@ def test_get_rates_returns_200_when_db_has_data(client):
 
     # 3) Only check status code
     assert response.status_code == 200
+
+
+def test_get_rate_sees_saved_rates(client):
+    """get_rate serves from memory but picks up every save_rates()."""
+    from app.models.rate import save_rates, get_rate
+
+    with client.application.test_request_context():
+        save_rates([
+            {"product_id": "Navel", "rate": 93, "scope": "All"},
+            {"product_id": "Navel", "rate": 120, "scope": "10001"},
+        ])
+    with client.application.test_request_context():
+        assert get_rate("Navel", 10001) == 120
+        assert get_rate("Navel", 10002) == 93
+        assert get_rate("Blood", 10001) == 0
+
+    with client.application.test_request_context():
+        save_rates([{"product_id": "Navel", "rate": 95, "scope": "All"}])
+    with client.application.test_request_context():
+        assert get_rate("Navel", 10001) == 95
+
+
+def test_save_rates_replaces_table_and_dedupes(client):
+    """save_rates swaps in the new rates; a repeated (product, scope) keeps its last rate."""
+    from app.models.rate import save_rates, get_all_rates
+
+    with client.application.app_context():
+        save_rates([{"product_id": "Blood", "rate": 112, "scope": "All"}])
+        save_rates([
+            {"product_id": "Navel", "rate": 90, "scope": "All"},
+            {"product_id": "Navel", "rate": 93, "scope": "All"},
+        ])
+        assert get_all_rates() == [{"product_id": "Navel", "rate": 93, "scope": "All"}]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_parse_rates_file(tmp_path, streaming):
+    """Both readers normalize scope/rate and report the bad row number."""
+    from openpyxl import Workbook
+    from app.services.rate_parser import parse_rates_file
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Product", "Rate", "Scope"])
+    ws.append([" Navel ", 93.0, None])
+    ws.append(["Blood", 112, 10001])
+    path = tmp_path / "rates.xlsx"
+    wb.save(path)
+
+    assert parse_rates_file(str(path), streaming) == [
+        {"product_id": "Navel", "rate": 93, "scope": "All"},
+        {"product_id": "Blood", "rate": 112, "scope": "10001"},
+    ]
+
+    ws.append(["Mandarin", None, "All"])
+    wb.save(path)
+    with pytest.raises(ValueError, match="Row 4 has missing Product or Rate"):
+        parse_rates_file(str(path), streaming)
+
+
+def test_get_rates_etag_until_rates_change(client):
+    """A repeat download of the same rates version is a 304; a new upload changes the ETag."""
+    from app.models.rate import save_rates
+
+    with client.application.app_context():
+        save_rates([{"product_id": "Navel", "rate": 93, "scope": "All"}])
+
+    first = client.get("/rates")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    repeat = client.get("/rates", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+
+    with client.application.app_context():
+        save_rates([{"product_id": "Navel", "rate": 95, "scope": "All"}])
+
+    changed = client.get("/rates", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,79 @@
+# =============================================================================
+# SINGLE-FLIGHT TESTS
+# =============================================================================
+# Coalescing of identical concurrent bill computations
+
+import threading
+import time
+from app.utils.singleflight import SingleFlight
+
+
+def _run_concurrently(flights, key, fn, callers):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flights.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def compute():
+        runs.append(1)
+        release.wait(5)
+        return {'total': 42, 'products': []}
+
+    threads, results, errors = _run_concurrently(flights, ('bill', 1), compute, 5)
+    # Wait until all callers joined the running computation
+    while flights.stats()['coalesced'] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(runs) == 1
+    assert errors == []
+    assert results == [{'total': 42, 'products': []}] * 5
+    # Each caller can modify its bill without affecting the others
+    assert len({id(result) for result in results}) == 5
+    assert flights.stats() == {'executed': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+def test_error_is_shared_and_not_cached():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ConnectionError("Weight service timed out")
+
+    threads, results, errors = _run_concurrently(flights, 'key', fail, 3)
+    while flights.stats()['coalesced'] < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert len(errors) == 3
+
+    # Once finished, the next call computes again
+    assert flights.do('key', lambda: 'ok') == 'ok'
+    assert flights.stats()['executed'] == 2
+
+
+def test_different_keys_do_not_wait_on_each_other():
+    flights = SingleFlight()
+    assert flights.do(('bill', 1), lambda: 1) == 1
+    assert flights.do(('bill', 2), lambda: 2) == 2
+    assert flights.stats()['coalesced'] == 0
@@ -1,7 +1,9 @@
 import pytest
 import json
+from openpyxl import Workbook
 from app import create_app
 from app.utils import get_db_connection
+from app.models.version import RATES, TRUCKS, PROVIDERS, bump_version
 
 
 @pytest.fixture
@@ -34,6 +36,9 @@ def cleanup_database():
     conn.commit()
     cursor.close()
     conn.close()
+    bump_version(RATES)
+    bump_version(TRUCKS)
+    bump_version(PROVIDERS)
 
 
 def create_test_provider(client, name="Test Provider"):
@@ -206,6 +211,30 @@ def test_update_truck_provider_success(client):
     assert str(data['provider']) == str(provider_id2)
 
 
+def test_truck_index_follows_updates(client):
+    """The in-memory truck index sees every POST/PUT /truck right away."""
+    provider_id1 = create_test_provider(client, "Provider One")
+    provider_id2 = create_test_provider(client, "Provider Two")
+    client.post(
+        '/truck',
+        data=json.dumps({'id': 'TRK-002', 'provider': provider_id1}),
+        content_type='application/json'
+    )
+    client.put(
+        '/truck/TRK-002',
+        data=json.dumps({'provider': provider_id2}),
+        content_type='application/json'
+    )
+
+    # Same provider again is a conflict only if the index saw the update
+    response = client.put(
+        '/truck/trk-002',
+        data=json.dumps({'provider': provider_id2}),
+        content_type='application/json'
+    )
+    assert response.status_code == 409
+
+
 def test_update_truck_empty_id(client):
     """PUT /truck/ with empty id should return 400."""
     provider_id = create_test_provider(client)
@@ -507,3 +536,89 @@ def test_get_truck_weight_service_empty_sessions(client, mocker):
     assert data['tara'] == 5000
     assert data['sessions'] == []
 
+
+
+# =============================================================================
+# GET /trucks (batch)
+# =============================================================================
+
+def test_get_trucks_batch(client, mocker):
+    """GET /trucks should return every known truck keyed by id, in one request."""
+    provider_id = create_test_provider(client)
+    for truck_id in ('TRK-101', 'TRK-102'):
+        client.post(
+            '/truck',
+            data=json.dumps({'id': truck_id, 'provider': provider_id}),
+            content_type='application/json'
+        )
+
+    items = {
+        'TRK-101': [
+            {"id": 1, "tara": 5000, "session_id": 101},
+            {"id": 2, "tara": 5100, "session_id": 101},
+            {"id": 3, "tara": "na", "session_id": 102}
+        ],
+        'TRK-102': []
+    }
+
+    def fake_get(url, params=None, **kwargs):
+        response = mocker.MagicMock()
+        response.json.return_value = items[url.rsplit('/', 1)[1]]
+        return response
+
+    mock_get = mocker.patch('app.services.weight_client.http_get', side_effect=fake_get)
+
+    response = client.get('/trucks?ids=TRK-101,TRK-102,TRK-404,TRK-101&from=20251101000000&to=20251123120000')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['trucks'] == {
+        'TRK-101': {'id': 'TRK-101', 'tara': 5100, 'sessions': [101, 102]},
+        'TRK-102': {'id': 'TRK-102', 'tara': 'na', 'sessions': []}
+    }
+    assert data['not_found'] == ['TRK-404']
+    # One Weight service call per known truck, duplicates included once
+    assert mock_get.call_count == 2
+    assert mock_get.call_args[1]['params'] == {'from': '20251101000000', 'to': '20251123120000'}
+
+
+def test_get_trucks_batch_validation(client):
+    """GET /trucks should require ids and validate dates."""
+    assert client.get('/trucks').status_code == 400
+    assert client.get('/trucks?ids=TRK-101&from=2025-11-01').status_code == 400
+
+
+# =============================================================================
+# POST /trucks/import
+# =============================================================================
+
+def test_import_trucks_xlsx(client, tmp_path):
+    """POST /trucks/import should register valid rows by provider id or name."""
+    provider_id = create_test_provider(client, "Fresh Farms")
+    client.post('/truck', data=json.dumps({'id': 'TRK-OLD', 'provider': provider_id}), content_type='application/json')
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Id', 'Provider'])
+    ws.append(['TRK-101', provider_id])
+    ws.append(['TRK-102', 'fresh farms'])
+    ws.append(['trk-101', provider_id])         # duplicate in file
+    ws.append(['TRK-OLD', provider_id])         # already registered
+    ws.append(['TRK-103', 99999])               # unknown provider
+    ws.append(['TRK-TOO-LONG-ID', provider_id])
+    wb.save(tmp_path / 'trucks.xlsx')
+    client.application.config['IMPORT_DIR'] = str(tmp_path)
+
+    response = client.post('/trucks/import', data=json.dumps({'file': 'trucks.xlsx'}), content_type='application/json')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert (data['created'], data['failed']) == (2, 4)
+    assert [row.get('error') for row in data['rows']] == [
+        None, None, 'Truck already exists', 'Truck already exists',
+        'Provider not found', 'Truck id must be at most 10 characters'
+    ]
+
+    # New trucks are visible through the truck index right away
+    response = client.put('/truck/TRK-102', data=json.dumps({'provider': provider_id}), content_type='application/json')
+    assert response.status_code == 409
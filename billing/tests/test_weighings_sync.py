@@ -0,0 +1,165 @@
+# =============================================================================
+# WEIGHINGS REPLICA TESTS
+# =============================================================================
+# Sync of GET /weight/sync into the Weighings table, and bills read from it
+
+import json
+import pytest
+from app import create_app
+from app.utils import get_db_connection
+from app.models.version import RATES, TRUCKS, PROVIDERS, bump_version
+from app.services.weight_sync import sync_weighings
+
+
+@pytest.fixture
+def client():
+    """Create test client for the Flask app."""
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['WEIGHT_SYNC_LOOKBACK_HOURS'] = 0
+    with app.test_client() as client:
+        with app.app_context():
+            cleanup_db()
+        yield client
+        with app.app_context():
+            cleanup_db()
+
+
+def cleanup_db():
+    """Delete all test data from database."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM Weighings")
+    cursor.execute("DELETE FROM Sync_state")
+    cursor.execute("DELETE FROM Bill_snapshots")
+    cursor.execute("DELETE FROM Trucks")
+    cursor.execute("DELETE FROM Rates")
+    cursor.execute("DELETE FROM Provider")
+    cursor.execute("ALTER TABLE Provider AUTO_INCREMENT = 10001")
+    conn.commit()
+    cursor.close()
+    conn.close()
+    bump_version(RATES)
+    bump_version(TRUCKS)
+    bump_version(PROVIDERS)
+
+
+def weighing(id, truck, produce, neto, direction='in', datetime='20240110080000'):
+    return {'id': id, 'session_id': id, 'datetime': datetime, 'direction': direction,
+            'truck': truck, 'produce': produce, 'bruto': 10000, 'neto': neto}
+
+
+def mock_sync_pages(mocker, rows):
+    """Serve rows like GET /weight/sync: id > after, from <= datetime <= to, ordered, limit per page."""
+    def fake_page(after, from_date=None, limit=1000, to_date=None):
+        page = [
+            r for r in rows
+            if r['id'] > after
+            and (not from_date or r['datetime'] >= from_date)
+            and (not to_date or r['datetime'] <= to_date)
+        ][:limit]
+        return {'results': page, 'last_id': page[-1]['id'] if page else after}
+    return mocker.patch('app.services.weight_sync.get_weight_sync_page', side_effect=fake_page)
+
+
+def setup_provider(client):
+    response = client.post('/provider', data=json.dumps({'name': 'Replica Farms'}), content_type='application/json')
+    provider_id = json.loads(response.data)['id']
+    client.post('/truck', data=json.dumps({'id': 'T-14409', 'provider': provider_id}), content_type='application/json')
+    with client.application.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO Rates (product_id, rate, scope) VALUES (%s, %s, %s)", ('Navel', 93, 'All'))
+        cursor.execute("INSERT INTO Rates (product_id, rate, scope) VALUES (%s, %s, %s)", ('Navel', 120, str(provider_id)))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        bump_version(RATES)
+    return provider_id
+
+
+def test_sync_advances_high_water_mark(client, mocker):
+    """Only rows above the stored last id are pulled again."""
+    client.application.config['WEIGHT_SYNC_BATCH'] = 2
+    rows = [weighing(i, 'T-14409', 'Navel', 1000) for i in range(1, 6)]
+    mock_page = mock_sync_pages(mocker, rows)
+
+    with client.application.app_context():
+        assert sync_weighings()['pulled'] == 5
+        assert sync_weighings()['pulled'] == 0
+    assert mock_page.call_args[0][0] == 5
+
+
+def test_bill_from_replica(client, mocker):
+    """BILL_SOURCE=replica computes the bill with one SQL join, without the Weight API."""
+    provider_id = setup_provider(client)
+    mock_sync_pages(mocker, [
+        weighing(1, 'T-14409', 'Navel', 8500),
+        weighing(2, 'T-14409', 'Navel', 9200),
+        weighing(3, 'T-14409', 'Navel', None),
+        weighing(4, 'T-14409', 'Navel', 5000, direction='out'),
+        weighing(5, 'T-99999', 'Navel', 7000),
+    ])
+    with client.application.app_context():
+        sync_weighings()
+
+    client.application.config['BILL_SOURCE'] = 'replica'
+    weight_api = mocker.patch('app.services.weight_client.http_get')
+    response = client.get(f'/bill/{provider_id}?from=20240101000000&to=20240131235959')
+
+    assert response.status_code == 200
+    data = json.loads(response.data)
+    assert data['sessionCount'] == 3
+    assert data['products'] == [
+        {'product': 'Navel', 'count': '2', 'amount': 17700, 'rate': 120, 'pay': 17700 * 120}
+    ]
+    assert not weight_api.called
+
+
+def test_invalidate_refreshes_replica(client, mocker):
+    """A force update older than the lookback window reaches Weighings on invalidation."""
+    provider_id = setup_provider(client)
+    rows = [weighing(1, 'T-14409', 'Navel', 8500)]
+    mock_sync_pages(mocker, rows)
+    with client.application.app_context():
+        sync_weighings()
+
+    # Rewritten in place, with its original datetime
+    rows[0] = weighing(1, 'T-14409', 'Navel', 6000)
+    client.application.config['WEIGHT_SYNC'] = True
+    response = client.post(
+        '/bill-snapshots/invalidate',
+        data=json.dumps({'from': '20240110080000', 'to': '20240110080000'}),
+        content_type='application/json'
+    )
+    assert json.loads(response.data)['refreshed'] == 1
+
+    client.application.config['BILL_SOURCE'] = 'replica'
+    data = json.loads(client.get(f'/bill/{provider_id}?from=20240101000000&to=20240131235959').data)
+    assert data['products'][0]['amount'] == 6000
+
+
+def test_replica_behind_is_not_snapshotted(client, mocker):
+    """Closed-period bills are stored only once a sync run started after the period caught up."""
+    provider_id = setup_provider(client)
+    mock_sync_pages(mocker, [weighing(1, 'T-14409', 'Navel', 8500)])
+    client.application.config['BILL_SOURCE'] = 'replica'
+    url = f'/bill/{provider_id}?from=20240101000000&to=20240131235959'
+
+    # Never synced: the bill is served but marked stale, and not stored
+    response = client.get(url)
+    assert response.headers.get('X-Weight-Data-Stale') == 'true'
+
+    with client.application.app_context():
+        sync_weighings()
+    response = client.get(url)
+    assert 'X-Weight-Data-Stale' not in response.headers
+    assert json.loads(response.data)['products'][0]['amount'] == 8500
+
+    with client.application.app_context():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Bill_snapshots")
+        assert cursor.fetchone()[0] == 1
+        cursor.close()
+        conn.close()
@@ -1,11 +1,13 @@
-from datetime import datetime, timezone
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
 from flask import Flask, Response, request, render_template, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 import secrets
 import os
 import sys
 import json
-from api import utils
+import click
+from api import utils, archive, idempotency, group_commit, billing_notify
 
 # configure the database connection
 db = SQLAlchemy()
@@ -30,11 +32,77 @@ def init_app(test_config=None):
         )
         app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # cold archive of old transactions (see api/archive.py)
+    app.config.setdefault("ARCHIVE_DIR", os.getenv("WEIGHT_ARCHIVE_DIR", "archive"))
+    app.config.setdefault(
+        "ARCHIVE_HORIZON_DAYS", int(os.getenv("WEIGHT_ARCHIVE_HORIZON_DAYS", "90"))
+    )
+
+    # responses kept for retried POST /weight requests (see api/idempotency.py)
+    app.config.setdefault(
+        "IDEMPOTENCY_TTL", int(os.getenv("WEIGHT_IDEMPOTENCY_TTL", "3600"))
+    )
+    app.config.setdefault(
+        "IDEMPOTENCY_MAX_KEYS", int(os.getenv("WEIGHT_IDEMPOTENCY_MAX_KEYS", "10000"))
+    )
+
+    # optional group commit of POST /weight (see api/group_commit.py)
+    app.config.setdefault("GROUP_COMMIT", os.getenv("WEIGHT_GROUP_COMMIT") == "1")
+    app.config.setdefault(
+        "GROUP_COMMIT_WINDOW_MS", int(os.getenv("WEIGHT_GROUP_COMMIT_WINDOW_MS", "5"))
+    )
+    app.config.setdefault(
+        "GROUP_COMMIT_MAX_BATCH", int(os.getenv("WEIGHT_GROUP_COMMIT_MAX_BATCH", "64"))
+    )
+    app.config.setdefault(
+        "GROUP_COMMIT_TIMEOUT", float(os.getenv("WEIGHT_GROUP_COMMIT_TIMEOUT", "10"))
+    )
+
+    # billing service told about force-updated weighings (see api/billing_notify.py)
+    app.config.setdefault("BILLING_BASE_URL", os.getenv("BILLING_BASE_URL", ""))
+    app.config.setdefault(
+        "BILL_SNAPSHOT_AFTER_HOURS", float(os.getenv("BILL_SNAPSHOT_AFTER_HOURS", "24"))
+    )
+
     # bind db to this app, and make models accessible in utils
     db.init_app(app)
     utils.db = db
     utils.Transactions = Transactions
     utils.Containers_registered = Containers_registered
+    utils.Transaction_containers = Transaction_containers
+    archive.db = db
+    archive.Transactions = Transactions
+    archive.Transaction_containers = Transaction_containers
+    idempotency.store = idempotency.IdempotencyStore(
+        app.config["IDEMPOTENCY_MAX_KEYS"], app.config["IDEMPOTENCY_TTL"]
+    )
+    billing_notify.db = db
+    billing_notify.base_url = app.config["BILLING_BASE_URL"].rstrip("/")
+    billing_notify.closed_after = timedelta(hours=app.config["BILL_SNAPSHOT_AFTER_HOURS"])
+    billing_notify.install(db.session)
+    group_commit.db = db
+    group_commit.utils = utils
+    group_commit.writer = (
+        group_commit.GroupCommitWriter(
+            app,
+            app.config["GROUP_COMMIT_WINDOW_MS"] / 1000,
+            app.config["GROUP_COMMIT_MAX_BATCH"],
+            app.config["GROUP_COMMIT_TIMEOUT"],
+        )
+        if app.config["GROUP_COMMIT"]
+        else None
+    )
+
+    # CLI commands
+
+    @app.cli.command("archive")
+    @click.option("--days", type=int, default=None, help="archive horizon in days")
+    def archive_command(days):
+        """Move closed transactions older than the horizon to the archive files."""
+        if days is None:
+            days = app.config["ARCHIVE_HORIZON_DAYS"]
+        archived = archive.archive_transactions(days)
+        click.echo(f"Archived {archived} transactions older than {days} days")
 
     # Endpoint definitions
 
@@ -51,9 +119,9 @@ def init_app(test_config=None):
         from_date = utils.str_to_datetime(raw_from) if raw_from else None
         to_date = utils.str_to_datetime(raw_to) if raw_to else None
 
-        relevant_transactions = utils.get_query_transactions(
+        relevant_transactions = archive.query_transactions(
             from_date, to_date, direction, None, None
-        )
+        ) + utils.get_query_transactions(from_date, to_date, direction, None, None)
         # UI mode
         if utils.is_ui_mode():
             return render_template("weight_search.html", results=relevant_transactions)
@@ -73,86 +141,183 @@ def init_app(test_config=None):
             ]
         }
 
+    @app.route("/weight/sync", methods=["GET"])
+    def get_weight_sync():
+        # incremental feed of transactions for replicas (billing), ordered by id:
+        # after - only ids above this high-water mark (default 0)
+        # from  - only transactions at or after this datetime (re-reading a
+        #         recent window picks up rows changed by force=True)
+        # to    - only transactions at or before this datetime (re-reading a
+        #         period that billing was told has changed)
+        # limit - page size (default 1000, at most 5000)
+        raw_from = request.args.get("from")
+        raw_to = request.args.get("to")
+        try:
+            after = int(request.args.get("after", 0))
+            limit = min(int(request.args.get("limit", 1000)), 5000)
+            from_date = utils.str_to_datetime(raw_from) if raw_from else None
+            to_date = utils.str_to_datetime(raw_to) if raw_to else None
+        except ValueError:
+            return jsonify(
+                {"error": "after and limit must be integers, from/to yyyymmddhhmmss"}
+            ), 400
+
+        query = Transactions.query.filter(Transactions.id > after)
+        if from_date:
+            query = query.filter(Transactions.datetime >= from_date)
+        if to_date:
+            query = query.filter(Transactions.datetime <= to_date)
+        rows = query.order_by(Transactions.id).limit(limit).all()
+
+        return {
+            "results": [
+                {
+                    "id": t.id,
+                    "datetime": t.datetime.strftime("%Y%m%d%H%M%S") if t.datetime else None,
+                    "direction": t.direction,
+                    "truck": t.truck,
+                    "produce": t.produce,
+                    "bruto": t.bruto,
+                    "neto": t.neto,
+                    "session_id": t.session_id,
+                }
+                for t in rows
+            ],
+            "last_id": rows[-1].id if rows else after,
+        }
+
     @app.route("/weight", methods=["POST"])
+    @idempotency.idempotent
     def post_weight():
         data = request.form.to_dict()
-        # last_row = Transactions.query.order_by(Transactions.id.desc()).first()
-        last_row = None
-        rows = utils.get_query_transactions(
-            None, None, None, None, data["truck"]
-        )  # get the last transaction of the truck
-        if rows:
-            last_row = rows[-1]
-
-        new_row = Transactions()
-        new_row.produce = data.get("produce")
-        new_row.direction = data.get("direction")
-        new_row.truck = data.get("truck")
-        new_row.containers = data.get("containers")
-        new_row.truckTara = None
-        new_row.neto = None
-        force = data.get("force")
-        unit = data.get("unit")
-        new_row.bruto = int(data.get("weight"))
-        new_row.bruto = utils.convert_to_kg(new_row.bruto, unit)
-        utils.handle_session(
-            new_row, new_row.direction, new_row.truck
-        )  # handle the sessions
-        if last_row:  # check if the last row exist
-            if (
-                last_row.direction == "in" or not last_row.direction
-            ) and new_row.direction == "out":
-                # handle the situation truck -> in\ null -> out
-                containers_weight = utils.calc_containers_weight(new_row.containers)
-                if containers_weight or len(new_row.containers) == 0:
-                    new_row.truckTara = utils.calc_truck_tara(new_row)
-                    neto = utils.calc_neto_fruit(
-                        int(last_row.bruto), new_row.truckTara, last_row.containers
-                    )
-                    new_row.neto = neto
-
-            if last_row.direction == new_row.direction or {
-                last_row.direction,
-                new_row.direction,
-            } == {None, "in"}:
-                # handles situation that new_record conflicts with old, truck is in and tries to enter again
-                if force == "True":
-                    utils.update_row(last_row, new_row)
-                    if utils.is_ui_mode():
-                        return render_template(
-                            "weight_new.html", result=utils.verbose(last_row)
+        try:
+            if group_commit.writer:
+                # the writer thread applies and commits it together with other weighings
+                future = group_commit.writer.submit(data)
+                try:
+                    result = future.result(timeout=group_commit.writer.timeout)
+                except FutureTimeoutError:
+                    # only a weighing the writer hasn't taken yet can be given up,
+                    # a taken one is committed or failed by it, so its outcome counts
+                    if future.cancel():
+                        abort(
+                            503, description="weighing not written in time, retry later"
                         )
-                    return utils.verbose(last_row)
-
-                abort(
-                    409,
-                    description=f"truck already {last_row.direction} use force=True to update",
-                )
-        elif new_row.direction == "out":
-            # handle situation that a truck that isn't in trying to leave
-            abort(
-                409,
-                description="truck isn't in use force=True to update",
-            )
-
-        db.session.add(new_row)
-        db.session.commit()
+                    result = future.result()
+            else:
+                history = utils.get_query_transactions(
+                    None, None, None, None, data["truck"]
+                )  # get the transactions of the truck, the last one is checked against
+                row = utils.apply_weighing(data, history)
+                db.session.commit()
+                result = utils.verbose(row)
+        except utils.WeighingConflict as e:
+            abort(409, description=str(e))
 
         # UI mode (form from weight_new.html)
         if utils.is_ui_mode():
-            return render_template("weight_new.html", result=utils.verbose(new_row))
+            return render_template("weight_new.html", result=result)
+
+        return result
+
+    @app.route("/weight/bulk", methods=["POST"])
+    @idempotency.idempotent
+    def post_weight_bulk():
+        # ordered weighings replayed by a scale terminal that was offline:
+        # {"weighings": [{"direction": "in", "truck": "T-1", "containers": "C1,C2",
+        #                 "weight": 2000, "unit": "kg", "produce": "orange",
+        #                 "force": false, "datetime": "20250101103000"}, ...]}
+        payload = request.get_json(silent=True)
+        items = payload.get("weighings") if isinstance(payload, dict) else payload
+        if not isinstance(items, list):
+            return jsonify({"error": "expected a list of weighings"}), 400
+
+        # every weighing is checked first, so one bad item is reported on its own
+        reported = []  # (index, row) or (index, status, error)
+        valid = []  # (index, data)
+        for index, item in enumerate(items):
+            error = utils.check_bulk_weighing(item)
+            if error:
+                reported.append((index, 400, error))
+                continue
+            data = dict(item)
+            data["force"] = "True" if item.get("force") in (True, "True") else "False"
+            if data.get("datetime"):
+                data["datetime"] = utils.str_to_datetime(str(data["datetime"]))
+            valid.append((index, data))
+
+        # batched lookups: the history of every truck and all container weights
+        trucks = {data["truck"] for _, data in valid}
+        histories = {truck: [] for truck in trucks}
+        for row in (
+            Transactions.query.filter(Transactions.truck.in_(list(trucks)))
+            .order_by(Transactions.id)
+            .all()
+        ):
+            histories.setdefault(row.truck, []).append(row)
+        container_ids = set()
+        for _, data in valid:
+            container_ids.update(utils.split_containers(data.get("containers")))
+        for history in histories.values():
+            for row in history[-2:]:
+                container_ids.update(row.container_ids)
+        registry = utils.get_container_registry(container_ids)
+
+        # nothing is written before every weighing was applied: the tables are
+        # MyISAM, a rollback can't undo rows that were already flushed
+        try:
+            with db.session.no_autoflush:
+                for index, data in valid:
+                    try:
+                        row = utils.apply_weighing(
+                            data, histories[data["truck"]], registry
+                        )
+                    except utils.WeighingConflict as e:
+                        reported.append((index, 409, str(e)))
+                        continue
+                    reported.append((index, row))
+        except Exception:
+            db.session.rollback()  # nothing was written yet
+            raise
+        reported.sort(key=lambda r: r[0])
+
+        # written in one flush, ids are known after it
+        try:
+            db.session.flush()
+            results = [
+                {"index": r[0], "status": 200, "result": utils.verbose(r[1])}
+                if len(r) == 2
+                else {"index": r[0], "status": r[1], "error": r[2]}
+                for r in reported
+            ]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-        return utils.verbose(new_row)
+        return jsonify({"results": results}), 200
 
     @app.route("/item/<item_id>", methods=["GET"])
     def get_item(item_id):
         raw_from = request.args.get("from")
         raw_to = request.args.get("to")
 
+        # Set date range
+        from_date = (
+            utils.str_to_datetime(raw_from)
+            if raw_from
+            else datetime.now().replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
+        )
+        to_date = utils.str_to_datetime(raw_to) if raw_to else datetime.now()
+
         # Check if container or truck exists
-        if not utils.get_query_transactions(
-            None, None, None, item_id, None
-        ) and not utils.get_query_transactions(None, None, None, None, item_id):
+        if (
+            not utils.get_query_transactions(None, None, None, item_id, None)
+            and not utils.get_query_transactions(None, None, None, None, item_id)
+            and not archive.item_exists(item_id)
+        ):
             if utils.is_ui_mode():
                 return render_template(
                     "item.html",
@@ -164,19 +329,15 @@ def init_app(test_config=None):
                 )
             return Response("Item not found", status=404)
 
-        # Set date range
-        from_date = (
-            utils.str_to_datetime(raw_from)
-            if raw_from
-            else datetime.now().replace(
-                day=1, hour=0, minute=0, second=0, microsecond=0
-            )
+        relevant_transactions = archive.query_transactions(
+            from_date, to_date, None, item_id, None
         )
-        to_date = utils.str_to_datetime(raw_to) if raw_to else datetime.now()
-
-        relevant_transactions = utils.get_query_transactions(
+        relevant_transactions += utils.get_query_transactions(
             from_date, to_date, None, item_id, None
         )
+        relevant_transactions += archive.query_transactions(
+            from_date, to_date, None, None, item_id
+        )
         relevant_transactions += utils.get_query_transactions(
             from_date, to_date, None, None, item_id
         )
@@ -245,9 +406,16 @@ def init_app(test_config=None):
         db.session.commit()
         return Response("Batch processed successfully", status=200)
 
+    def session_rows(session_id):
+        rows = Transactions.query.filter(Transactions.session_id == session_id).all()
+        if not rows and session_id.isdigit():
+            # closed sessions older than the archive horizon
+            rows = archive.query_session(int(session_id))
+        return rows
+
     @app.route("/session/<id>", methods=["GET"])
     def get_session(id):
-        rows = Transactions.query.filter(Transactions.session_id == id).all()
+        rows = session_rows(id)
 
         if not rows:
             return jsonify({"error": "session not found"}), 404
@@ -328,9 +496,7 @@ def init_app(test_config=None):
 
         if session_id:
             # Search by session ID
-            sessions = Transactions.query.filter(
-                Transactions.session_id == session_id
-            ).all()
+            sessions = session_rows(session_id)
 
         return render_template("session.html", sessions=sessions)
 
@@ -345,12 +511,44 @@ class Transactions(db.Model):
     datetime = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     direction = db.Column(db.String(10))  # in / out / out
     truck = db.Column(db.String(50))
-    containers = db.Column(db.String(10000))
     bruto = db.Column(db.Integer)
     truckTara = db.Column(db.Integer)
     neto = db.Column(db.Integer)
     produce = db.Column(db.String(50))
     session_id = db.Column(db.Integer)
+    # containers are kept one per row in transaction_containers, in the order they were sent
+    container_links = db.relationship(
+        "Transaction_containers",
+        order_by="Transaction_containers.position",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+
+    @property
+    def container_ids(self):
+        return [c.container_id for c in self.container_links]
+
+    # the API keeps the comma separated form ("C1,C2")
+    @property
+    def containers(self):
+        return ",".join(self.container_ids)
+
+    @containers.setter
+    def containers(self, value):
+        self.container_links = [
+            Transaction_containers(position=position, container_id=container_id)
+            for position, container_id in enumerate(utils.split_containers(value))
+        ]
+
+
+class Transaction_containers(db.Model):
+    __tablename__ = "transaction_containers"
+
+    transaction_id = db.Column(
+        db.Integer, db.ForeignKey("transactions.id"), primary_key=True
+    )
+    position = db.Column(db.Integer, primary_key=True)
+    container_id = db.Column(db.String(15), index=True)
 
 
 class Containers_registered(db.Model):
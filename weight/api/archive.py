@@ -0,0 +1,269 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from flask import current_app
+from sqlalchemy import case, func
+
+
+# dependencies to be injected from app.py
+db = None
+Transactions = None
+Transaction_containers = None
+
+
+# the columns kept for every archived transaction (same as the transactions table)
+ARCHIVE_COLUMNS = [
+    "id",
+    "datetime",
+    "direction",
+    "truck",
+    "containers",
+    "bruto",
+    "truckTara",
+    "neto",
+    "produce",
+    "session_id",
+]
+DATE_FMT = "%Y%m%d%H%M%S"
+PARTITION_RE = re.compile(r"^transactions-(\d{4})-(\d{2})\.json\.gz$")
+
+
+# ---
+# partition (file) helper functions
+# ---
+# every month of archived transactions lives in its own gzip file, stored
+# column by column: {"columns": {"id": [...], "datetime": [...], ...}}
+
+
+def archive_dir():
+    return current_app.config["ARCHIVE_DIR"]
+
+
+def partition_path(year, month):
+    return os.path.join(archive_dir(), f"transactions-{year:04d}-{month:02d}.json.gz")
+
+
+def month_start(year, month):
+    return datetime(year, month, 1)
+
+
+def next_month_start(year, month):
+    if month == 12:
+        return datetime(year + 1, 1, 1)
+    return datetime(year, month + 1, 1)
+
+
+def list_partitions(from_date=None, to_date=None):
+    # returns the (year, month) partitions that overlap the [from_date, to_date] range
+    try:
+        names = os.listdir(archive_dir())
+    except FileNotFoundError:
+        return []
+
+    partitions = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if not match:
+            continue
+        year, month = int(match.group(1)), int(match.group(2))
+        if to_date and month_start(year, month) > to_date:
+            continue
+        if from_date and next_month_start(year, month) <= from_date:
+            continue
+        partitions.append((year, month))
+    return sorted(partitions)
+
+
+@lru_cache(maxsize=12)
+def _load_partition(path, mtime_ns):
+    # mtime_ns is part of the cache key so a rewritten partition is re-read
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)["columns"]
+
+
+def read_partition(year, month):
+    path = partition_path(year, month)
+    if not os.path.exists(path):
+        return {column: [] for column in ARCHIVE_COLUMNS}
+    return _load_partition(path, os.stat(path).st_mtime_ns)
+
+
+def write_partition(year, month, columns):
+    # write to a temp file and rename it, so readers never see a half written partition
+    os.makedirs(archive_dir(), exist_ok=True)
+    path = partition_path(year, month)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump({"columns": columns}, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def row_to_record(row):
+    record = {column: getattr(row, column) for column in ARCHIVE_COLUMNS}
+    if record["datetime"]:
+        record["datetime"] = record["datetime"].strftime(DATE_FMT)
+    return record
+
+
+def iter_records(columns):
+    for values in zip(*(columns[column] for column in ARCHIVE_COLUMNS)):
+        yield dict(zip(ARCHIVE_COLUMNS, values))
+
+
+def record_to_row(record):
+    # archived rows are returned as detached Transactions objects, so callers can
+    # use them exactly like rows queried from the database
+    values = dict(record)
+    if values["datetime"]:
+        values["datetime"] = datetime.strptime(values["datetime"], DATE_FMT)
+    return Transactions(**values)
+
+
+# ---
+# archive job
+# ---
+def get_closed_sessions(cutoff, limit):
+    # a session is closed once the truck went out; it can be archived when all
+    # of its rows are older than the cutoff
+    return [
+        r.session_id
+        for r in db.session.query(Transactions.session_id)
+        .filter(Transactions.session_id.isnot(None))
+        .group_by(Transactions.session_id)
+        .having(func.max(Transactions.datetime) < cutoff)
+        .having(func.count(Transactions.id) == func.count(Transactions.datetime))
+        .having(func.sum(case((Transactions.direction == "out", 1), else_=0)) > 0)
+        .order_by(func.max(Transactions.datetime))
+        .limit(limit)
+        .all()
+    ]
+
+
+def archive_rows(rows):
+    # merge the rows into their monthly partitions (rows already archived by an
+    # interrupted run are replaced, not duplicated)
+    by_month = {}
+    for row in rows:
+        by_month.setdefault((row.datetime.year, row.datetime.month), []).append(row)
+
+    for (year, month), month_rows in by_month.items():
+        records = {r["id"]: r for r in iter_records(read_partition(year, month))}
+        for row in month_rows:
+            records[row.id] = row_to_record(row)
+        ordered = sorted(records.values(), key=lambda r: r["id"])
+        write_partition(
+            year,
+            month,
+            {column: [r[column] for r in ordered] for column in ARCHIVE_COLUMNS},
+        )
+
+
+def archive_transactions(horizon_days, batch_size=1000):
+    # moves closed sessions older than horizon_days out of the database and into
+    # the archive files; returns the number of archived transactions
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    archived = 0
+
+    while True:
+        session_ids = get_closed_sessions(cutoff, batch_size)
+        if not session_ids:
+            break
+        rows = (
+            Transactions.query.filter(Transactions.session_id.in_(session_ids))
+            .order_by(Transactions.id)
+            .all()
+        )
+        # files are written before the rows are deleted, a crash in between only
+        # leaves rows that the next run archives again
+        archive_rows(rows)
+        row_ids = [row.id for row in rows]
+        Transaction_containers.query.filter(
+            Transaction_containers.transaction_id.in_(row_ids)
+        ).delete(synchronize_session=False)
+        Transactions.query.filter(Transactions.id.in_(row_ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        archived += len(rows)
+
+    return archived
+
+
+# ---
+# query helper functions
+# ---
+def query_transactions(
+    from_date=None,
+    to_date=None,
+    direction_filter=None,
+    container_filter=None,
+    truck_filter=None,
+):
+    # same filters as utils.get_query_transactions, applied to the archive files
+    # of the months that overlap the requested range
+    results = []
+    for year, month in list_partitions(from_date, to_date):
+        for record in iter_records(read_partition(year, month)):
+            row_datetime = (
+                datetime.strptime(record["datetime"], DATE_FMT)
+                if record["datetime"]
+                else None
+            )
+            if from_date and (not row_datetime or row_datetime < from_date):
+                continue
+            if to_date and (not row_datetime or row_datetime > to_date):
+                continue
+            if direction_filter in ["in", "out"] and record["direction"] != direction_filter:
+                continue
+            if container_filter and container_filter not in (
+                record["containers"] or ""
+            ).split(","):
+                continue
+            if truck_filter and record["truck"] != truck_filter:
+                continue
+            results.append(record_to_row(record))
+    return results
+
+
+@lru_cache(maxsize=256)
+def _partition_sessions(path, mtime_ns):
+    # the session ids of a partition, kept after the partition itself is evicted
+    return frozenset(_load_partition(path, mtime_ns)["session_id"])
+
+
+def query_session(session_id):
+    # the archived rows of a session; only the partitions holding it are scanned
+    rows = []
+    for year, month in list_partitions():
+        path = partition_path(year, month)
+        if session_id not in _partition_sessions(path, os.stat(path).st_mtime_ns):
+            continue
+        for record in iter_records(read_partition(year, month)):
+            if record["session_id"] == session_id:
+                rows.append(record_to_row(record))
+    return rows
+
+
+@lru_cache(maxsize=256)
+def _partition_items(path, mtime_ns):
+    # the trucks and containers of a partition, kept after the partition itself is evicted
+    columns = _load_partition(path, mtime_ns)
+    items = {truck for truck in columns["truck"] if truck}
+    for containers in columns["containers"]:
+        if containers:
+            items.update(containers.split(","))
+    return frozenset(items)
+
+
+def item_exists(item_id):
+    # checks every partition (like the database check, regardless of the
+    # requested range), only used when the item isn't in the database; each
+    # partition is decompressed once, then its item set is looked up
+    for year, month in list_partitions():
+        path = partition_path(year, month)
+        if item_id in _partition_items(path, os.stat(path).st_mtime_ns):
+            return True
+    return False
@@ -0,0 +1,83 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+
+# dependencies to be injected from app.py
+db = None
+
+# billing service to notify, notifications are off when empty
+base_url = None
+timeout = 3
+
+# billing treats periods that ended this long ago as closed (its BILL_SNAPSHOT_AFTER_HOURS)
+closed_after = timedelta(hours=24)
+
+DATE_FMT = "%Y%m%d%H%M%S"
+
+
+# ---
+# force-updated weighings -> billing snapshot invalidation
+# ---
+# billing keeps snapshots of bills for closed periods; a force=True weighing
+# rewrites a row of such a period, and a weighing replayed with its original
+# datetime (POST /weight/bulk) can be inserted into one, so billing is told to
+# drop the snapshots that cover them. the datetimes are collected on the db session and sent once
+# the session commits (best effort, in the background)
+
+
+def record_force_update(*datetimes):
+    # called by utils.update_row for the rows it rewrites
+    if not base_url:
+        return
+    db.session.info.setdefault("billing_invalidate", set()).update(
+        d for d in datetimes if d
+    )
+
+
+def record_insert(row_datetime):
+    # called by utils.apply_weighing for new rows, only old ones matter
+    if row_datetime and row_datetime <= datetime.now() - closed_after:
+        record_force_update(row_datetime)
+
+
+def install(session):
+    if not event.contains(session, "after_commit", _after_commit):
+        event.listen(session, "after_commit", _after_commit)
+        event.listen(session, "after_rollback", _after_rollback)
+
+
+def _after_commit(session):
+    datetimes = session.info.pop("billing_invalidate", None)
+    if datetimes and base_url:
+        threading.Thread(
+            target=notify,
+            args=(base_url, min(datetimes), max(datetimes)),
+            name="weight-billing-notify",
+            daemon=True,
+        ).start()
+
+
+def _after_rollback(session):
+    session.info.pop("billing_invalidate", None)
+
+
+def notify(url, from_date, to_date):
+    body = json.dumps(
+        {"from": from_date.strftime(DATE_FMT), "to": to_date.strftime(DATE_FMT)}
+    ).encode()
+    req = urllib.request.Request(
+        f"{url}/bill-snapshots/invalidate",
+        data=body,
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout):
+            pass
+    except (urllib.error.URLError, OSError):
+        # billing being down must never fail a weighing
+        pass
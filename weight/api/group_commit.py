@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+# dependencies to be injected from app.py
+db = None
+utils = None
+
+# writer to be injected from app.py when group commit is enabled
+writer = None
+
+
+class GroupCommitWriter:
+    # single writer thread for POST /weight
+    # weighings are queued by the request threads; the writer applies them in
+    # arrival order and commits them together once the batch window closes
+    # (window seconds after the first weighing, or max_batch weighings)
+
+    def __init__(self, app, window=0.005, max_batch=64, timeout=10):
+        self.app = app
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout  # seconds a request waits for its weighing
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.weighings = 0
+
+    def submit(self, data):
+        # returns a Future with the verbose() result of the weighing,
+        # or a utils.WeighingConflict exception; a Future cancelled before the
+        # writer took it is never applied
+        self._start()
+        future = Future()
+        self._queue.put((data, future))
+        return future
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "weighings": self.weighings,
+            "avg_batch": round(self.weighings / self.batches, 2) if self.batches else 0,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="weight-group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = []
+        deadline = None
+        while len(batch) < self.max_batch:
+            if deadline is None:
+                job = self._queue.get()
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    job = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            # skip the weighings whose request timed out and cancelled them
+            if job[1].set_running_or_notify_cancel():
+                batch.append(job)
+                if deadline is None:
+                    deadline = time.monotonic() + self.window
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self.app.app_context():
+                try:
+                    try:
+                        self._commit_batch(batch)
+                    except _Unwritten:
+                        # one bad weighing must not fail the others: nothing was
+                        # written yet, so they can run one by one
+                        for job in batch:
+                            self._commit_batch([job])
+                except Exception as e:
+                    # never leave a request waiting: fail what is still unresolved
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                finally:
+                    db.session.remove()
+
+    def _commit_batch(self, batch):
+        # the tables are MyISAM: a rollback can't undo rows that were already
+        # flushed, so the weighings are checked without autoflush and written
+        # in one flush at the end; a batch that failed while writing is never
+        # applied again
+        applied = []  # (future, row)
+        failed = []  # (future, exception)
+        try:
+            with db.session.no_autoflush:
+                histories = {}
+                for data, _ in batch:
+                    truck = data.get("truck")
+                    if truck not in histories:
+                        histories[truck] = utils.get_query_transactions(
+                            None, None, None, None, truck
+                        )
+                for data, future in batch:
+                    try:
+                        row = utils.apply_weighing(data, histories[data.get("truck")])
+                        applied.append((future, row))
+                    except utils.WeighingConflict as e:
+                        failed.append((future, e))
+        except Exception as e:
+            db.session.rollback()  # nothing was written yet
+            if len(batch) > 1:
+                raise _Unwritten() from e
+            batch[0][1].set_exception(e)
+            return
+
+        try:
+            db.session.flush()
+            results = [(future, utils.verbose(row)) for future, row in applied]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            results = []
+            failed.extend((future, e) for future, _ in applied)
+
+        self.batches += 1
+        self.weighings += len(batch)
+        for future, result in results:
+            future.set_result(result)
+        for future, error in failed:
+            future.set_exception(error)
+
+
+class _Unwritten(Exception):
+    # a batch failed before anything was written
+    pass
@@ -0,0 +1,152 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, jsonify, make_response, request
+from werkzeug.exceptions import HTTPException
+
+
+# store to be injected from app.py
+store = None
+
+# how long a retry waits for the original request that is still running
+IN_FLIGHT_WAIT = 30
+
+
+class _Entry:
+    def __init__(self, fingerprint, expires):
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.response = None  # (status, content_type, body) once the request finished
+        self.done = threading.Event()
+
+
+class StoreFull(Exception):
+    # every slot of the store holds a request that is still running
+    pass
+
+
+class IdempotencyStore:
+    # bounded store of responses by Idempotency-Key
+    # finished entries expire after ttl seconds, the oldest finished keys are
+    # dropped beyond max_keys; entries still in flight are never dropped, a
+    # retry of their key must not run the request a second time
+
+    def __init__(self, max_keys=10000, ttl=3600):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._entries = OrderedDict()  # insertion order == expiry order
+        self._lock = threading.Lock()
+
+    def begin(self, key, fingerprint):
+        # returns (entry, owner) - owner is True when the caller has to run the request
+        # raises StoreFull when there is no room for a new key
+        now = time.monotonic()
+        with self._lock:
+            dropped = []
+            excess = len(self._entries) - self.max_keys + 1
+            for old_key, old in self._entries.items():
+                if old.expires > now and excess <= 0:
+                    break
+                if old.done.is_set():
+                    dropped.append(old_key)
+                    excess -= 1
+            for old_key in dropped:
+                del self._entries[old_key]
+
+            entry = self._entries.get(key)
+            if entry:
+                return entry, False
+            if len(self._entries) >= self.max_keys:
+                raise StoreFull()
+            entry = _Entry(fingerprint, now + self.ttl)
+            self._entries[key] = entry
+            return entry, True
+
+    def finish(self, entry, response):
+        entry.response = (
+            response.status_code,
+            response.headers.get("Content-Type"),
+            response.get_data(),
+        )
+        entry.done.set()
+
+    def discard(self, key, entry):
+        # the request failed, a retry with the same key runs it again
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def get_key():
+    return request.headers.get("Idempotency-Key") or request.form.get("idempotency_key")
+
+
+def get_fingerprint():
+    # same key with a different request body is a client bug
+    digest = hashlib.sha256(request.path.encode())
+    digest.update(repr(sorted(request.form.items(multi=True))).encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def replay(entry):
+    status, content_type, body = entry.response
+    response = Response(body, status=status, content_type=content_type)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    # runs the view once per Idempotency-Key header (or idempotency_key form field),
+    # a repeated key gets the original response back without running the view again
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = get_key()
+        if not key or store is None:
+            return view(*args, **kwargs)
+        fingerprint = get_fingerprint()
+
+        while True:
+            try:
+                entry, owner = store.begin(key, fingerprint)
+            except StoreFull:
+                response = jsonify(
+                    {"error": "too many requests in progress, retry later"}
+                )
+                response.headers["Retry-After"] = "1"
+                return response, 503
+            if owner:
+                break
+            if entry.fingerprint != fingerprint:
+                return jsonify(
+                    {"error": "Idempotency-Key was already used with a different request"}
+                ), 422
+            if not entry.done.wait(IN_FLIGHT_WAIT):
+                return jsonify(
+                    {"error": "a request with this Idempotency-Key is still in progress"}
+                ), 409
+            if entry.response:
+                return replay(entry)
+            # the original request failed and was discarded, try to run it ourselves
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except HTTPException as e:
+            response = e.get_response()
+        except Exception:
+            store.discard(key, entry)
+            raise
+
+        if response.status_code >= 500:
+            store.discard(key, entry)
+        else:
+            store.finish(entry, response)
+        return response
+
+    return wrapper
@@ -1,21 +1,31 @@
 import secrets
 from datetime import datetime
-from flask import session, abort, request
-from sqlalchemy import or_
+from flask import session, abort, request, has_request_context
+from api import billing_notify
 
 
 # dependencies to be injected from app.py
 db = None
 Transactions = None
 Containers_registered = None
+Transaction_containers = None
 
 
 # ---
 # calculate helper functions
 # ---
-def calc_containers_weight(containers):
+def split_containers(containers):
+    # the function receives a string of containers separated by "," (as sent by the scale)
+    # and returns the list of container ids
+    if not containers:
+        return []
+    return [cid.strip() for cid in containers.split(",") if cid.strip()]
+
+
+def calc_containers_weight(containers, registry=None):
     # todo: take into consideration weight unit differences
-    # the function receives a list(string separated by ",") of containers
+    # the function receives a list of container ids
+    # and optionally a registry {container_id: (weight, unit)} that was already fetched
     # the function return the total weight of the containers or na if there was an issue
 
     total_weight = 0
@@ -23,12 +33,17 @@ def calc_containers_weight(containers):
     if not containers:  # check if there are no containers
         return total_weight
     try:
-        id_list = containers.split(",")  # creates a list of id from the containers
-        results = (
-            db.session.query(Containers_registered.weight, Containers_registered.unit)
-            .filter(Containers_registered.container_id.in_(id_list))
-            .all()
-        )  # get list of tuples with all container weight
+        id_list = list(containers)
+        if registry is not None:
+            results = [registry[cid] for cid in set(id_list) if cid in registry]
+        else:
+            results = (
+                db.session.query(
+                    Containers_registered.weight, Containers_registered.unit
+                )
+                .filter(Containers_registered.container_id.in_(id_list))
+                .all()
+            )  # get list of tuples with all container weight
         if len(results) < len(
             id_list
         ):  # check if less containers returned than the amount sent
@@ -46,10 +61,10 @@ def calc_containers_weight(containers):
         return None
 
 
-def calc_neto_fruit(bruto_weight, truckTara, containers):
-    # this functions receives a bruto weight, truck tara and a list(string separated by ",") of containers
+def calc_neto_fruit(bruto_weight, truckTara, containers, registry=None):
+    # this functions receives a bruto weight, truck tara and a list of container ids
     # and returns the neto weight by the following calculation neto = brutu - truck tara - containers_tara
-    container_weight = calc_containers_weight(containers)
+    container_weight = calc_containers_weight(containers, registry)
     try:
         if container_weight or len(containers) == 0:
             return bruto_weight - (int(truckTara) + container_weight)
@@ -133,11 +148,10 @@ def get_query_transactions(
         query = query.filter(Transactions.direction == direction_filter)
     if container_filter:
         query = query.filter(
-            or_(
-                Transactions.containers == container_filter,
-                Transactions.containers.like(f"{container_filter},%"),
-                Transactions.containers.like(f"%,{container_filter}"),
-                Transactions.containers.like(f"%,{container_filter},%"),
+            Transactions.id.in_(
+                db.session.query(Transaction_containers.transaction_id).filter(
+                    Transaction_containers.container_id == container_filter
+                )
             )
         )
     if truck_filter:
@@ -148,7 +162,111 @@ def get_query_transactions(
 # ---
 # other helper functions
 # ---
-def update_row(old_row, new_row):
+class WeighingConflict(Exception):
+    # raised when a weighing conflicts with the truck's last weighing and force wasn't set
+    pass
+
+
+def get_container_registry(container_ids):
+    # fetch the registered weights of many containers in one query
+    # returns {container_id: (weight, unit)}
+    if not container_ids:
+        return {}
+    return {
+        c.container_id: (c.weight, c.unit)
+        for c in Containers_registered.query.filter(
+            Containers_registered.container_id.in_(list(container_ids))
+        ).all()
+    }
+
+
+def check_bulk_weighing(item):
+    # the fields of one POST /weight/bulk weighing, returns an error message or None
+    if not isinstance(item, dict):
+        return "weighing must be an object"
+    if not item.get("truck") or not isinstance(item["truck"], str):
+        return "truck is required"
+    if item.get("direction") not in ("in", "out", "none"):
+        return "direction must be in, out or none"
+    if item.get("containers") is not None and not isinstance(item["containers"], str):
+        return "containers must be a comma separated string"
+    if not isinstance(item.get("unit"), str) or convert_to_kg(1, item["unit"]) is None:
+        return "unit is missing or not supported"
+    try:
+        int(item.get("weight"))
+        if item.get("datetime"):
+            str_to_datetime(str(item["datetime"]))
+    except (TypeError, ValueError):
+        return "invalid weight or datetime"
+    return None
+
+
+def apply_weighing(data, history, registry=None):
+    # the POST /weight rules for a single weighing
+    # data - the weighing fields (produce, direction, truck, containers, weight, unit, force)
+    #        and optionally datetime (a datetime object) for readings replayed later
+    # history - the truck's transactions (oldest first), a new row is appended to it
+    # registry - optional prefetched container weights (see get_container_registry)
+    # returns the row to report, raises WeighingConflict if force=True is needed
+    last_row = history[-1] if history else None
+
+    new_row = Transactions()
+    new_row.produce = data.get("produce")
+    new_row.direction = data.get("direction")
+    new_row.truck = data.get("truck")
+    new_row.containers = data.get("containers")
+    new_row.truckTara = None
+    new_row.neto = None
+    if data.get("datetime"):
+        new_row.datetime = data.get("datetime")
+    force = data.get("force")
+    unit = data.get("unit")
+    new_row.bruto = int(data.get("weight"))
+    new_row.bruto = convert_to_kg(new_row.bruto, unit)
+    handle_session(
+        new_row, new_row.direction, new_row.truck, last_row
+    )  # handle the sessions
+    if last_row:  # check if the last row exist
+        if (
+            last_row.direction == "in" or not last_row.direction
+        ) and new_row.direction == "out":
+            # handle the situation truck -> in\ null -> out
+            containers_weight = calc_containers_weight(new_row.container_ids, registry)
+            if containers_weight or len(new_row.container_ids) == 0:
+                new_row.truckTara = calc_truck_tara(new_row, registry)
+                neto = calc_neto_fruit(
+                    int(last_row.bruto),
+                    new_row.truckTara,
+                    last_row.container_ids,
+                    registry,
+                )
+                new_row.neto = neto
+
+        if last_row.direction == new_row.direction or {
+            last_row.direction,
+            new_row.direction,
+        } == {None, "in"}:
+            # handles situation that new_record conflicts with old, truck is in and tries to enter again
+            if force == "True":
+                update_row(last_row, new_row, history, registry)
+                return last_row
+
+            raise WeighingConflict(
+                f"truck already {last_row.direction} use force=True to update"
+            )
+    elif new_row.direction == "out":
+        # handle situation that a truck that isn't in trying to leave
+        raise WeighingConflict("truck isn't in use force=True to update")
+
+    db.session.add(new_row)
+    history.append(new_row)
+    billing_notify.record_insert(new_row.datetime)
+    return new_row
+
+
+def update_row(old_row, new_row, history=None, registry=None):
+    # the caller commits the changes
+    rewritten = [old_row.datetime]
     old_row.neto = new_row.neto
     old_row.bruto = new_row.bruto
     old_row.containers = new_row.containers
@@ -157,21 +275,26 @@ def update_row(old_row, new_row):
     old_row.truckTara = None
     old_row.neto = None
     if new_row.direction == "out":
-        old_row.truckTara = calc_truck_tara(new_row)
+        old_row.truckTara = calc_truck_tara(new_row, registry)
         last_in = None
-        rows = get_query_transactions(
-            None, None, None, None, new_row.truck
-        )  # get the last in transaction of the truck
+        rows = history
+        if rows is None:
+            rows = get_query_transactions(
+                None, None, None, None, new_row.truck
+            )  # get the last in transaction of the truck
         if len(rows) > 1:  # need to find the position of the last in
             last_in = rows[
                 -2
             ]  # [-1] - is the last out since its update, [-2] is the last in
         neto = calc_neto_fruit(
-            int(last_in.bruto), old_row.truckTara, last_in.containers
+            int(last_in.bruto), old_row.truckTara, last_in.container_ids, registry
         )
         old_row.neto = neto
-    db.session.commit()
+        if last_in is not None:
+            rewritten.append(last_in.datetime)
 
+    # billed periods covering these rows are outdated once the change commits
+    billing_notify.record_force_update(*rewritten)
     return 1
 
 
@@ -190,31 +313,30 @@ def verbose(row):
         return {"id": row.id, "truck": row.truck, "bruto": row.bruto}
 
 
-def handle_session(new_row, direction, truck):
+def handle_session(new_row, direction, truck, last_row=None):
+    # last_row - the last transaction of the truck
     if direction == "out":
-        rows = get_query_transactions(
-            None, None, None, None, truck
-        )  # get the last transaction of the truck
-        if rows:
-            last_row = rows[-1]
+        if last_row:
             session_id = last_row.session_id
             new_row.session_id = session_id
-            session.pop(truck, None)
+            if has_request_context():
+                session.pop(truck, None)
 
     elif direction == "in" or direction == "none" or not direction:
         # generate session
         rand_num = secrets.randbelow(2000000000)  # creates a random number for the
-        session[truck] = rand_num
+        if has_request_context():  # the group commit writer has no request
+            session[truck] = rand_num
         new_row.session_id = rand_num
 
 
-def calc_truck_tara(transaction):
+def calc_truck_tara(transaction, registry=None):
     truck_tara = None
     if transaction.bruto:
-        containers_weight = calc_containers_weight(transaction.containers)
-        if containers_weight or len(transaction.containers) == 0:
+        containers_weight = calc_containers_weight(transaction.container_ids, registry)
+        if containers_weight or len(transaction.container_ids) == 0:
             truck_tara = transaction.bruto - calc_containers_weight(
-                transaction.containers
+                transaction.container_ids, registry
             )
     return truck_tara
 
@@ -0,0 +1,81 @@
+"""
+Burst benchmark for POST /weight (shift change at the weighbridges).
+
+Every simulated truck weighs in and then out, with --concurrency trucks
+hitting the service at the same time. Run it against a running weight
+service twice - with WEIGHT_GROUP_COMMIT=0 and WEIGHT_GROUP_COMMIT=1 -
+to compare commit-bound throughput:
+
+    python bench/bench_post_weight.py --url http://localhost:8085 --trucks 400 --concurrency 40
+"""
+
+import argparse
+import secrets
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def post_weight(url, fields):
+    body = urllib.parse.urlencode(fields).encode()
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(f"{url}/weight", data=body, timeout=30) as resp:
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def weigh_truck(url, truck):
+    results = []
+    for direction, weight in (("in", 12000), ("out", 5000)):
+        results.append(
+            post_weight(
+                url,
+                {
+                    "direction": direction,
+                    "truck": truck,
+                    "containers": "",
+                    "weight": weight,
+                    "unit": "kg",
+                    "produce": "orange",
+                    "force": "False",
+                },
+            )
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8085")
+    parser.add_argument("--trucks", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=40)
+    args = parser.parse_args()
+
+    prefix = secrets.token_hex(3)
+    trucks = [f"B{prefix}-{i}" for i in range(args.trucks)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = [
+            r for truck_results in pool.map(lambda t: weigh_truck(args.url, t), trucks)
+            for r in truck_results
+        ]
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    print(f"requests:    {len(results)} ({errors} errors)")
+    print(f"elapsed:     {elapsed:.2f} s")
+    print(f"throughput:  {len(results) / elapsed:.1f} weighings/s")
+    print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+--
+-- Migration: move `transactions`.`containers` (comma separated varchar)
+-- into the `transaction_containers` table, one row per container.
+--
+-- Run once against an existing weight database:
+--   docker compose exec -T weight-db sh -c 'mysql -u root -p"$MYSQL_ROOT_PASSWORD" weight' < db/migrations/001_transaction_containers.sql
+--
+
+USE weight;
+
+CREATE TABLE IF NOT EXISTS `transaction_containers` (
+  `transaction_id` int(12) NOT NULL,
+  `position` int(6) NOT NULL,
+  `container_id` varchar(15) DEFAULT NULL,
+  PRIMARY KEY (`transaction_id`, `position`),
+  KEY `container_id` (`container_id`)
+) ENGINE=MyISAM ;
+
+-- split "C1,C2,C3" into rows by turning it into the JSON array ["C1","C2","C3"]
+-- (container ids never contain quotes or backslashes)
+INSERT IGNORE INTO `transaction_containers` (`transaction_id`, `position`, `container_id`)
+SELECT t.`id`, c.`position` - 1, TRIM(c.`container_id`)
+FROM `transactions` t,
+  JSON_TABLE(
+    CONCAT('["', REPLACE(t.`containers`, ',', '","'), '"]'),
+    '$[*]' COLUMNS (
+      `position` FOR ORDINALITY,
+      `container_id` varchar(15) PATH '$'
+    )
+  ) AS c
+WHERE t.`containers` IS NOT NULL
+  AND t.`containers` <> ''
+  AND TRIM(c.`container_id`) <> '';
+
+ALTER TABLE `transactions` DROP COLUMN `containers`;
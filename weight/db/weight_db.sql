@@ -31,7 +31,6 @@ CREATE TABLE IF NOT EXISTS `transactions` (
   `datetime` datetime DEFAULT NULL,
   `direction` varchar(10) DEFAULT NULL,
   `truck` varchar(50) DEFAULT NULL,
-  `containers` varchar(10000) DEFAULT NULL,
   `bruto` int(12) DEFAULT NULL,
   `truckTara` int(12) DEFAULT NULL,
   --   "neto": <int> or "na" // na if some of containers unknown
@@ -41,10 +40,26 @@ CREATE TABLE IF NOT EXISTS `transactions` (
   PRIMARY KEY (`id`)
 ) ENGINE=MyISAM AUTO_INCREMENT=10001 ;
 
+-- --------------------------------------------------------
+
+--
+-- Table structure for table `transaction_containers`
+-- (the containers of a transaction, one row per container in the order they were sent)
+--
+
+CREATE TABLE IF NOT EXISTS `transaction_containers` (
+  `transaction_id` int(12) NOT NULL,
+  `position` int(6) NOT NULL,
+  `container_id` varchar(15) DEFAULT NULL,
+  PRIMARY KEY (`transaction_id`, `position`),
+  KEY `container_id` (`container_id`)
+) ENGINE=MyISAM ;
+
 show tables;
 
 describe containers_registered;
 describe transactions;
+describe transaction_containers;
 
 
 
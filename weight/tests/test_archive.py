@@ -0,0 +1,134 @@
+from datetime import datetime
+
+import pytest
+
+from api import archive
+from api.app import Transactions
+
+
+OLD_DATE = datetime(2020, 3, 15, 10, 0, 0)
+
+
+@pytest.fixture
+def archive_dir(app, tmp_path):
+    app.config["ARCHIVE_DIR"] = str(tmp_path)
+    return tmp_path
+
+
+def make_old(db):
+    # move every existing transaction to OLD_DATE
+    for t in Transactions.query.all():
+        t.datetime = OLD_DATE
+    db.session.commit()
+
+
+def test_archive_moves_closed_sessions(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    make_old(db)
+
+    assert archive.archive_transactions(90) == 2
+    assert Transactions.query.count() == 0
+    assert (archive_dir / "transactions-2020-03.json.gz").exists()
+
+
+def test_archive_keeps_open_sessions(client, db, archive_dir, in_truck_payload):
+    client.post("/weight", data=in_truck_payload)
+    make_old(db)
+
+    assert archive.archive_transactions(90) == 0
+    assert Transactions.query.count() == 1
+
+
+def test_get_weight_reads_archive(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    make_old(db)
+    archive.archive_transactions(90)
+
+    response = client.get(
+        "/weight", query_string={"from": "20200301000000", "to": "20200331235959"}
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["id"] for r in results] == [1, 2]
+    assert results[0]["containers"] == "C1,C2"
+
+    response = client.get(
+        "/weight", query_string={"from": "20200401000000", "to": "20200430235959"}
+    )
+    assert response.get_json()["results"] == []
+
+
+def test_get_item_reads_archive(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    make_old(db)
+    archive.archive_transactions(90)
+
+    response = client.get(
+        "/item/C1", query_string={"from": "20200101000000", "to": "20201231235959"}
+    )
+    assert response.status_code == 200
+    assert [r["id"] for r in response.get_json()] == [1, 2]
+
+
+def test_get_session_reads_archive(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    session_id = Transactions.query.first().session_id
+    make_old(db)
+    archive.archive_transactions(90)
+
+    response = client.get(f"/session/{session_id}")
+    assert response.status_code == 200
+    assert response.get_json()["id"] == str(session_id)
+
+
+def test_get_item_archived_outside_range_exists(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    make_old(db)
+    archive.archive_transactions(90)
+
+    # like a live item: known, just nothing in the range
+    response = client.get(
+        "/item/C1", query_string={"from": "20210101000000", "to": "20211231235959"}
+    )
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_get_weight_without_from_reads_archive(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    make_old(db)
+    archive.archive_transactions(90)
+
+    assert len(client.get("/weight").get_json()["results"]) == 2
+
+
+def test_ui_session_reads_archive(
+    client, db, archive_dir, in_truck_payload, out_truck_payload
+):
+    client.post("/weight", data=in_truck_payload)
+    client.post("/weight", data=out_truck_payload)
+    session_id = Transactions.query.first().session_id
+    make_old(db)
+    archive.archive_transactions(90)
+
+    response = client.get("/ui/session", query_string={"session_id": session_id})
+    assert response.status_code == 200
+    assert b"TRUCK123" in response.data
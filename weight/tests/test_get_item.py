@@ -17,3 +17,12 @@ def test_search_by_container(client, in_truck_payload):
     assert data[0]["session_id"] is not None
 
 
+
+
+def test_search_by_container_exact_match(client, in_truck_payload):
+    client.post("/weight", data=in_truck_payload)
+    response = client.get("/item/C")
+    assert response.status_code == 404
+    response = client.get("/item/C2")
+    assert response.status_code == 200
+    assert response.get_json()[0]["id"] == 1
@@ -72,4 +72,32 @@ def test_get_transaction_today(client, in_truck_payload, ):
         "produce": "apples",
         "containers": "C1,C2",
     }
-    assert actual == expected
\ No newline at end of file
+    assert actual == expected
+
+def test_get_weight_sync_pages_by_id(
+    client, truck_no_containers_payload_in, truck_no_containers_payload_out
+):
+    client.post("/weight", data=truck_no_containers_payload_in)
+    client.post("/weight", data=truck_no_containers_payload_out)
+
+    first = client.get("/weight/sync", query_string={"limit": 1}).get_json()
+    assert [r["id"] for r in first["results"]] == [1]
+    assert first["results"][0]["truck"] == "TRUCK124"
+    assert first["results"][0]["session_id"] is not None
+
+    second = client.get(
+        "/weight/sync", query_string={"after": first["last_id"]}
+    ).get_json()
+    assert [r["id"] for r in second["results"]] == [2]
+    assert second["results"][0]["neto"] is not None
+
+    done = client.get("/weight/sync", query_string={"after": 2}).get_json()
+    assert done == {"results": [], "last_id": 2}
+
+    assert client.get("/weight/sync", query_string={"after": "x"}).status_code == 400
+
+
+def test_get_weight_sync_to_bounds_datetime(client, in_truck_payload):
+    client.post("/weight", data=in_truck_payload)
+    response = client.get("/weight/sync", query_string={"to": "20000101000000"})
+    assert response.get_json()["results"] == []
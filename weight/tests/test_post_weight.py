@@ -1,3 +1,8 @@
+import threading
+
+import pytest
+
+
 # test health endpoint
 def test_health(client):
     response = client.get("/health")
@@ -50,3 +55,207 @@ def test_post_out_update_force(
     assert second_response.status_code == 200
     third_response = client.post("/weight", data=out_truck_update_payload)
     assert third_response.status_code == 200
+
+
+# test POST /weight/bulk endpoint
+def test_bulk_post_weight_in_out(client, in_truck_payload, out_truck_payload):
+    in_truck_payload["datetime"] = "20250101100000"
+    out_truck_payload["datetime"] = "20250101110000"
+    response = client.post(
+        "/weight/bulk", json={"weighings": [in_truck_payload, out_truck_payload]}
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [200, 200]
+    assert results[0]["result"]["bruto"] == 2000
+    assert "truckTara" in results[1]["result"]
+
+    response = client.get(
+        "/weight", query_string={"from": "20250101000000", "to": "20250101235959"}
+    )
+    assert len(response.get_json()["results"]) == 2
+
+
+def test_bulk_post_weight_conflicts_are_per_item(
+    client, in_truck_payload, out_truck_payload
+):
+    response = client.post(
+        "/weight/bulk",
+        json=[in_truck_payload, in_truck_payload, out_truck_payload],
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [200, 409, 200]
+    assert "error" in results[1]
+
+
+def test_bulk_post_weight_requires_truck(client, in_truck_payload, out_truck_payload):
+    client.post("/weight", data=in_truck_payload)
+    no_truck = dict(out_truck_payload)
+    del no_truck["truck"]
+    response = client.post("/weight/bulk", json=[no_truck])
+    assert response.status_code == 200
+    assert response.get_json()["results"][0]["status"] == 400
+
+
+def test_bulk_post_weight_checks_each_item(client, in_truck_payload):
+    no_unit = dict(in_truck_payload, truck="T-99")
+    del no_unit["unit"]
+    bad_truck = dict(in_truck_payload, truck=["T-1"])
+    response = client.post("/weight/bulk", json=[in_truck_payload, no_unit, bad_truck])
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [200, 400, 400]
+
+
+def test_bulk_post_weight_invalid_body(client):
+    response = client.post("/weight/bulk", json={"weighings": "nope"})
+    assert response.status_code == 400
+
+
+# test Idempotency-Key on POST /weight
+def test_post_weight_idempotency_key_replays_response(client, in_truck_payload):
+    headers = {"Idempotency-Key": "scale-1-0001"}
+    first_response = client.post("/weight", data=in_truck_payload, headers=headers)
+    assert first_response.status_code == 200
+    second_response = client.post("/weight", data=in_truck_payload, headers=headers)
+    assert second_response.status_code == 200
+    assert second_response.get_json() == first_response.get_json()
+    assert second_response.headers["Idempotent-Replayed"] == "true"
+
+    response = client.get("/weight")
+    assert len(response.get_json()["results"]) == 1
+
+
+def test_post_weight_idempotency_key_reused_with_other_body(
+    client, in_truck_payload, out_truck_payload
+):
+    headers = {"Idempotency-Key": "scale-1-0002"}
+    client.post("/weight", data=in_truck_payload, headers=headers)
+    response = client.post("/weight", data=out_truck_payload, headers=headers)
+    assert response.status_code == 422
+
+
+def test_idempotency_store_keeps_in_flight_keys():
+    from api.idempotency import IdempotencyStore, StoreFull
+
+    store = IdempotencyStore(max_keys=2)
+    running, _ = store.begin("a", "fp")
+    finished, _ = store.begin("b", "fp")
+    finished.done.set()
+
+    # the finished key makes room, the running one is kept
+    store.begin("c", "fp")
+    assert store.begin("a", "fp") == (running, False)
+    with pytest.raises(StoreFull):
+        store.begin("d", "fp")
+
+
+# test POST /weight with group commit enabled
+def test_post_weight_group_commit(app, client, in_truck_payload, out_truck_payload):
+    from api import group_commit
+
+    group_commit.writer = group_commit.GroupCommitWriter(app)
+    try:
+        first_response = client.post("/weight", data=in_truck_payload)
+        assert first_response.status_code == 200
+        assert first_response.get_json()["bruto"] == 2000
+        second_response = client.post("/weight", data=in_truck_payload)
+        assert second_response.status_code == 409
+        third_response = client.post("/weight", data=out_truck_payload)
+        assert third_response.status_code == 200
+        assert group_commit.writer.stats()["weighings"] == 3
+    finally:
+        group_commit.writer = None
+
+
+# test POST /weight when the writer took the weighing after the timeout
+def test_post_weight_group_commit_late_write(app, client, in_truck_payload):
+    from concurrent.futures import Future
+
+    from api import group_commit
+
+    class LateWriter:
+        timeout = 0.01
+
+        def submit(self, data):
+            future = Future()
+            future.set_running_or_notify_cancel()  # taken, can't be cancelled
+            threading.Timer(0.1, future.set_result, [{"id": 7}]).start()
+            return future
+
+    group_commit.writer = LateWriter()
+    try:
+        response = client.post("/weight", data=in_truck_payload)
+        assert response.status_code == 200
+        assert response.get_json() == {"id": 7}
+    finally:
+        group_commit.writer = None
+
+
+# test that a forced update tells billing which period changed
+def test_post_weight_force_update_notifies_billing(
+    client, monkeypatch, in_truck_payload, in_truck_update_payload
+):
+    import threading
+    from api import billing_notify
+
+    sent = []
+    done = threading.Event()
+
+    def fake_notify(url, from_date, to_date):
+        sent.append((url, from_date, to_date))
+        done.set()
+
+    monkeypatch.setattr(billing_notify, "base_url", "http://billing")
+    monkeypatch.setattr(billing_notify, "notify", fake_notify)
+
+    client.post("/weight", data=in_truck_payload)
+    assert not sent
+    response = client.post("/weight", data=in_truck_update_payload)
+    assert response.status_code == 200
+    assert done.wait(5)
+    assert sent[0][0] == "http://billing"
+    assert sent[0][1] <= sent[0][2]
+
+
+def test_bulk_replay_into_closed_period_notifies_billing(
+    client, monkeypatch, in_truck_payload
+):
+    import threading
+    from datetime import datetime
+    from api import billing_notify
+
+    sent = []
+    done = threading.Event()
+
+    def fake_notify(url, from_date, to_date):
+        sent.append((from_date, to_date))
+        done.set()
+
+    monkeypatch.setattr(billing_notify, "base_url", "http://billing")
+    monkeypatch.setattr(billing_notify, "notify", fake_notify)
+
+    in_truck_payload["datetime"] = "20250101100000"
+    response = client.post("/weight/bulk", json=[in_truck_payload])
+    assert response.get_json()["results"][0]["status"] == 200
+    assert done.wait(5)
+    assert sent == [(datetime(2025, 1, 1, 10), datetime(2025, 1, 1, 10))]
+
+
+def test_group_commit_writer_survives_errors(
+    app, client, in_truck_payload, monkeypatch
+):
+    from api import group_commit, utils
+
+    def db_down(*args):
+        raise RuntimeError("db down")
+
+    writer = group_commit.GroupCommitWriter(app)
+    with monkeypatch.context() as patched:
+        patched.setattr(utils, "get_query_transactions", db_down)
+        with pytest.raises(RuntimeError):
+            writer.submit(dict(in_truck_payload)).result(timeout=5)
+
+    # the writer thread is still there for the next weighing
+    assert writer.submit(dict(in_truck_payload)).result(timeout=5)["bruto"] == 2000